@@ -17,6 +17,7 @@ load_dotenv()
 # Import the models
 from app.models.base import Base
 from app.models.user import User  # Import all models here
+from app.models.auth_session import AuthSession
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,37 @@
+"""Add users (created_at, id) index for keyset pagination
+
+Revision ID: 3c7d2e91a4b6
+Revises: 8f9b64af986c
+Create Date: 2026-10-17 09:12:05.311842
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c7d2e91a4b6'
+down_revision: Union[str, Sequence[str], None] = '8f9b64af986c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_users_created_at_id', 'users', ['created_at', 'id'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_users_created_at_id', table_name='users',
+            postgresql_concurrently=True, if_exists=True
+        )
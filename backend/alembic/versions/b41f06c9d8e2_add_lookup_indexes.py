@@ -0,0 +1,58 @@
+"""Add indexes for the users lookup patterns
+
+lower(email) for case-insensitive email lookups (replacing the plain email
+index), (country, created_at, id) for per-country reports and the
+country-filtered listing, and id INCLUDE (firebase_uid, is_active,
+profile_completed) so that principal lookups are index-only scans. Built
+CONCURRENTLY so that writes to users are not blocked.
+
+Revision ID: b41f06c9d8e2
+Revises: 3c7d2e91a4b6
+Create Date: 2026-10-17 11:40:27.904113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b41f06c9d8e2'
+down_revision: Union[str, Sequence[str], None] = '3c7d2e91a4b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_users_email_lower', 'users', [sa.text('lower(email)')],
+            unique=False, postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            'ix_users_country_created_at_id', 'users', ['country', 'created_at', 'id'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            'ix_users_principal', 'users', ['id'],
+            unique=False, postgresql_include=['firebase_uid', 'is_active', 'profile_completed'],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        op.drop_index(
+            'ix_users_email', table_name='users',
+            postgresql_concurrently=True, if_exists=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_users_email', 'users', ['email'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True
+        )
+        for name in ('ix_users_principal', 'ix_users_country_created_at_id', 'ix_users_email_lower'):
+            op.drop_index(name, table_name='users', postgresql_concurrently=True, if_exists=True)
@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.core.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_async_db
 from app.schemas.auth import (
     PhoneSendOTPRequest, 
     PhoneVerifyOTPRequest, 
@@ -12,14 +12,18 @@ from app.schemas.auth import (
 )
 from app.schemas.user import UserResponse
 from app.services.auth_service import auth_service
-from app.services.user_service import user_service
-from app.dependencies import get_current_user
-from app.models.user import User
+from app.services.twilio_service import SMSQueueFullError
+from app.services.user_service import async_user_service
+from app.dependencies import get_current_user, get_current_user_profile, get_token_claims, limit_otp_requests
+from app.core.security import Principal, TokenClaims
+from app.services.session_service import session_service
+from app.services.token_denylist import token_denylist
+from app.core.serialization import render
 
 router = APIRouter()
 
 @router.post("/phone/send-otp", response_model=OTPResponse)
-async def send_phone_otp(request: PhoneSendOTPRequest):
+async def send_phone_otp(request: PhoneSendOTPRequest, http_request: Request):
     """
     Send OTP to phone number
     
@@ -28,13 +32,24 @@ async def send_phone_otp(request: PhoneSendOTPRequest):
     
     **Note**: For demo purposes, the actual SMS is not sent. 
     Use OTP code "123456" to verify.
+    
+    Requests are rate limited per phone number and client IP (429 with
+    Retry-After). Within the resend cooldown no new SMS is sent; the
+    pending code stays valid.
     """
+    await limit_otp_requests("send_otp", request.phone_number, http_request)
     try:
         result = await auth_service.send_phone_otp(request.phone_number)
         return OTPResponse(
             success=result["success"],
             message=result["message"]
         )
+    except SMSQueueFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "5"}
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -44,7 +59,8 @@ async def send_phone_otp(request: PhoneSendOTPRequest):
 @router.post("/phone/verify-otp", response_model=AuthResponse)
 async def verify_phone_otp(
     request: PhoneVerifyOTPRequest,
-    db: Session = Depends(get_db)
+    http_request: Request,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Verify phone OTP and authenticate user
@@ -54,11 +70,12 @@ async def verify_phone_otp(
     
     **Demo OTP**: Use "123456" as the OTP code for testing.
     """
+    await limit_otp_requests("verify_otp", request.phone_number, http_request)
     try:
         auth_response = await auth_service.verify_phone_otp(
             db, request.phone_number, request.otp_code
         )
-        return auth_response
+        return render(AuthResponse, auth_response)
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -73,7 +90,7 @@ async def verify_phone_otp(
 @router.post("/google/login", response_model=AuthResponse)
 async def google_login(
     request: GoogleLoginRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Authenticate user with Google ID token
@@ -83,7 +100,7 @@ async def google_login(
     """
     try:
         auth_response = await auth_service.google_login(db, request.id_token)
-        return auth_response
+        return render(AuthResponse, auth_response)
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -98,8 +115,8 @@ async def google_login(
 @router.post("/complete-profile", response_model=UserResponse)
 async def complete_profile(
     request: CompleteProfileRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Complete user profile
@@ -127,14 +144,14 @@ async def complete_profile(
             "terms_version": "1.0"
         }
         
-        updated_user = user_service.complete_profile(db, current_user.id, profile_data)
+        updated_user = await async_user_service.complete_profile_returning(db, current_user.id, profile_data)
         if not updated_user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
             )
         
-        return updated_user
+        return render(UserResponse, updated_user)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -142,15 +159,17 @@ async def complete_profile(
         )
 
 @router.post("/refresh")
-async def refresh_token(request: RefreshTokenRequest):
+async def refresh_token(request: RefreshTokenRequest, db: AsyncSession = Depends(get_async_db)):
     """
     Refresh access token
     
-    Uses a refresh token to generate a new access token.
-    Refresh tokens have a longer expiration time than access tokens.
+    Exchanges a refresh token for a new access token and a new refresh
+    token; the one presented can no longer be used. Presenting a refresh
+    token that was already exchanged revokes its whole session, so clients
+    must store the returned refresh_token.
     """
     try:
-        result = auth_service.refresh_access_token(request.refresh_token)
+        result = await auth_service.refresh_access_token(db, request.refresh_token)
         return result
     except ValueError as e:
         raise HTTPException(
@@ -164,20 +183,30 @@ async def refresh_token(request: RefreshTokenRequest):
         )
 
 @router.post("/logout")
-async def logout(current_user: User = Depends(get_current_user)):
+async def logout(
+    claims: TokenClaims = Depends(get_token_claims),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
     """
     Logout user
     
-    Logs out the current user. In a production environment,
-    you might want to blacklist the token or clear server-side sessions.
+    Ends the session the access token belongs to, so its refresh token
+    stops working, and revokes the access token until it expires. With
+    the Redis denylist other workers reject it within
+    TOKEN_DENYLIST_SYNC_SECONDS.
     """
+    if claims.jti:
+        await token_denylist.revoke(claims.jti, claims.exp)
+    if claims.sid:
+        await session_service.revoke(db, claims.sid)
     return {"message": "Successfully logged out"}
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user_info(current_user: User = Depends(get_current_user)):
+async def get_current_user_info(current_user: UserResponse = Depends(get_current_user_profile)):
     """
     Get current user information
     
     Returns the profile information of the currently authenticated user.
     """
-    return current_user
+    return render(UserResponse, current_user)
@@ -1,5 +1,11 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 from datetime import datetime
+from app.core.database import async_engine, database_health_probe, engine, pool_saturation
+from app.services.token_denylist import token_denylist
+from app.services.twilio_service import twilio_service
+from app.services.user_service import principal_cache, profile_cache
+from app.warmup import warmup
 
 router = APIRouter()
 
@@ -17,16 +23,72 @@ def health_check():
         "version": "1.0.0"
     }
 
+@router.get("/ready")
+def readiness():
+    """
+    Readiness endpoint
+    
+    Responds 503 until this worker has finished its startup warmup (pool
+    connections opened; mappers, response schemas and the JWT path primed)
+    and 200 afterwards, with the time each warmup step took. Point load
+    balancer readiness probes here and liveness probes at /.
+    """
+    payload = {
+        "status": "ready" if warmup.ready else "warming_up",
+        "warmup": warmup.stats(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+    if not warmup.ready:
+        return JSONResponse(status_code=503, content=payload)
+    return payload
+
 @router.get("/db")
-def database_health():
+async def database_health():
     """
     Database health check endpoint
     
-    Returns the status of the database connection.
+    Probes the database with SELECT 1 (result cached for
+    DB_HEALTH_CACHE_SECONDS) and reports current pool saturation.
+    Responds 503 when the database is unreachable.
+    """
+    result = await database_health_probe.check()
+    payload = {
+        **result,
+        "pool": {
+            "sync": pool_saturation(engine),
+            "async": pool_saturation(async_engine.sync_engine)
+        },
+        "timestamp": datetime.utcnow().isoformat()
+    }
+    if result["status"] != "healthy":
+        return JSONResponse(status_code=503, content=payload)
+    return payload
+
+@router.get("/cache")
+def cache_health():
+    """
+    Cache statistics endpoint
+    
+    Returns size and hit/miss/eviction counters of the in-process
+    principal and profile caches used by authenticated requests on this
+    worker, and the size and freshness of its copy of the token denylist.
     """
-    # In a real implementation, you would check database connectivity
     return {
-        "status": "healthy",
-        "database": "postgresql",
+        "principal_cache": principal_cache.stats(),
+        "profile_cache": profile_cache.stats(),
+        "token_denylist": token_denylist.stats(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+@router.get("/sms")
+def sms_health():
+    """
+    SMS dispatch health endpoint
+    
+    Returns queue depth, delivery/retry counters and recent send latency
+    of the background SMS dispatch queue on this worker.
+    """
+    return {
+        "dispatch_queue": twilio_service.dispatch_stats(),
         "timestamp": datetime.utcnow().isoformat()
     }
@@ -0,0 +1,99 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import FileResponse
+from typing import Optional
+from app.core.profiling import ProfilerBusyError, memory_profiler, profile_store
+from app.dependencies import require_admin
+
+# Only included with PROFILING_ENABLED; every endpoint requires X-Admin-Key
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+@router.get("/")
+def profiling_status():
+    """
+    Profiling status of this worker
+
+    Whether a CPU profile is being recorded, the stored profile files
+    (newest first) and the state of memory tracing.
+    """
+    return {
+        "recording": profile_store.recording,
+        "profiles": profile_store.list(),
+        "memory": memory_profiler.stats()
+    }
+
+@router.post("/cpu")
+async def profile_cpu(
+    seconds: float = Query(10.0, gt=0, le=300),
+    label: str = Query("worker", max_length=40)
+):
+    """
+    Profile this worker's CPU
+
+    Samples the stacks of all threads for ``seconds`` and stores them as a
+    collapsed-stack file (flamegraph.pl, speedscope). Responds 409 while
+    another profile is recorded. Each request reaches one worker; repeat it
+    to profile others.
+    """
+    try:
+        return await profile_store.record(seconds, label)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+@router.get("/profiles/{name}")
+def download_profile(name: str):
+    """
+    Download a stored collapsed-stack profile
+    """
+    path = profile_store.path(name)
+    if path is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=name)
+
+@router.post("/memory/start")
+def start_memory_tracing():
+    """
+    Start tracing allocations with tracemalloc
+
+    Tracing slows the worker down and uses extra memory; stop it when done.
+    """
+    memory_profiler.start()
+    return memory_profiler.stats()
+
+@router.post("/memory/stop")
+def stop_memory_tracing():
+    """
+    Stop tracing allocations and drop the snapshots
+    """
+    memory_profiler.stop()
+    return memory_profiler.stats()
+
+@router.post("/memory/snapshot")
+def take_memory_snapshot(limit: int = Query(10, ge=1, le=100)):
+    """
+    Take an allocation snapshot
+
+    Returns its id (for /memory/diff) and the largest allocation sites.
+    Responds 409 unless tracing was started.
+    """
+    try:
+        return memory_profiler.snapshot(limit)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+@router.get("/memory/diff")
+def diff_memory_snapshots(
+    base: int,
+    target: Optional[int] = Query(None, description="Defaults to the latest snapshot"),
+    limit: int = Query(10, ge=1, le=100),
+    traceback: bool = Query(False, description="Compare full allocation stacks instead of lines")
+):
+    """
+    Allocation growth between two snapshots
+
+    Allocation sites sorted by how much they grew from ``base`` to
+    ``target``, e.g. a cache or store that is never pruned.
+    """
+    try:
+        return {"base": base, "growth": memory_profiler.diff(base, target, limit, traceback)}
+    except KeyError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=e.args[0])
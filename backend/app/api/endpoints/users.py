@@ -1,29 +1,79 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.core.database import get_db
-from app.schemas.user import UserProfile, UserUpdate, UserResponse
-from app.services.user_service import user_service
-from app.dependencies import get_current_user, require_completed_profile
-from app.models.user import User
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from typing import Optional
+from app.core.database import get_async_db, get_async_session_factory
+from app.schemas.user import UserListResponse, UserProfile, UserUpdate, UserResponse
+from app.services.user_service import async_user_service, decode_cursor
+from app.dependencies import get_current_user, get_current_user_profile, require_admin, require_completed_profile
+from app.core.security import Principal
+from app.core.serialization import render
 
 router = APIRouter()
 
+@router.get("/", response_model=UserListResponse, dependencies=[Depends(require_admin)])
+async def list_users(
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(100, ge=1, le=500),
+    country: Optional[str] = None,
+    auth_method: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    profile_completed: Optional[bool] = None,
+    stream: bool = Query(False, description="Stream every matching user as NDJSON instead of one page"),
+    db: AsyncSession = Depends(get_async_db),
+    session_factory: async_sessionmaker = Depends(get_async_session_factory)
+):
+    """
+    List users (admin)
+    
+    Requires the X-Admin-Key header. Users are ordered by (created_at, id)
+    and paginated with an opaque cursor, so deep pages cost the same as the
+    first one. With ``stream=true`` all matching users (after ``cursor``, if
+    given) are streamed as NDJSON from a server-side cursor and ``limit`` is
+    ignored.
+    """
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+    filters = {
+        "country": country,
+        "auth_method": auth_method,
+        "is_active": is_active,
+        "profile_completed": profile_completed
+    }
+    
+    if stream:
+        # Streamed after this function returns, from a session of its own
+        async def ndjson():
+            async with session_factory() as stream_db:
+                async for chunk in async_user_service.stream_users(stream_db, cursor, **filters):
+                    yield "".join(user.model_dump_json() + "\n" for user in chunk)
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+    
+    items, next_cursor = await async_user_service.list_users(db, limit, cursor, **filters)
+    return render(UserListResponse, UserListResponse(items=items, next_cursor=next_cursor))
+
 @router.get("/profile", response_model=UserProfile)
 async def get_user_profile(
-    current_user: User = Depends(get_current_user)
+    current_user: UserResponse = Depends(get_current_user_profile)
 ):
     """
     Get user profile
     
     Returns the current user's profile information.
     """
-    return current_user
+    return render(UserProfile, current_user)
 
 @router.put("/profile", response_model=UserResponse)
 async def update_user_profile(
     user_update: UserUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Update user profile
@@ -32,13 +82,13 @@ async def update_user_profile(
     Only provided fields will be updated.
     """
     try:
-        updated_user = user_service.update_user(db, current_user.id, user_update)
+        updated_user = await async_user_service.update_user_returning(db, current_user.id, user_update)
         if not updated_user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
             )
-        return updated_user
+        return render(UserResponse, updated_user)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -47,8 +97,8 @@ async def update_user_profile(
 
 @router.delete("/account")
 async def delete_user_account(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Delete user account
@@ -57,7 +107,7 @@ async def delete_user_account(
     This action cannot be undone.
     """
     try:
-        success = user_service.delete_user(db, current_user.id)
+        success = await async_user_service.delete_user_returning(db, current_user.id)
         if not success:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -72,8 +122,8 @@ async def delete_user_account(
 
 @router.post("/deactivate")
 async def deactivate_user_account(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Deactivate user account
@@ -81,7 +131,7 @@ async def deactivate_user_account(
     Deactivates the current user's account. The account can be reactivated later.
     """
     try:
-        deactivated_user = user_service.deactivate_user(db, current_user.id)
+        deactivated_user = await async_user_service.deactivate_user_returning(db, current_user.id)
         if not deactivated_user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
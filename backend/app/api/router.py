@@ -1,4 +1,5 @@
 from fastapi import APIRouter
+from app.core.config import settings
 from app.api.endpoints import auth, users, health
 
 api_router = APIRouter()
@@ -6,3 +7,7 @@ api_router = APIRouter()
 api_router.include_router(health.router, prefix="/health", tags=["health"])
 api_router.include_router(auth.router, prefix="/auth", tags=["authentication"])
 api_router.include_router(users.router, prefix="/users", tags=["users"])
+
+if settings.PROFILING_ENABLED:
+    from app.api.endpoints import profiling
+    api_router.include_router(profiling.router, prefix="/admin/profiling", tags=["admin"])
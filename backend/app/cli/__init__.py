@@ -0,0 +1,5 @@
+"""
+Command line tools for Imaro Backend
+
+Run from the backend directory, e.g. ``python -m app.cli users import users.csv``.
+"""
@@ -0,0 +1,14 @@
+import argparse
+import sys
+from app.cli import explain, users
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Imaro Backend command line tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+    users.add_parser(commands)
+    explain.add_parser(commands)
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+"""
+Query plan check for the user queries
+
+    python -m app.cli explain --database-url postgresql://localhost/imarodb_explain
+
+Seeds a scratch database with --seed users, runs every AsyncUserService
+and UserService query once while recording the SQL they send (through the
+async and the sync engine respectively), then EXPLAINs each recorded
+statement (EXPLAIN (ANALYZE, FORMAT JSON) on PostgreSQL inside a rolled
+back transaction, EXPLAIN QUERY PLAN on SQLite). Exits with status 1 if any
+statement reads users with a sequential scan. Point it at a dedicated
+local database: it creates the tables and inserts seed rows.
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Tuple
+from sqlalchemy import create_engine, event, func, insert, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+from app.core.database import get_async_database_url
+from app.models.base import Base
+from app.models.user import User
+
+COUNTRIES = ("USA", "GBR", "IND", "DEU", "FRA", "BRA", "JPN", "CAN", "AUS", "NGA")
+EXPLAINED_OPERATIONS = ("SELECT", "UPDATE", "DELETE", "WITH")
+SQLITE_FULL_SCAN = re.compile(r"^SCAN users\b(?!.*USING (COVERING )?INDEX)")
+
+def seed_rows(start: int, stop: int) -> List[dict]:
+    created = datetime(2025, 1, 1)
+    return [
+        {
+            "id": uuid.uuid4(),
+            "firebase_uid": f"explain_{index}",
+            "auth_method": "phone" if index % 2 else "google",
+            "phone_number": f"+1{index:010d}",
+            "email": f"User{index}@Example.com",
+            "first_name": "User",
+            "last_name": "Name",
+            "country": COUNTRIES[index % len(COUNTRIES)],
+            "is_active": True,
+            "profile_completed": index % 4 == 0,
+            "created_at": created + timedelta(seconds=index),
+        }
+        for index in range(start, stop)
+    ]
+
+async def seed(engine, rows: int) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        existing = (await conn.execute(select(func.count()).select_from(User))).scalar()
+        for start in range(existing, rows, 10000):
+            await conn.execute(insert(User), seed_rows(start, min(start + 10000, rows)))
+        await conn.execute(text("ANALYZE users" if engine.dialect.name == "postgresql" else "ANALYZE"))
+
+def run_sync_workload(engine: Engine) -> None:
+    """Call every UserService query once"""
+    from app.schemas.user import UserUpdate
+    from app.services.user_service import user_service as service
+
+    with Session(engine, expire_on_commit=False) as db:
+        user = service.get_user_by_firebase_uid(db, "explain_103")
+        service.get_user_by_id(db, user.id)
+        service.get_user_by_phone(db, user.phone_number)
+        service.get_user_by_email(db, user.email.lower())
+        service.update_user(db, user.id, UserUpdate(age=30))
+        service.complete_profile(db, user.id, {"first_name": "Explain"})
+        service.deactivate_user(db, user.id)
+        service.delete_user(db, user.id)
+        db.execute(insert(User), seed_rows(103, 104))
+        db.commit()
+
+async def run_workload(engine, sync_engine: Engine) -> List[Tuple[str, str, object]]:
+    """
+    Call every AsyncUserService and UserService query once
+
+    Returns (engine, statement, parameters) of the statements sent, where
+    engine is "async" or "sync": each is explained on the engine that sent
+    it, whose driver understands its parameter style.
+    """
+    from app.schemas.user import UserCreate, UserUpdate
+    from app.services.user_service import async_user_service as service, profile_cache
+
+    statements = []
+
+    def recorder(kind: str):
+        def _record(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith(EXPLAINED_OPERATIONS):
+                statements.append((kind, statement, parameters))
+        return _record
+
+    listeners = [(engine.sync_engine, recorder("async")), (sync_engine, recorder("sync"))]
+    for target, listener in listeners:
+        event.listen(target, "before_cursor_execute", listener)
+    try:
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            user = await service.get_user_by_firebase_uid(db, "explain_101")
+            await service.get_user_by_id(db, user.id)
+            await service.get_user_by_phone(db, user.phone_number)
+            await service.get_user_by_email(db, user.email.lower())
+            await service.get_principal(db, user.id)
+            profile_cache.invalidate(user.id)
+            await service.get_cached_profile(db, user.id)
+
+            items, cursor = await service.list_users(db, 100)
+            await service.list_users(db, 100, cursor)
+            items, cursor = await service.list_users(db, 100, country="GBR")
+            await service.list_users(db, 100, cursor, country="GBR")
+            async for _ in service.stream_users(db, cursor, chunk_size=1000, country="GBR"):
+                pass
+
+            await service.update_user_returning(db, user.id, UserUpdate(age=30))
+            await service.complete_profile_returning(db, user.id, {"first_name": "Explain"})
+            await service.deactivate_user_returning(db, user.id)
+            await service.update_user(db, user.id, UserUpdate(age=31))
+            await service.upsert_login(db, UserCreate(
+                firebase_uid=user.firebase_uid, auth_method="phone", phone_number=user.phone_number,
+                first_name="User", last_name="Name", country="USA"
+            ))
+            victim = await service.get_user_by_firebase_uid(db, "explain_102")
+            await service.delete_user_returning(db, victim.id)
+            await db.execute(insert(User), seed_rows(102, 103))
+            await db.commit()
+        await asyncio.to_thread(run_sync_workload, sync_engine)
+    finally:
+        for target, listener in listeners:
+            event.remove(target, "before_cursor_execute", listener)
+    return statements
+
+def _postgres_seq_scans(plan: dict) -> List[str]:
+    found = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") == "users":
+        found.append("Seq Scan on users")
+    for child in plan.get("Plans", []):
+        found += _postgres_seq_scans(child)
+    return found
+
+def _explain_on(conn: Connection, statement: str, parameters) -> Tuple[List[str], List[str]]:
+    transaction = conn.begin()
+    try:
+        if conn.dialect.name == "postgresql":
+            result = conn.exec_driver_sql(f"EXPLAIN (ANALYZE, FORMAT JSON) {statement}", parameters)
+            plan = result.scalar()
+            plan = (json.loads(plan) if isinstance(plan, str) else plan)[0]["Plan"]
+            lines = [f"{plan['Node Type']} (cost {plan['Total Cost']}, {plan.get('Actual Total Time', 0)} ms)"]
+            return lines, _postgres_seq_scans(plan)
+        result = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        lines = [row[3] for row in result]
+        return lines, [line for line in lines if SQLITE_FULL_SCAN.match(line)]
+    finally:
+        transaction.rollback()
+
+async def explain(engine, statement: str, parameters) -> Tuple[List[str], List[str]]:
+    """Return (plan lines, sequential scans on users) for one statement of the async engine"""
+    async with engine.connect() as conn:
+        return await conn.run_sync(_explain_on, statement, parameters)
+
+def explain_sync(engine: Engine, statement: str, parameters) -> Tuple[List[str], List[str]]:
+    """explain() for a statement of the sync engine"""
+    with engine.connect() as conn:
+        return _explain_on(conn, statement, parameters)
+
+async def check_plans(database_url: str, rows: int) -> int:
+    engine = create_async_engine(get_async_database_url(database_url))
+    sync_engine = create_engine(database_url)
+    try:
+        await seed(engine, rows)
+        statements = await run_workload(engine, sync_engine)
+        failures = 0
+        seen = set()
+        for kind, statement, parameters in statements:
+            if statement in seen:
+                continue
+            seen.add(statement)
+            if kind == "sync":
+                lines, seq_scans = await asyncio.to_thread(explain_sync, sync_engine, statement, parameters)
+            else:
+                lines, seq_scans = await explain(engine, statement, parameters)
+            failures += bool(seq_scans)
+            marker = "FAIL" if seq_scans else "ok  "
+            print(f"{marker} {' '.join(statement.split())[:110]}")
+            for line in lines:
+                print(f"       {line}")
+        print(f"\n{len(seen)} statements checked, {failures} with sequential scans on users")
+        return 1 if failures else 0
+    finally:
+        await engine.dispose()
+        sync_engine.dispose()
+
+def run(args: argparse.Namespace) -> int:
+    return asyncio.run(check_plans(args.database_url, args.seed))
+
+def add_parser(commands) -> None:
+    parser = commands.add_parser("explain", help="fail if a user query sequentially scans users")
+    parser.add_argument("--database-url", required=True, help="dedicated local database to seed and explain against")
+    parser.add_argument("--seed", type=int, default=20000, help="users to seed (default 20000)")
+    parser.set_defaults(handler=run)
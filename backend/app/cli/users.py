@@ -0,0 +1,378 @@
+"""
+Bulk user import and export
+
+    python -m app.cli users import users.csv --rejects rejects.ndjson
+    python -m app.cli users export users.ndjson
+
+Import reads CSV or NDJSON in chunks of --chunk-size rows, so memory stays
+bounded whatever the input size. Each chunk is validated column by column
+(app/utils/validators.py plus the users table CheckConstraints), loaded into
+a temporary staging table (COPY on PostgreSQL, executemany elsewhere) and
+moved into users with one INSERT ... SELECT ... ON CONFLICT DO NOTHING,
+committing once per chunk. Rows failing validation or colliding with an
+existing user are written to the rejects file as NDJSON.
+
+Export streams the users table through a server-side cursor.
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import itertools
+import json
+import sys
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import IO, ContextManager, Iterable, Iterator, List, Optional, Tuple
+from sqlalchemy import Column, Integer, MetaData, Table, select, true
+from sqlalchemy.engine import Connection
+from app.core.database import UPSERT_INSERTS
+from app.models.user import User
+from app.utils.constants import (
+    AUTH_METHODS,
+    ERR_INVALID_AGE,
+    ERR_INVALID_COUNTRY,
+    ERR_INVALID_GENDER,
+    ERR_INVALID_NAME,
+    ERR_INVALID_PHONE,
+)
+from app.utils.validators import (
+    validate_age,
+    validate_country_code,
+    validate_email,
+    validate_gender,
+    validate_name,
+    validate_phone_number,
+)
+
+FORMATS = ("csv", "ndjson")
+
+IMPORT_COLUMNS = (
+    "firebase_uid", "auth_method", "phone_number", "email", "first_name", "last_name",
+    "age", "gender", "country", "is_active", "is_phone_verified", "is_email_verified",
+    "profile_completed",
+)
+REQUIRED_COLUMNS = ("firebase_uid", "auth_method", "first_name", "last_name", "country")
+BOOLEAN_DEFAULTS = {
+    "is_active": True,
+    "is_phone_verified": False,
+    "is_email_verified": False,
+    "profile_completed": False,
+}
+TRUE_VALUES = frozenset({"true", "t", "1", "yes", "y"})
+FALSE_VALUES = frozenset({"false", "f", "0", "no", "n"})
+
+# Column -> (validator, error message) for non-null values
+FIELD_RULES = {
+    "phone_number": (validate_phone_number, ERR_INVALID_PHONE),
+    "email": (validate_email, "Invalid email format"),
+    "first_name": (validate_name, ERR_INVALID_NAME),
+    "last_name": (validate_name, ERR_INVALID_NAME),
+    "country": (validate_country_code, ERR_INVALID_COUNTRY),
+    "age": (validate_age, ERR_INVALID_AGE),
+    "gender": (validate_gender, ERR_INVALID_GENDER),
+}
+
+# Lengths of the String columns, checked before the database would reject them
+MAX_LENGTHS = {
+    name: User.__table__.c[name].type.length
+    for name in IMPORT_COLUMNS
+    if getattr(User.__table__.c[name].type, "length", None)
+}
+
+UNIQUE_COLUMNS = ("firebase_uid", "phone_number")
+CONFLICT_ERROR = "Conflicts with an existing user (firebase_uid or phone_number)"
+
+EXPORT_COLUMNS = tuple(column.name for column in User.__table__.columns)
+
+@dataclass
+class ImportStats:
+    read: int = 0
+    imported: int = 0
+    rejected: int = 0
+    elapsed: float = 0.0
+
+# A row as read: (line number, raw row or None, parse error or None)
+RawRow = Tuple[int, Optional[dict], Optional[str]]
+# A row being validated: (line number, raw row, normalized values, errors)
+ChunkRow = Tuple[int, Optional[dict], dict, List[str]]
+
+def detect_format(path: str, fmt: Optional[str]) -> str:
+    if fmt:
+        return fmt
+    if path.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return "csv"
+
+def read_rows(stream: IO[str], fmt: str) -> Iterator[RawRow]:
+    """Yield input rows one at a time with their line numbers"""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row, None
+        return
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, f"Invalid JSON: {e}"
+            continue
+        if isinstance(row, dict):
+            yield line_number, row, None
+        else:
+            yield line_number, None, "Expected a JSON object"
+
+def normalize_row(raw: Optional[dict], parse_error: Optional[str]) -> Tuple[dict, List[str]]:
+    """Trim strings, map blanks to NULL and coerce age and flags"""
+    errors = [parse_error] if parse_error else []
+    raw = raw or {}
+    values = {}
+    for column in IMPORT_COLUMNS:
+        value = raw.get(column)
+        if isinstance(value, str):
+            value = value.strip() or None
+        values[column] = value
+
+    for column in IMPORT_COLUMNS:
+        value = values[column]
+        if value is None:
+            continue
+        if column == "age":
+            try:
+                values[column] = int(value)
+            except (TypeError, ValueError):
+                errors.append(f"age: {ERR_INVALID_AGE}")
+                values[column] = None
+        elif column in BOOLEAN_DEFAULTS:
+            if isinstance(value, bool):
+                continue
+            flag = str(value).lower()
+            if flag in TRUE_VALUES:
+                values[column] = True
+            elif flag in FALSE_VALUES:
+                values[column] = False
+            else:
+                errors.append(f"{column}: expected a boolean")
+        elif not isinstance(value, str):
+            values[column] = str(value)
+
+    for column, default in BOOLEAN_DEFAULTS.items():
+        if values[column] is None or not isinstance(values[column], bool):
+            values[column] = default
+    return values, errors
+
+def validate_chunk(chunk: List[ChunkRow]) -> Tuple[List[ChunkRow], List[ChunkRow]]:
+    """
+    Validate a chunk column by column
+
+    Returns (valid, rejected). Applies the field validators, column lengths,
+    the users CheckConstraints and uniqueness of firebase_uid/phone_number
+    within the chunk; uniqueness against existing rows is left to the
+    database (ON CONFLICT DO NOTHING).
+    """
+    rows = [values for _, _, values, _ in chunk]
+    errors = [errors for _, _, _, errors in chunk]
+
+    for column in REQUIRED_COLUMNS:
+        for index, row in enumerate(rows):
+            if row[column] is None:
+                errors[index].append(f"{column}: required")
+
+    for column, (validator, message) in FIELD_RULES.items():
+        for index, row in enumerate(rows):
+            if row[column] is not None and not validator(row[column]):
+                errors[index].append(f"{column}: {message}")
+
+    for column, max_length in MAX_LENGTHS.items():
+        for index, row in enumerate(rows):
+            if row[column] is not None and len(row[column]) > max_length:
+                errors[index].append(f"{column}: longer than {max_length} characters")
+
+    # CheckConstraints of the users table
+    for index, row in enumerate(rows):
+        auth_method = row["auth_method"]
+        if auth_method is not None and auth_method not in AUTH_METHODS:
+            errors[index].append(f"auth_method: must be one of {', '.join(AUTH_METHODS)}")
+        if auth_method == "phone" and row["phone_number"] is None:
+            errors[index].append("phone_number: required for phone auth")
+        if auth_method == "google" and row["email"] is None:
+            errors[index].append("email: required for google auth")
+
+    for column in UNIQUE_COLUMNS:
+        seen = set()
+        for index, row in enumerate(rows):
+            value = row[column]
+            if value is None or errors[index]:
+                continue
+            if value in seen:
+                errors[index].append(f"{column}: duplicated in input")
+            seen.add(value)
+
+    valid = [entry for entry in chunk if not entry[3]]
+    rejected = [entry for entry in chunk if entry[3]]
+    return valid, rejected
+
+def staging_table() -> Table:
+    """Temporary, constraint-free copy of the imported users columns"""
+    columns = [Column("line", Integer), Column("id", User.__table__.c.id.type)]
+    columns += [Column(name, User.__table__.c[name].type) for name in IMPORT_COLUMNS]
+    return Table("users_import_staging", MetaData(), *columns, prefixes=["TEMPORARY"])
+
+def load_staging(conn: Connection, staging: Table, rows: List[dict]) -> None:
+    """Bulk load rows into the staging table (COPY with psycopg2, else executemany)"""
+    if conn.dialect.name == "postgresql" and conn.dialect.driver == "psycopg2":
+        columns = list(staging.c.keys())
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            # None is written unquoted and empty, which COPY reads as NULL
+            writer.writerow([row[column] for column in columns])
+        buffer.seek(0)
+        cursor = conn.connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {staging.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer
+            )
+        finally:
+            cursor.close()
+    else:
+        conn.execute(staging.insert(), rows)
+
+def move_staged_users(conn: Connection, staging: Table) -> set:
+    """Insert staged rows into users, skipping conflicts; returns the inserted ids"""
+    # Other dialects are refused when the engine is set up
+    insert = UPSERT_INSERTS[conn.dialect.name]
+    users = User.__table__
+    columns = ["id", *IMPORT_COLUMNS]
+    # WHERE true keeps SQLite from parsing ON CONFLICT as part of the SELECT
+    stmt = (
+        insert(users)
+        .from_select(columns, select(*(staging.c[name] for name in columns)).where(true()))
+        .on_conflict_do_nothing()
+        .returning(users.c.id)
+    )
+    inserted = {row.id for row in conn.execute(stmt)}
+    conn.execute(staging.delete())
+    return inserted
+
+def write_rejects(stream: IO[str], rejected: Iterable[ChunkRow]) -> None:
+    for line, raw, _, errors in rejected:
+        stream.write(json.dumps({"line": line, "errors": errors, "row": raw}, default=str) + "\n")
+
+def import_users(conn: Connection, source: IO[str], fmt: str, rejects: IO[str], chunk_size: int = 5000) -> ImportStats:
+    """Stream users from ``source`` into the users table"""
+    stats = ImportStats()
+    start = time.perf_counter()
+    staging = staging_table()
+    staging.create(conn)
+    conn.commit()
+    try:
+        rows = read_rows(source, fmt)
+        while True:
+            batch = list(itertools.islice(rows, chunk_size))
+            if not batch:
+                break
+            stats.read += len(batch)
+            chunk = [(line, raw, *normalize_row(raw, error)) for line, raw, error in batch]
+            valid, rejected = validate_chunk(chunk)
+
+            if valid:
+                staged = [dict(values, line=line, id=uuid.uuid4()) for line, _, values, _ in valid]
+                load_staging(conn, staging, staged)
+                inserted = move_staged_users(conn, staging)
+                conn.commit()
+                stats.imported += len(inserted)
+                rejected += [
+                    (entry[0], entry[1], entry[2], [CONFLICT_ERROR])
+                    for entry, row in zip(valid, staged) if row["id"] not in inserted
+                ]
+
+            write_rejects(rejects, rejected)
+            stats.rejected += len(rejected)
+    finally:
+        conn.rollback()
+        staging.drop(conn)
+        conn.commit()
+    stats.elapsed = time.perf_counter() - start
+    return stats
+
+def _json_value(value):
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+def export_users(conn: Connection, destination: IO[str], fmt: str, chunk_size: int = 5000) -> int:
+    """Stream the users table to ``destination`` through a server-side cursor"""
+    result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(
+        select(User.__table__)
+    )
+    writer = csv.writer(destination) if fmt == "csv" else None
+    if writer:
+        writer.writerow(EXPORT_COLUMNS)
+    count = 0
+    for partition in result.partitions():
+        for row in partition:
+            values = [_json_value(value) for value in row]
+            if writer:
+                writer.writerow(values)
+            else:
+                destination.write(json.dumps(dict(zip(EXPORT_COLUMNS, values))) + "\n")
+        count += len(partition)
+    return count
+
+def _open(path: str, mode: str) -> ContextManager[IO[str]]:
+    # stdin / stdout are left open when the with block exits
+    if path == "-":
+        return contextlib.nullcontext(sys.stdin if "r" in mode else sys.stdout)
+    return open(path, mode, newline="", encoding="utf-8")
+
+def run_import(args: argparse.Namespace) -> int:
+    from app.core.database import engine
+    fmt = detect_format(args.source, args.format)
+    rejects_path = args.rejects or ("rejects.ndjson" if args.source == "-" else f"{args.source}.rejects.ndjson")
+    with _open(args.source, "r") as source, open(rejects_path, "w", encoding="utf-8") as rejects:
+        with engine.connect() as conn:
+            stats = import_users(conn, source, fmt, rejects, args.chunk_size)
+    rate = stats.read / stats.elapsed if stats.elapsed else 0.0
+    print(
+        f"Read {stats.read} rows: {stats.imported} imported, {stats.rejected} rejected "
+        f"({stats.elapsed:.1f}s, {rate:.0f} rows/s)",
+        file=sys.stderr
+    )
+    if stats.rejected:
+        print(f"Rejected rows written to {rejects_path}", file=sys.stderr)
+    return 0
+
+def run_export(args: argparse.Namespace) -> int:
+    from app.core.database import engine
+    fmt = detect_format(args.destination, args.format)
+    start = time.perf_counter()
+    with _open(args.destination, "w") as destination:
+        with engine.connect() as conn:
+            count = export_users(conn, destination, fmt, args.chunk_size)
+    print(f"Exported {count} users ({time.perf_counter() - start:.1f}s)", file=sys.stderr)
+    return 0
+
+def add_parser(commands) -> None:
+    parser = commands.add_parser("users", help="bulk user import and export")
+    actions = parser.add_subparsers(dest="action", required=True)
+
+    import_parser = actions.add_parser("import", help="import users from CSV or NDJSON")
+    import_parser.add_argument("source", help="input file, or - for stdin")
+    import_parser.add_argument("--format", choices=FORMATS, help="default: from the file extension")
+    import_parser.add_argument("--chunk-size", type=int, default=5000)
+    import_parser.add_argument("--rejects", help="rejected rows as NDJSON (default: <source>.rejects.ndjson)")
+    import_parser.set_defaults(handler=run_import)
+
+    export_parser = actions.add_parser("export", help="export users to CSV or NDJSON")
+    export_parser.add_argument("destination", help="output file, or - for stdout")
+    export_parser.add_argument("--format", choices=FORMATS, help="default: from the file extension")
+    export_parser.add_argument("--chunk-size", type=int, default=5000)
+    export_parser.set_defaults(handler=run_export)
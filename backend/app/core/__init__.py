@@ -5,11 +5,13 @@ Contains application configuration, database setup, and security utilities.
 """
 
 from .config import settings
-from .database import get_db, SessionLocal, engine
+from .database import get_db, get_async_db, SessionLocal, AsyncSessionLocal, engine, async_engine
 from .security import (
     create_access_token,
     create_refresh_token, 
     verify_token,
+    TokenClaims,
+    Principal,
     hash_password,
     verify_password
 )
@@ -17,11 +19,16 @@ from .security import (
 __all__ = [
     "settings",
     "get_db", 
+    "get_async_db",
     "SessionLocal",
+    "AsyncSessionLocal",
     "engine",
+    "async_engine",
     "create_access_token",
     "create_refresh_token",
     "verify_token", 
+    "TokenClaims",
+    "Principal",
     "hash_password",
     "verify_password"
 ]
\ No newline at end of file
@@ -0,0 +1,120 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Hashable, Optional
+import time
+
+class TTLCache:
+    """
+    Bounded in-process cache with per-entry expiry and LRU eviction
+
+    Entries expire after ``ttl_seconds`` (or a per-entry ``ttl``) and the least
+    recently used entry is evicted once ``max_size`` is reached. A ``max_size``
+    of 0 disables the cache. Hit/miss/eviction counters are kept for sizing.
+
+    A value loaded from the database can be stale by the time it is set: an
+    invalidate() may have run while it was loading. Callers that take
+    ``version()`` before loading and pass it to set() have such sets
+    refused. The versions of the last ``max_size`` invalidations are kept;
+    older ones (and clear()) raise a floor below which every set is refused.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.stale_sets = 0
+        self._version = 0
+        # key -> version of its last invalidation, oldest first
+        self._invalidated: "OrderedDict[Hashable, int]" = OrderedDict()
+        self._invalidated_floor = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value, or ``default`` if missing or expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, expires_at = entry
+            if time.monotonic() >= expires_at:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def version(self) -> int:
+        """Invalidation counter to take before loading a value to set()"""
+        return self._version
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, version: Optional[int] = None) -> None:
+        """
+        Cache a value for ``ttl`` seconds (defaults to ``ttl_seconds``)
+
+        With ``version`` (from version() before the value was loaded) the set
+        is dropped if ``key`` may have been invalidated since.
+        """
+        if self.max_size <= 0:
+            return
+
+        ttl = self.ttl_seconds if ttl is None else ttl
+        if ttl <= 0:
+            return
+
+        with self._lock:
+            if version is not None and (
+                version < self._invalidated_floor or version < self._invalidated.get(key, 0)
+            ):
+                self.stale_sets += 1
+                return
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop a single entry"""
+        with self._lock:
+            self._data.pop(key, None)
+            self._version += 1
+            self._invalidated[key] = self._version
+            self._invalidated.move_to_end(key)
+            while len(self._invalidated) > max(self.max_size, 1):
+                _, version = self._invalidated.popitem(last=False)
+                self._invalidated_floor = version
+
+    def clear(self) -> None:
+        """Drop all entries (counters are kept)"""
+        with self._lock:
+            self._data.clear()
+            self._version += 1
+            self._invalidated.clear()
+            self._invalidated_floor = self._version
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        """Cache size and hit/miss/eviction counters"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "stale_sets": self.stale_sets,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
@@ -8,26 +8,158 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str
+    ASYNC_DATABASE_URL: Optional[str] = None  # Derived from DATABASE_URL when unset
+    DB_ECHO: bool = False  # Log every SQL statement
+    # Per-request SQL statistics: statements slower than DB_SLOW_QUERY_MS are
+    # logged with their parameter types (0 disables), as are statements run
+    # DB_REPEATED_QUERY_WARN_THRESHOLD times in one request (0 disables);
+    # DB_SERVER_TIMING adds a Server-Timing header with the query count and time
+    DB_SLOW_QUERY_MS: float = 100.0
+    DB_REPEATED_QUERY_WARN_THRESHOLD: int = 20
+    DB_SERVER_TIMING: bool = True
+    
+    # Connection pool (per engine, per worker)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0
+    DB_POOL_RECYCLE_SECONDS: int = 1800  # -1 never recycles
+    # "always" pings on every checkout, "idle" only connections idle longer
+    # than DB_PRE_PING_IDLE_SECONDS, "never" relies on pool recycling
+    DB_PRE_PING: str = "idle"
+    DB_PRE_PING_IDLE_SECONDS: float = 60.0
+    DB_STATEMENT_TIMEOUT_MS: int = 0  # PostgreSQL only, 0 disables
+    # PgBouncer in transaction mode: no server-side prepared statement caching
+    DB_PGBOUNCER: bool = False
+    
+    # Lifespan warmup, after which /health/ready reports ready: opens
+    # WARMUP_DB_CONNECTIONS pool connections (at most DB_POOL_SIZE) and primes
+    # mappers, the principal query, response schemas and the JWT path
+    WARMUP_ENABLED: bool = True
+    WARMUP_DB_CONNECTIONS: int = 2
+    
+    # /health/db probe
+    DB_HEALTH_CACHE_SECONDS: float = 5.0
+    DB_HEALTH_TIMEOUT_SECONDS: float = 2.0
     
     # Twilio
     TWILIO_ACCOUNT_SID: str
     TWILIO_AUTH_TOKEN: str
     TWILIO_MESSAGING_SERVICE_SID: str
+    TWILIO_API_BASE_URL: str = "https://api.twilio.com"
+    TWILIO_CONNECT_TIMEOUT_SECONDS: float = 3.0
+    TWILIO_READ_TIMEOUT_SECONDS: float = 10.0
+    TWILIO_POOL_TIMEOUT_SECONDS: float = 5.0
+    TWILIO_MAX_CONNECTIONS: int = 20
+    TWILIO_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    TWILIO_MAX_CONCURRENT_REQUESTS: int = 10
+    
+    # SMS dispatch queue (match SMS_RATE_PER_SECOND to the Messaging Service throughput)
+    SMS_QUEUE_MAX_SIZE: int = 1000
+    SMS_DISPATCH_WORKERS: int = 4
+    SMS_RATE_PER_SECOND: float = 10.0
+    SMS_RATE_BURST: int = 10
+    SMS_MAX_RETRIES: int = 3
+    SMS_RETRY_BASE_DELAY_SECONDS: float = 0.5
+    SMS_RETRY_MAX_DELAY_SECONDS: float = 10.0
+    SMS_SHUTDOWN_FLUSH_TIMEOUT_SECONDS: float = 10.0
+    
+    # OTP storage: "memory" (single worker) or "redis" (shared by all workers)
+    OTP_STORE_BACKEND: str = "memory"
+    REDIS_URL: str = "redis://localhost:6379/0"
+    
+    # Rate limits on the phone OTP endpoints, per phone number and per client
+    # IP within OTP_RATE_LIMIT_WINDOW_SECONDS. "memory" keeps token buckets
+    # per worker, "redis" sliding windows shared by all workers. The client IP
+    # is request.client.host: behind a load balancer that is the proxy's
+    # address, so one IP bucket throttles every user unless uvicorn runs with
+    # --proxy-headers --forwarded-allow-ips=<proxy addresses>.
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_MAX_KEYS: int = 100000  # memory backend
+    OTP_RATE_LIMIT_WINDOW_SECONDS: int = 900
+    OTP_SEND_LIMIT_PER_PHONE: int = 5
+    OTP_SEND_LIMIT_PER_IP: int = 20
+    OTP_VERIFY_LIMIT_PER_PHONE: int = 10
+    OTP_VERIFY_LIMIT_PER_IP: int = 50
+    # A send-otp within this many seconds of the last SMS sends nothing; after
+    # it a still-valid OTP is resent rather than replaced
+    OTP_RESEND_COOLDOWN_SECONDS: int = 60
     
     # Firebase (Google OAuth & Push Notifications)
     FIREBASE_CREDENTIALS_PATH: str
     FIREBASE_PROJECT_ID: str
+    FIREBASE_VERIFY_MAX_WORKERS: int = 4
+    FIREBASE_CLOCK_SKEW_SECONDS: int = 0
+    FIREBASE_VERIFIED_TOKEN_CACHE_SIZE: int = 1024  # 0 disables
+    FIREBASE_VERIFIED_TOKEN_TTL_SECONDS: float = 60.0
+    # Refresh Google's signing certificates ahead of expiry in the background;
+    # when off they are fetched by the first verification that needs them
+    FIREBASE_CERT_BACKGROUND_REFRESH: bool = True
     
     # JWT
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 1440
     REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    JWT_BACKEND: str = "jose"  # "jose" or "pyjwt"
+    JWT_DECODE_CACHE_SIZE: int = 10000  # 0 disables
+    # Logged-out access tokens: "memory" (single worker) or "redis" (shared,
+    # each worker re-syncs its in-process copy every TOKEN_DENYLIST_SYNC_SECONDS)
+    TOKEN_DENYLIST_BACKEND: str = "memory"
+    TOKEN_DENYLIST_SYNC_SECONDS: float = 1.0
+    # Refresh sessions: each worker deletes expired and revoked sessions every
+    # SESSION_PRUNE_INTERVAL_SECONDS (0 disables), SESSION_PRUNE_BATCH_SIZE
+    # rows per transaction
+    SESSION_PRUNE_INTERVAL_SECONDS: float = 3600.0
+    SESSION_PRUNE_BATCH_SIZE: int = 1000
+    REVOKED_SESSION_CACHE_SIZE: int = 10000  # per worker, 0 disables
+    
+    # Admin endpoints (X-Admin-Key header); disabled while unset
+    ADMIN_API_KEY: Optional[str] = None
+    
+    # Authenticated principal cache (per worker, 0 disables). Writes to a user
+    # reach the other workers' caches within two TOKEN_DENYLIST_SYNC_SECONDS
+    # with the redis token denylist; with the memory one, after the TTL.
+    PRINCIPAL_CACHE_MAX_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 30.0
     
     # Environment
     DEBUG: bool = True
     ENVIRONMENT: str = "development"
     
+    # Metrics (/metrics endpoint and request/DB/provider instrumentation)
+    METRICS_ENABLED: bool = True
+    
+    # Tracing: spans for requests, SQL statements, SMS sends and Firebase
+    # verification. Requests continue an incoming W3C traceparent, else a
+    # TRACING_SAMPLE_RATIO share of traces is kept. Exporter: "otlp"
+    # (OTLP/HTTP to an OpenTelemetry collector), "file" (JSON lines) or
+    # "memory" (last spans, for tests)
+    TRACING_ENABLED: bool = False
+    TRACING_SAMPLE_RATIO: float = 1.0
+    TRACING_EXPORTER: str = "otlp"
+    TRACING_OTLP_ENDPOINT: str = "http://localhost:4318"
+    TRACING_FILE_PATH: str = "traces.jsonl"
+    TRACING_SERVICE_NAME: str = "imaro-backend"
+    TRACING_EXPORT_INTERVAL_SECONDS: float = 5.0
+    TRACING_MAX_QUEUE_SIZE: int = 2048  # finished spans waiting for export, per worker
+    
+    # Profiling of live workers: /api/v1/admin/profiling endpoints (CPU
+    # profiles, tracemalloc snapshots; need ADMIN_API_KEY) and profiles of a
+    # PROFILING_SAMPLE_RATE share of requests plus requests sent with the
+    # X-Profile and X-Admin-Key headers. Collapsed-stack files go to
+    # PROFILING_OUTPUT_DIR (newest PROFILING_MAX_FILES kept)
+    PROFILING_ENABLED: bool = False
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_INTERVAL_MS: float = 2.0
+    PROFILING_OUTPUT_DIR: str = "profiles"
+    PROFILING_MAX_FILES: int = 100
+    PROFILING_TRACEMALLOC_FRAMES: int = 10
+    
+    # Responses: render hot endpoints from trusted rows without re-validation
+    # and untyped routes with orjson (requires the orjson package)
+    FAST_RESPONSES: bool = False
+    
     # CORS
     ALLOWED_HOSTS: list = ["*"]
     
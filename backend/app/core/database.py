@@ -1,18 +1,182 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import DisconnectionError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 from app.core.config import settings
+from app.core.metrics import db_pool_wait_seconds, instrument_engine, pool_status, register_pool_gauges
+from app.core.query_stats import instrument_queries
+from app.core.tracing import instrument_tracing
+from datetime import datetime
+from typing import Dict, Optional
+import asyncio
+import time
+import uuid
+
+# Sync driver -> asyncio driver for the same database
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+# Dialects supporting INSERT ... ON CONFLICT ... RETURNING
+UPSERT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+def require_upsert_support(engine) -> None:
+    """Refuse databases the login upsert and user import cannot run on"""
+    if engine.dialect.name not in UPSERT_INSERTS:
+        raise RuntimeError(
+            f"Unsupported database {engine.dialect.name!r}: INSERT ... ON CONFLICT ... RETURNING "
+            f"is required ({', '.join(UPSERT_INSERTS)})"
+        )
+
+def get_async_database_url(url: str) -> str:
+    """Translate a sync DATABASE_URL into the URL for its asyncio driver"""
+    scheme, sep, rest = url.partition("://")
+    if not sep:
+        return url
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}://{rest}"
+
+class TimedQueuePool(QueuePool):
+    """QueuePool recording how long each checkout waits for a connection"""
+    metrics_engine = "sync"
+    
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            db_pool_wait_seconds.observe(time.perf_counter() - start, self.metrics_engine)
+
+class TimedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool recording how long each checkout waits for a connection"""
+    metrics_engine = "async"
+    
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            db_pool_wait_seconds.observe(time.perf_counter() - start, self.metrics_engine)
+
+PRE_PING_STRATEGIES = ("always", "idle", "never")
+
+def engine_options(url: str, is_async: bool = False) -> dict:
+    """
+    Engine keyword arguments for ``url`` from the pool settings
+    
+    In-memory SQLite keeps SQLAlchemy's single-connection pool. In PgBouncer
+    mode PgBouncer does the pooling, so the app opens NullPool connections
+    and asyncpg never caches prepared statements (their names would collide
+    across server connections).
+    """
+    if settings.DB_PRE_PING not in PRE_PING_STRATEGIES:
+        raise ValueError(f"Unknown DB_PRE_PING strategy: {settings.DB_PRE_PING}")
+    options = {"echo": settings.DB_ECHO, "pool_pre_ping": settings.DB_PRE_PING == "always"}
+    backend = url.partition("://")[0].split("+")[0]
+    if backend == "sqlite" and (":memory:" in url or url.endswith("://")):
+        return options
+    
+    connect_args = {}
+    if backend in ("postgresql", "postgres"):
+        if settings.DB_STATEMENT_TIMEOUT_MS:
+            if is_async:
+                connect_args["server_settings"] = {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}
+            else:
+                connect_args["options"] = f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"
+        if settings.DB_PGBOUNCER and is_async:
+            connect_args.update(
+                statement_cache_size=0,
+                prepared_statement_cache_size=0,
+                prepared_statement_name_func=lambda: f"__asyncpg_{uuid.uuid4()}__"
+            )
+    if connect_args:
+        options["connect_args"] = connect_args
+    
+    if settings.DB_PGBOUNCER:
+        options["poolclass"] = NullPool
+        return options
+    options.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS
+    )
+    if settings.METRICS_ENABLED:
+        options["poolclass"] = TimedAsyncAdaptedQueuePool if is_async else TimedQueuePool
+    return options
+
+def enable_idle_pre_ping(engine, idle_seconds: float) -> None:
+    """
+    Ping connections on checkout only when they sat idle in the pool
+    
+    Busy connections skip the extra round trip; a failed ping raises
+    DisconnectionError, which makes the pool replace the connection.
+    """
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        connection_record.info["checked_in_at"] = time.monotonic()
+    
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        checked_in_at = connection_record.info.get("checked_in_at")
+        if checked_in_at is None or time.monotonic() - checked_in_at < idle_seconds:
+            return
+        try:
+            cursor = dbapi_connection.cursor()
+            try:
+                cursor.execute("SELECT 1")
+            finally:
+                cursor.close()
+        except Exception as e:
+            raise DisconnectionError("Idle connection failed pre-ping") from e
 
 # Create database engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,
-    echo=settings.DEBUG
-)
+engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Create async database engine (asyncpg / aiosqlite) for async endpoints
+ASYNC_DATABASE_URL = settings.ASYNC_DATABASE_URL or get_async_database_url(settings.DATABASE_URL)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, is_async=True))
+
+require_upsert_support(engine)
+require_upsert_support(async_engine)
+
+if settings.DB_PRE_PING == "idle":
+    enable_idle_pre_ping(engine, settings.DB_PRE_PING_IDLE_SECONDS)
+    enable_idle_pre_ping(async_engine.sync_engine, settings.DB_PRE_PING_IDLE_SECONDS)
+
+instrument_queries(engine)
+instrument_queries(async_engine.sync_engine)
+
+if settings.TRACING_ENABLED:
+    instrument_tracing(engine)
+    instrument_tracing(async_engine.sync_engine)
+
+if settings.METRICS_ENABLED:
+    instrument_engine(engine, "sync")
+    instrument_engine(async_engine.sync_engine, "async")
+    register_pool_gauges({"sync": engine, "async": async_engine.sync_engine})
+
+# Create async session factory. Objects stay loaded after commit so that
+# attribute access never triggers implicit (blocking) IO.
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 # Create base class for models
 Base = declarative_base()
 
@@ -23,3 +187,97 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Dependency to get async database session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Dependency for responses that read the database after the endpoint returns
+# (streaming bodies): yield dependencies may be closed before the body is
+# sent, so such responses open their own session from this factory
+def get_async_session_factory() -> async_sessionmaker:
+    return AsyncSessionLocal
+
+def pool_saturation(engine) -> Dict[str, float]:
+    """Pool counters plus the share of the maximum connections checked out"""
+    status = pool_status(engine.pool)
+    if not status:
+        return {}
+    # The engine's own limit: DB_MAX_OVERFLOW does not apply to every engine
+    max_overflow = getattr(engine.pool, "_max_overflow", 0)
+    if max_overflow < 0:
+        # Unlimited overflow: there is no maximum to saturate
+        status["max_connections"] = None
+        status["saturation"] = 0.0
+        return status
+    max_connections = status["size"] + max_overflow
+    status["max_connections"] = max_connections
+    status["saturation"] = round(status["checked_out"] / max_connections, 3) if max_connections else 0.0
+    return status
+
+class DatabaseHealthProbe:
+    """
+    Cached, single-flight database connectivity check
+    
+    Runs SELECT 1 at most once per ``cache_seconds``; concurrent callers wait
+    for the probe in flight, so load balancer health checks cost the pool at
+    most one connection per interval.
+    """
+    
+    def __init__(self, engine, cache_seconds: float, timeout_seconds: float):
+        self.engine = engine
+        self.cache_seconds = cache_seconds
+        self.timeout_seconds = timeout_seconds
+        self.probes = 0
+        self._result: Optional[dict] = None
+        self._checked_at = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop = None
+    
+    def _cached(self) -> Optional[dict]:
+        if self._result is not None and time.monotonic() - self._checked_at < self.cache_seconds:
+            return dict(self._result, cached=True)
+        return None
+    
+    async def check(self) -> dict:
+        """Return the latest probe result, probing again once it is stale"""
+        cached = self._cached()
+        if cached is not None:
+            return cached
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock, self._lock_loop = asyncio.Lock(), loop
+        async with self._lock:
+            cached = self._cached()
+            if cached is not None:
+                return cached
+            self._result = await self._probe()
+            self._checked_at = time.monotonic()
+        return dict(self._result, cached=False)
+    
+    async def _ping(self) -> None:
+        async with self.engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    
+    async def _probe(self) -> dict:
+        self.probes += 1
+        start = time.perf_counter()
+        error = None
+        try:
+            await asyncio.wait_for(self._ping(), self.timeout_seconds)
+        except asyncio.TimeoutError:
+            error = f"timed out after {self.timeout_seconds}s"
+        except Exception as e:
+            error = type(e).__name__
+        return {
+            "status": "unhealthy" if error else "healthy",
+            "database": self.engine.dialect.name,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+            "error": error,
+            "checked_at": datetime.utcnow().isoformat()
+        }
+
+database_health_probe = DatabaseHealthProbe(
+    async_engine, settings.DB_HEALTH_CACHE_SECONDS, settings.DB_HEALTH_TIMEOUT_SECONDS
+)
@@ -0,0 +1,40 @@
+from typing import Any, Callable
+
+class LazyService:
+    """
+    A module-level service singleton built on first use
+
+    Stands in for the instance returned by ``factory`` and forwards attribute
+    access (and assignment) to it, calling ``factory`` the first time. Lets
+    a module export its service without paying for its construction
+    (provider SDKs, credentials, clients) when the module is imported;
+    the lifespan handler builds the providers the app uses at startup.
+    """
+
+    __slots__ = ("_factory", "_instance")
+
+    def __init__(self, factory: Callable[[], Any]):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_instance", None)
+
+    @property
+    def initialized(self) -> bool:
+        return self._instance is not None
+
+    def get(self) -> Any:
+        """The service instance, building it if needed"""
+        instance = self._instance
+        if instance is None:
+            instance = self._factory()
+            object.__setattr__(self, "_instance", instance)
+        return instance
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.get(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self.get(), name, value)
+
+    def __repr__(self) -> str:
+        state = repr(self._instance) if self.initialized else "not initialized"
+        return f"<LazyService {getattr(self._factory, '__name__', self._factory)}: {state}>"
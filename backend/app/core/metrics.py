@@ -0,0 +1,337 @@
+"""
+Prometheus-style metrics
+
+A small in-process registry rendering the Prometheus text exposition format.
+Recording is a dict lookup plus a few additions so it can sit on the request
+path. Each metric caps its number of label combinations; once ``max_series``
+is reached further combinations are folded into a single ``__overflow__``
+series so that label cardinality stays bounded.
+"""
+
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+import time
+
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+OVERFLOW_LABEL = "__overflow__"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Metric:
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), max_series: int = 500):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.max_series = max_series
+        self._series: Dict[Tuple[str, ...], object] = {}
+        self._overflow = tuple(OVERFLOW_LABEL for _ in self.labelnames)
+
+    def _new_series(self):
+        raise NotImplementedError
+
+    def _get_series(self, labelvalues: Tuple[str, ...]):
+        series = self._series.get(labelvalues)
+        if series is None:
+            if len(self._series) >= self.max_series:
+                labelvalues = self._overflow
+                series = self._series.get(labelvalues)
+                if series is not None:
+                    return series
+            series = self._series[labelvalues] = self._new_series()
+        return series
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        self._series.clear()
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def _new_series(self):
+        return [0.0]
+
+    def inc(self, *labelvalues: str, amount: float = 1.0) -> None:
+        self._get_series(labelvalues)[0] += amount
+
+    def value(self, *labelvalues: str) -> float:
+        series = self._series.get(labelvalues)
+        return series[0] if series else 0.0
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labelvalues, series in list(self._series.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {series[0]}")
+        return lines
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS, max_series: int = 500):
+        super().__init__(name, documentation, labelnames, max_series)
+        self.buckets = tuple(buckets)
+
+    def _new_series(self):
+        # One slot per bucket plus +Inf, then sum and count
+        return [0] * (len(self.buckets) + 1) + [0.0, 0]
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        series = self._get_series(labelvalues)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def count(self, *labelvalues: str) -> int:
+        series = self._series.get(labelvalues)
+        return series[-1] if series else 0
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labelvalues, series in list(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), series):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = _format_labels(self.labelnames, labelvalues, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {series[-2]}")
+            lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+class GaugeCallback(Metric):
+    """Gauge whose samples are collected by a callback at scrape time"""
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str],
+                 collect: Callable[[], Iterable[Tuple[Tuple[str, ...], float]]]):
+        super().__init__(name, documentation, labelnames)
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labelvalues, value in self.collect():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {value}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, *args, **kwargs) -> Counter:
+        return self.register(Counter(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        return self.register(Histogram(*args, **kwargs))
+
+    def gauge_callback(self, *args, **kwargs) -> GaugeCallback:
+        return self.register(GaugeCallback(*args, **kwargs))
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+# HTTP
+http_requests_total = registry.counter(
+    "http_requests_total", "HTTP requests by method, route template and status",
+    ["method", "route", "status"]
+)
+http_request_duration_seconds = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by method and route template",
+    ["method", "route"]
+)
+
+# Database
+db_queries_total = registry.counter(
+    "db_queries_total", "SQL statements executed by engine and statement type",
+    ["engine", "operation"]
+)
+db_query_duration_seconds = registry.histogram(
+    "db_query_duration_seconds", "SQL statement execution time by engine and statement type",
+    ["engine", "operation"]
+)
+db_queries_per_request = registry.histogram(
+    "db_queries_per_request", "SQL statements per HTTP request by method and route template",
+    ["method", "route"], buckets=(0, 1, 2, 3, 4, 5, 10, 20, 50, 100)
+)
+db_time_per_request_seconds = registry.histogram(
+    "db_time_per_request_seconds", "Time spent in SQL statements per HTTP request by method and route template",
+    ["method", "route"]
+)
+db_pool_checkouts_total = registry.counter(
+    "db_pool_checkouts_total", "Connections checked out of the pool", ["engine"]
+)
+db_pool_wait_seconds = registry.histogram(
+    "db_pool_wait_seconds", "Time spent waiting for a pooled connection", ["engine"]
+)
+
+# External providers
+external_call_duration_seconds = registry.histogram(
+    "external_call_duration_seconds", "Latency of calls to external providers",
+    ["provider", "operation"]
+)
+external_call_errors_total = registry.counter(
+    "external_call_errors_total", "Failed calls to external providers",
+    ["provider", "operation"]
+)
+
+# Rate limiting
+rate_limited_requests_total = registry.counter(
+    "rate_limited_requests_total", "Requests rejected by a rate limit", ["action"]
+)
+
+@contextmanager
+def track_external_call(provider: str, operation: str):
+    """Record latency, and errors raised, of a call to an external provider"""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        external_call_errors_total.inc(provider, operation)
+        raise
+    finally:
+        external_call_duration_seconds.observe(time.perf_counter() - start, provider, operation)
+
+SQL_OPERATIONS = frozenset({"SELECT", "INSERT", "UPDATE", "DELETE", "BEGIN", "COMMIT", "ROLLBACK", "WITH", "COPY"})
+
+def statement_operation(statement: str) -> str:
+    """First keyword of a SQL statement, from a fixed set (bounded label values)"""
+    keyword = statement.lstrip()[:8].split(None, 1)[0].upper() if statement.strip() else ""
+    return keyword if keyword in SQL_OPERATIONS else "OTHER"
+
+def instrument_engine(engine, name: str) -> None:
+    """Count and time every statement executed on a (sync) SQLAlchemy engine"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        operation = statement_operation(statement)
+        db_queries_total.inc(name, operation)
+        db_query_duration_seconds.observe(elapsed, name, operation)
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_start"):
+            connection.info["query_start"].pop()
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        db_pool_checkouts_total.inc(name)
+
+def pool_status(pool) -> Dict[str, float]:
+    """Size, checked-out and overflow counts of a QueuePool (empty for other pools)"""
+    if not hasattr(pool, "checkedout"):
+        return {}
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(0, pool.overflow()),
+        "checked_in": pool.checkedin(),
+    }
+
+def register_pool_gauges(engines: Dict[str, object]) -> None:
+    """Expose pool size/checked-out/overflow gauges for the given engines"""
+    def collect():
+        for name, engine in engines.items():
+            for state, value in pool_status(engine.pool).items():
+                yield (name, state), value
+    registry.gauge_callback(
+        "db_pool_connections", "Pool connections by engine and state", ["engine", "state"], collect
+    )
+
+def route_template(route, path: str) -> str:
+    """
+    Full path template of a matched route
+
+    Routes of included routers only know their own path (``/me``), so the
+    include prefix is recovered from the request path: it is whatever
+    precedes the shortest suffix matching the route's own pattern.
+    """
+    template = getattr(route, "path", None)
+    path_regex = getattr(route, "path_regex", None)
+    if template is None or path_regex is None or path_regex.match(path):
+        return template or UNMATCHED_ROUTE
+    index = path.find("/", 1)
+    while index != -1:
+        if path_regex.match(path[index:]):
+            return path[:index] + template
+        index = path.find("/", index + 1)
+    return template
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+# id(route) -> full template; bounded by the number of routes
+_route_templates: Dict[int, str] = {}
+
+def scope_route_template(scope) -> str:
+    """Full template of the route matched for ``scope`` (``<unmatched>`` if none), cached per route"""
+    route = scope.get("route")
+    if route is None:
+        return UNMATCHED_ROUTE
+    template = _route_templates.get(id(route))
+    if template is None:
+        template = _route_templates[id(route)] = route_template(route, scope["path"])
+    return template
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request counts and latency per route template
+
+    Routes are labelled with the matched path template (e.g.
+    ``/api/v1/users/profile``), never the raw path; unmatched requests share
+    the ``<unmatched>`` label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            template = scope_route_template(scope)
+            method = scope["method"]
+            http_requests_total.inc(method, template, str(status_code))
+            http_request_duration_seconds.observe(time.perf_counter() - start, method, template)
@@ -0,0 +1,281 @@
+"""
+On-demand CPU and memory profiling of a live worker
+
+SamplingProfiler records the stacks of all threads of the process every
+few milliseconds from a background thread and writes them in the collapsed
+format of flamegraph.pl / speedscope / inferno (``frame;frame;frame
+count`` per line; files can be concatenated to merge profiles).
+ProfilingMiddleware profiles a PROFILING_SAMPLE_RATE share of requests and
+requests sent with the X-Profile header and a valid X-Admin-Key; the admin
+endpoints profile the whole worker for a number of seconds.
+
+MemoryProfiler wraps tracemalloc: start tracing, take snapshots, and diff
+two of them by allocation site to find what keeps growing.
+
+All of it is off unless PROFILING_ENABLED: the middleware and endpoints are
+not installed and tracemalloc is never started.
+"""
+
+from collections import Counter, OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+import asyncio
+import logging
+import os
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+import tracemalloc
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_SUFFIX = ".collapsed"
+
+class ProfilerBusyError(Exception):
+    """Another profile of this worker is being recorded"""
+
+class SamplingProfiler:
+    """Samples the stacks of every thread every ``interval_seconds`` until stopped"""
+
+    def __init__(self, interval_seconds: float = 0.002):
+        self.interval_seconds = interval_seconds
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._labels: Dict[object, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            path = code.co_filename.replace(os.sep, "/")
+            short = "/".join(path.rsplit("/", 2)[-2:])
+            label = self._labels[code] = f"{code.co_name} ({short}:{code.co_firstlineno})"
+        return label
+
+    def sample(self) -> None:
+        """Record the current stack of every other thread"""
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            stack.append(names.get(ident, f"thread-{ident}"))
+            self.stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            self.sample()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+class ProfileStore:
+    """
+    Collapsed-stack files in PROFILING_OUTPUT_DIR, newest ``max_files`` kept
+
+    Also ensures one profile is recorded at a time: samples cover every
+    thread, so overlapping profiles would only repeat each other.
+    """
+
+    def __init__(self, directory: str, max_files: int = 100, interval_seconds: float = 0.002):
+        self.directory = directory
+        self.max_files = max_files
+        self.interval_seconds = interval_seconds
+        self.recording = False
+        self.written = 0
+
+    def begin(self) -> SamplingProfiler:
+        if self.recording:
+            raise ProfilerBusyError("A profile is already being recorded")
+        self.recording = True
+        profiler = SamplingProfiler(self.interval_seconds)
+        profiler.start()
+        return profiler
+
+    def end(self, profiler: SamplingProfiler, label: str) -> Optional[str]:
+        """Stop ``profiler`` and write its stacks (None when nothing was sampled); returns the file name"""
+        profiler.stop()
+        self.recording = False
+        if not profiler.samples:
+            return None
+        timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+        name = f"{timestamp}-{re.sub(r'[^A-Za-z0-9]+', '_', label).strip('_')[:80]}{PROFILE_SUFFIX}"
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, name), "w", encoding="utf-8") as f:
+            f.write(profiler.collapsed())
+        self.written += 1
+        for old in self.list()[self.max_files:]:
+            os.remove(os.path.join(self.directory, old))
+        return name
+
+    async def record(self, seconds: float, label: str) -> dict:
+        """Profile the whole worker for ``seconds``"""
+        profiler = self.begin()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            name = await asyncio.to_thread(self.end, profiler, label)
+        return {"file": name, "samples": profiler.samples, "stacks": len(profiler.stacks)}
+
+    def list(self) -> List[str]:
+        """Profile file names, newest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted((name for name in os.listdir(self.directory) if name.endswith(PROFILE_SUFFIX)), reverse=True)
+
+    def path(self, name: str) -> Optional[str]:
+        """Path of a listed profile file (None for anything else)"""
+        return os.path.join(self.directory, name) if name in self.list() else None
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling sampled requests
+
+    Profiles a ``sample_rate`` share of requests, and every request carrying
+    ``X-Profile`` together with a valid ``X-Admin-Key``. Requests arriving
+    while another profile is recorded are not profiled. Concurrent requests
+    of the worker show up in the same profile, under their own threads or,
+    for async endpoints, the event loop thread.
+    """
+
+    def __init__(self, app, store: Optional["ProfileStore"] = None, sample_rate: Optional[float] = None):
+        self.app = app
+        self.store = store
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE if sample_rate is None else sample_rate
+
+    def _requested(self, scope) -> bool:
+        if not settings.ADMIN_API_KEY:
+            return False
+        headers = dict(scope.get("headers", ()))
+        admin_key = headers.get(b"x-admin-key")
+        return (
+            b"x-profile" in headers
+            and admin_key is not None
+            and secrets.compare_digest(admin_key, settings.ADMIN_API_KEY.encode())
+        )
+
+    async def __call__(self, scope, receive, send):
+        store = self.store or profile_store
+        if (
+            scope["type"] != "http"
+            or store.recording
+            or not (random.random() < self.sample_rate or self._requested(scope))
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        profiler = store.begin()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            name = await asyncio.to_thread(store.end, profiler, f"{scope['method']} {scope['path']}")
+            logger.info(
+                "Profiled %s %s (%.1f ms, %d samples): %s",
+                scope["method"], scope["path"], (time.perf_counter() - start) * 1000, profiler.samples, name
+            )
+
+class MemoryProfiler:
+    """tracemalloc snapshots (at most ``max_snapshots`` kept) and diffs between them"""
+
+    def __init__(self, frames: int = 10, max_snapshots: int = 5):
+        self.frames = frames
+        self.max_snapshots = max_snapshots
+        self.snapshots: "OrderedDict[int, tracemalloc.Snapshot]" = OrderedDict()
+        self._next_id = 1
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self) -> None:
+        """Start tracing allocations (slows the worker and costs memory until stopped)"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+
+    def stop(self) -> None:
+        """Stop tracing and drop the snapshots"""
+        tracemalloc.stop()
+        self.snapshots.clear()
+
+    def snapshot(self, limit: int = 10) -> dict:
+        """Take a snapshot; returns its id and largest allocation sites"""
+        if not tracemalloc.is_tracing():
+            raise ValueError("Memory tracing is not started")
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+        snapshot_id = self._next_id
+        self._next_id += 1
+        self.snapshots[snapshot_id] = snapshot
+        while len(self.snapshots) > self.max_snapshots:
+            self.snapshots.popitem(last=False)
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "id": snapshot_id,
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            "top": [{
+                "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                "size": stat.size,
+                "count": stat.count,
+            } for stat in snapshot.statistics("lineno")[:limit]],
+        }
+
+    def diff(self, base_id: int, target_id: Optional[int] = None, limit: int = 10, traceback: bool = False) -> List[dict]:
+        """
+        Allocation sites that grew most from snapshot ``base_id`` to ``target_id`` (default: latest)
+
+        With ``traceback`` sites are compared by their full (PROFILING_TRACEMALLOC_FRAMES deep) stack.
+        """
+        if target_id is None and self.snapshots:
+            target_id = next(reversed(self.snapshots))
+        for snapshot_id in (base_id, target_id):
+            if snapshot_id not in self.snapshots:
+                raise KeyError(f"Unknown snapshot: {snapshot_id}")
+        stats = self.snapshots[target_id].compare_to(
+            self.snapshots[base_id], "traceback" if traceback else "lineno"
+        )
+        return [{
+            "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            "size_diff": stat.size_diff,
+            "count_diff": stat.count_diff,
+            "size": stat.size,
+            **({"traceback": stat.traceback.format()} if traceback else {}),
+        } for stat in stats[:limit]]
+
+    def stats(self) -> dict:
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "tracing": self.tracing,
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            "snapshots": list(self.snapshots),
+        }
+
+profile_store = ProfileStore(
+    settings.PROFILING_OUTPUT_DIR, settings.PROFILING_MAX_FILES, settings.PROFILING_INTERVAL_MS / 1000
+)
+memory_profiler = MemoryProfiler(settings.PROFILING_TRACEMALLOC_FRAMES)
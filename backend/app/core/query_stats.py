@@ -0,0 +1,142 @@
+"""
+Per-request SQL statistics
+
+Engine hooks count the statements each request sends and the time spent in
+them; the request is found through a context variable set by
+QueryStatsMiddleware (async endpoints run in the request's task, sync ones
+in a thread with a copy of its context). Per request the totals go into a
+Server-Timing header and the db_queries_per_request /
+db_time_per_request_seconds histograms. Statements slower than
+DB_SLOW_QUERY_MS are logged with the shape of their parameters (types,
+never values), and a statement repeated DB_REPEATED_QUERY_WARN_THRESHOLD
+times within one request, the usual sign of an N+1 loop, is logged too.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, Optional
+import logging
+import time
+from app.core.config import settings
+from app.core.metrics import (
+    db_queries_per_request,
+    db_time_per_request_seconds,
+    scope_route_template,
+)
+
+logger = logging.getLogger(__name__)
+
+@dataclass(slots=True)
+class QueryStats:
+    """SQL statements sent on behalf of one request"""
+    count: int = 0
+    duration: float = 0.0
+    # statement -> executions, to spot N+1 loops
+    statements: Dict[str, int] = field(default_factory=dict)
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.count += 1
+        self.duration += elapsed
+        self.statements[statement] = self.statements.get(statement, 0) + 1
+
+    def repeated(self, threshold: int) -> Dict[str, int]:
+        """Statements executed at least ``threshold`` times"""
+        return {statement: count for statement, count in self.statements.items() if count >= threshold}
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.duration * 1000:.3f};desc="{self.count} queries"'
+
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("current_query_stats", default=None)
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Collect the statements executed within the block (and tasks/threads it starts)"""
+    stats = QueryStats()
+    token = current_query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        current_query_stats.reset(token)
+
+def parameter_shape(parameters, executemany: bool = False) -> str:
+    """Types of bound parameters, e.g. ``(UUID, str)``, without their values"""
+    if executemany:
+        rows = list(parameters or ())
+        return f"{len(rows)} x {parameter_shape(rows[0])}" if rows else "[]"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(type(value).__name__ for value in parameters) + ")"
+    return type(parameters).__name__
+
+def instrument_queries(engine) -> None:
+    """Attribute the statements of a (sync) SQLAlchemy engine to requests and log slow ones"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("request_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["request_query_start"].pop()
+        stats = current_query_stats.get()
+        if stats is not None:
+            stats.record(statement, elapsed)
+        if settings.DB_SLOW_QUERY_MS and elapsed * 1000 >= settings.DB_SLOW_QUERY_MS:
+            logger.warning(
+                "Slow query (%.1f ms): %s parameters=%s",
+                elapsed * 1000, " ".join(statement.split()), parameter_shape(parameters, executemany)
+            )
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("request_query_start"):
+            connection.info["request_query_start"].pop()
+
+class QueryStatsMiddleware:
+    """
+    ASGI middleware collecting the SQL statistics of each request
+
+    Adds ``Server-Timing: db;dur=<ms>;desc="<n> queries"`` (with
+    DB_SERVER_TIMING; only statements run before the response starts are
+    included) and records the totals per route template when metrics are
+    enabled.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and settings.DB_SERVER_TIMING:
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", stats.server_timing().encode())
+                ]
+            await send(message)
+
+        with track_queries() as stats:
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                self._record(scope, stats)
+
+    def _record(self, scope, stats: QueryStats) -> None:
+        template = scope_route_template(scope)
+        method = scope["method"]
+        if settings.METRICS_ENABLED:
+            db_queries_per_request.observe(stats.count, method, template)
+            db_time_per_request_seconds.observe(stats.duration, method, template)
+        threshold = settings.DB_REPEATED_QUERY_WARN_THRESHOLD
+        if threshold:
+            for statement, count in stats.repeated(threshold).items():
+                logger.warning(
+                    "Possible N+1: statement executed %d times in %s %s: %s",
+                    count, method, template, " ".join(statement.split())
+                )
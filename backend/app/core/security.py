@@ -1,41 +1,116 @@
-from datetime import datetime, timedelta
-from typing import Optional, Union
-from jose import JWTError, jwt
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Callable, NamedTuple, Optional, Tuple, Type
 from passlib.context import CryptContext
+from app.core.cache import TTLCache
 from app.core.config import settings
+import hashlib
+import time
+import uuid
 
 # Password hashing context
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+@dataclass(frozen=True, slots=True)
+class TokenClaims:
+    """Verified JWT claims"""
+    sub: uuid.UUID
+    type: str
+    exp: int
+    firebase_uid: Optional[str] = None
+    jti: Optional[str] = None
+    sid: Optional[uuid.UUID] = None  # session (refresh token family)
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    """The authenticated user as needed by most routes (see get_current_user)"""
+    id: uuid.UUID
+    firebase_uid: str
+    is_active: bool
+    profile_completed: bool
+
+class JWTBackend(NamedTuple):
+    """encode/decode functions of a JWT library and the error its decode raises"""
+    name: str
+    encode: Callable[..., str]
+    decode: Callable[..., dict]
+    error: Tuple[Type[Exception], ...]
+
+def get_jwt_backend(name: str) -> JWTBackend:
+    """Load the JWT library selected by JWT_BACKEND ("jose" or "pyjwt")"""
+    if name == "jose":
+        from jose import JWTError, jwt
+        return JWTBackend("jose", jwt.encode, jwt.decode, (JWTError,))
+    if name == "pyjwt":
+        import jwt
+        return JWTBackend("pyjwt", jwt.encode, jwt.decode, (jwt.PyJWTError,))
+    raise ValueError(f"Unknown JWT backend: {name}")
+
+jwt_backend = get_jwt_backend(settings.JWT_BACKEND)
+
+# Successfully decoded tokens by SHA-256 digest, each kept until its exp
+decoded_token_cache = TTLCache(
+    max_size=settings.JWT_DECODE_CACHE_SIZE,
+    ttl_seconds=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+)
+
+def use_jwt_backend(name: str) -> None:
+    """Switch the JWT library at runtime (drops cached decodes)"""
+    global jwt_backend
+    jwt_backend = get_jwt_backend(name)
+    decoded_token_cache.clear()
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create JWT access token"""
     to_encode = data.copy()
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire = int(time.time() + expires_delta.total_seconds())
     else:
-        expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    
-    to_encode.update({"exp": expire, "type": "access"})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+        expire = int(time.time()) + settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+
+    to_encode.update({"exp": expire, "type": "access", "jti": uuid.uuid4().hex})
+    encoded_jwt = jwt_backend.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
 def create_refresh_token(data: dict) -> str:
     """Create JWT refresh token"""
     to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode.update({"exp": expire, "type": "refresh"})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    expire = int(time.time()) + settings.REFRESH_TOKEN_EXPIRE_DAYS * 86400
+    to_encode.update({"exp": expire, "type": "refresh", "jti": uuid.uuid4().hex})
+    encoded_jwt = jwt_backend.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str, token_type: str = "access") -> Optional[dict]:
-    """Verify JWT token and return payload"""
+def decode_token(token: str) -> Optional[TokenClaims]:
+    """Verify a JWT of any type, serving repeat verifications from the cache"""
+    key = hashlib.sha256(token.encode()).digest()
+    claims = decoded_token_cache.get(key)
+    if claims is not None:
+        return claims
+
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        if payload.get("type") != token_type:
-            return None
-        return payload
-    except JWTError:
+        payload = jwt_backend.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        claims = TokenClaims(
+            sub=uuid.UUID(payload["sub"]),
+            type=payload.get("type"),
+            exp=int(payload["exp"]),
+            firebase_uid=payload.get("firebase_uid"),
+            jti=payload.get("jti"),
+            sid=uuid.UUID(payload["sid"]) if payload.get("sid") else None
+        )
+    except jwt_backend.error:
+        return None
+    except (KeyError, TypeError, ValueError):
+        return None
+
+    decoded_token_cache.set(key, claims, ttl=claims.exp - time.time())
+    return claims
+
+def verify_token(token: str, token_type: str = "access") -> Optional[TokenClaims]:
+    """Verify JWT token and return its claims"""
+    claims = decode_token(token)
+    if claims is None or claims.type != token_type:
         return None
+    return claims
 
 def hash_password(password: str) -> str:
     """Hash password"""
@@ -0,0 +1,66 @@
+"""
+Response serialization
+
+With a response_model FastAPI validates whatever the endpoint returns
+against the model (``from_attributes`` for ORM rows) before serializing
+it, and with any response class other than its default it goes through
+jsonable_encoder and json.dumps, which is several times slower than
+Pydantic's own JSON serializer.
+
+With FAST_RESPONSES enabled the hot endpoints render their payload here:
+model instances (already validated) are dumped with precompiled
+TypeAdapters, ORM rows straight from their column attributes with orjson,
+skipping validation of data that came from our own database. Routes
+without a response model (plain dicts) are rendered with orjson.
+"""
+
+from operator import attrgetter
+from typing import Any, Type
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, TypeAdapter
+from app.core.config import settings
+from app.schemas.auth import AuthResponse
+from app.schemas.user import UserListResponse, UserProfile, UserResponse
+
+try:
+    import orjson
+except ImportError:  # Only required with FAST_RESPONSES
+    orjson = None
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson (handles datetime and UUID natively)"""
+
+    def render(self, content: Any) -> bytes:
+        assert orjson is not None, "orjson must be installed to enable FAST_RESPONSES"
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+
+# Serializers compiled once at import instead of per route / per call
+RESPONSE_MODELS = (UserResponse, UserProfile, AuthResponse, UserListResponse)
+RESPONSE_ADAPTERS = {model: TypeAdapter(model) for model in RESPONSE_MODELS}
+_FIELDS = {model: tuple(model.model_fields) for model in RESPONSE_MODELS}
+_FIELD_GETTERS = {model: attrgetter(*fields) for model, fields in _FIELDS.items()}
+
+def dump_trusted(model: Type[BaseModel], source: Any) -> bytes:
+    """
+    JSON for ``source`` declared as ``model``, without validating it
+
+    ``source`` is either a ``model`` instance or an object (ORM row, other
+    schema) with one attribute per field; only pass data read from the database or
+    built by our own code. The output matches Pydantic's dump_json.
+    """
+    if isinstance(source, model):
+        return RESPONSE_ADAPTERS[model].dump_json(source)
+    values = dict(zip(_FIELDS[model], _FIELD_GETTERS[model](source)))
+    return orjson.dumps(values, option=orjson.OPT_UTC_Z)
+
+def render(model: Type[BaseModel], source: Any, status_code: int = 200) -> Any:
+    """
+    Endpoint return value for trusted ``source`` declared as ``model``
+
+    Returns ``source`` unchanged (FastAPI validates and serializes it
+    against the route's response_model) unless FAST_RESPONSES is enabled,
+    in which case it is rendered here into a ready JSON Response.
+    """
+    if not settings.FAST_RESPONSES:
+        return source
+    return Response(content=dump_trusted(model, source), status_code=status_code, media_type="application/json")
@@ -0,0 +1,32 @@
+import asyncio
+from typing import Awaitable, Callable, Optional
+
+class BackgroundTask:
+    """
+    The background task of a long-lived service
+
+    start() runs ``coroutine_function`` on the running event loop unless it
+    is already running; stop() cancels it and waits for it to finish. Both
+    are idempotent, so services call them from their own start()/aclose().
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, coroutine_function: Callable[[], Awaitable]) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(coroutine_function(), name=self.name)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,453 @@
+"""
+Request tracing
+
+A small in-process tracer producing OpenTelemetry-compatible spans: W3C
+trace context (``traceparent``) is read from incoming requests and added
+to outgoing provider calls, and spans are exported as OTLP/HTTP JSON, so
+any OpenTelemetry collector or backend can receive them. A JSON-lines file
+and an in-memory exporter work offline.
+
+Spans cover the HTTP request (TracingMiddleware), every SQL statement
+(instrument_tracing), SMS sends and Firebase token verification. A trace
+is sampled when the request starts, following the sampled flag of an
+incoming traceparent or else TRACING_SAMPLE_RATIO. Unsampled requests set
+no current span, and every other instrumentation point then reduces to one
+context variable lookup; with TRACING_ENABLED off the middleware and
+engine hooks are not installed at all.
+"""
+
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, List, Optional
+import asyncio
+import json
+import logging
+import random
+import re
+import time
+from app.core.config import settings
+from app.core.metrics import scope_route_template, statement_operation
+from app.core.tasks import BackgroundTask
+
+logger = logging.getLogger(__name__)
+
+# Span kinds and status codes as numbered in OTLP
+SPAN_KINDS = {"internal": 1, "server": 2, "client": 3, "producer": 4, "consumer": 5}
+STATUS_CODES = {"unset": 0, "ok": 1, "error": 2}
+
+TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+MAX_STATEMENT_LENGTH = 2000
+
+class Span:
+    """One timed operation of a trace"""
+
+    __slots__ = (
+        "tracer", "name", "kind", "trace_id", "span_id", "parent_id",
+        "start_ns", "end_ns", "attributes", "status", "status_message"
+    )
+
+    def __init__(self, tracer: "Tracer", name: str, kind: str, trace_id: str, parent_id: Optional[str],
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.tracer = tracer
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64) or 1:016x}"
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = dict(attributes) if attributes else {}
+        self.status = "unset"
+        self.status_message = ""
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_error(self, error: BaseException) -> None:
+        self.status = "error"
+        self.status_message = f"{type(error).__name__}: {error}"
+
+    def end(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            self.tracer._on_end(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "attributes": self.attributes,
+            "status": {"code": self.status, "message": self.status_message},
+        }
+
+current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+class _SpanScope:
+    """``with tracer.span(...)``: a child of the current span, made current within the block"""
+
+    __slots__ = ("name", "kind", "parent", "attributes", "span", "token")
+
+    def __init__(self, name: str, kind: str, parent: Span, attributes: Optional[Dict[str, Any]]):
+        self.name = name
+        self.kind = kind
+        self.parent = parent
+        self.attributes = attributes
+
+    def __enter__(self) -> Span:
+        self.span = Span(self.parent.tracer, self.name, self.kind, self.parent.trace_id, self.parent.span_id, self.attributes)
+        self.token = current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        current_span.reset(self.token)
+        if exc is not None and not isinstance(exc, asyncio.CancelledError):
+            self.span.record_error(exc)
+        self.span.end()
+
+class _UseSpan:
+    __slots__ = ("span", "token")
+
+    def __init__(self, span: Span):
+        self.span = span
+
+    def __enter__(self) -> Span:
+        self.token = current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        current_span.reset(self.token)
+
+class _NoopScope:
+    """Returned outside sampled traces: entering and leaving it does nothing"""
+
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        return None
+
+NOOP_SCOPE = _NoopScope()
+
+class InMemoryExporter:
+    """Keeps the last ``max_spans`` exported spans (tests, local debugging)"""
+
+    def __init__(self, max_spans: int = 10000):
+        self.spans = deque(maxlen=max_spans)
+
+    async def export(self, spans: List[Span]) -> None:
+        self.spans.extend(spans)
+
+    async def aclose(self) -> None:
+        pass
+
+class FileExporter:
+    """Appends spans to a JSON-lines file, one span per line"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _write(self, lines: List[str]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.writelines(lines)
+
+    async def export(self, spans: List[Span]) -> None:
+        lines = [json.dumps(span.to_dict(), default=str) + "\n" for span in spans]
+        await asyncio.to_thread(self._write, lines)
+
+    async def aclose(self) -> None:
+        pass
+
+def _otlp_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+def otlp_payload(spans: Iterable[Span], service_name: str) -> dict:
+    """An OTLP ExportTraceServiceRequest in its JSON encoding"""
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+        "scopeSpans": [{
+            "scope": {"name": "app.core.tracing"},
+            "spans": [{
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                "parentSpanId": span.parent_id or "",
+                "name": span.name,
+                "kind": SPAN_KINDS[span.kind],
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in span.attributes.items()],
+                "status": {"code": STATUS_CODES[span.status], "message": span.status_message},
+            } for span in spans],
+        }],
+    }]}
+
+class OTLPExporter:
+    """Sends spans to an OpenTelemetry collector over OTLP/HTTP (JSON encoding)"""
+
+    def __init__(self, endpoint: str, service_name: str, transport=None):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+        self._transport = transport
+        self._client = None
+
+    async def export(self, spans: List[Span]) -> None:
+        if self._client is None:
+            import httpx
+            self._client = httpx.AsyncClient(transport=self._transport, timeout=10.0)
+        response = await self._client.post(self.url, json=otlp_payload(spans, self.service_name))
+        response.raise_for_status()
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+class Tracer:
+    """
+    Creates spans and exports finished ones in batches
+
+    Finished spans are queued (at most ``max_queue_size``, further spans are
+    dropped and counted) and handed to the exporter every
+    ``export_interval_seconds`` by a background task, never on the request
+    path.
+    """
+
+    def __init__(
+        self,
+        exporter=None,
+        sample_ratio: float = 1.0,
+        export_interval_seconds: float = 5.0,
+        max_queue_size: int = 2048
+    ):
+        self.exporter = exporter if exporter is not None else InMemoryExporter()
+        self.sample_ratio = sample_ratio
+        self._sample_threshold = int(max(0.0, min(1.0, sample_ratio)) * (1 << 64))
+        self.export_interval_seconds = export_interval_seconds
+        self.max_queue_size = max_queue_size
+        self._pending: deque = deque()
+        self._task = BackgroundTask("trace-export")
+        self.exported = 0
+        self.dropped = 0
+
+    def should_sample(self, trace_id: str) -> bool:
+        """Ratio sampling on the trace id, so all services agree on a trace"""
+        return int(trace_id[16:], 16) < self._sample_threshold
+
+    def start_trace(self, name: str, kind: str = "server", traceparent: Optional[str] = None,
+                    attributes: Optional[Dict[str, Any]] = None) -> Optional[Span]:
+        """
+        Start the root span of a request, continuing an incoming W3C trace
+
+        Returns None when the trace is not sampled.
+        """
+        match = TRACEPARENT_RE.match(traceparent.strip().lower()) if traceparent else None
+        if match and match.group(1) != "0" * 32 and match.group(2) != "0" * 16:
+            if not int(match.group(3), 16) & 1:
+                return None
+            trace_id, parent_id = match.group(1), match.group(2)
+        else:
+            trace_id, parent_id = f"{random.getrandbits(128) or 1:032x}", None
+            if not self.should_sample(trace_id):
+                return None
+        return Span(self, name, kind, trace_id, parent_id, attributes)
+
+    @staticmethod
+    def span(name: str, kind: str = "internal", attributes: Optional[Dict[str, Any]] = None):
+        """
+        Context manager for a child of the current span, current within the block
+
+        Does nothing outside a sampled trace. Child spans are exported by the
+        tracer that started their trace.
+        """
+        parent = current_span.get()
+        if parent is None:
+            return NOOP_SCOPE
+        return _SpanScope(name, kind, parent, attributes)
+
+    @staticmethod
+    def start_span(name: str, kind: str = "internal",
+                   attributes: Optional[Dict[str, Any]] = None) -> Optional[Span]:
+        """Start a child of the current span without making it current (end it yourself)"""
+        parent = current_span.get()
+        if parent is None:
+            return None
+        return Span(parent.tracer, name, kind, parent.trace_id, parent.span_id, attributes)
+
+    @staticmethod
+    def use_span(span: Optional[Span]):
+        """Make ``span`` current within the block, e.g. to continue a trace in a worker task"""
+        return _UseSpan(span) if span is not None else NOOP_SCOPE
+
+    @staticmethod
+    def inject(headers: Dict[str, str]) -> Dict[str, str]:
+        """Add the traceparent of the current span to outgoing request headers"""
+        span = current_span.get()
+        if span is not None:
+            headers["traceparent"] = span.traceparent
+        return headers
+
+    def _on_end(self, span: Span) -> None:
+        if len(self._pending) >= self.max_queue_size:
+            self.dropped += 1
+            return
+        self._pending.append(span)
+
+    async def flush(self) -> int:
+        """Export the queued spans now; returns how many were exported"""
+        exported = 0
+        while self._pending:
+            batch = [self._pending.popleft() for _ in range(min(len(self._pending), 512))]
+            try:
+                await self.exporter.export(batch)
+            except Exception as e:
+                self.dropped += len(batch)
+                logger.warning("Exporting %d spans failed: %s", len(batch), e)
+                continue
+            exported += len(batch)
+        self.exported += exported
+        return exported
+
+    async def _export_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.export_interval_seconds)
+            await self.flush()
+
+    def start(self) -> None:
+        """Start exporting in the background"""
+        self._task.start(self._export_loop)
+
+    async def aclose(self) -> None:
+        """Stop the export task and flush what is left"""
+        await self._task.stop()
+        await self.flush()
+        await self.exporter.aclose()
+
+    def stats(self) -> dict:
+        return {
+            "sample_ratio": self.sample_ratio,
+            "pending": len(self._pending),
+            "exported": self.exported,
+            "dropped": self.dropped,
+        }
+
+def get_tracer(exporter: Optional[str] = None) -> Tracer:
+    """Create the tracer configured by the TRACING_* settings"""
+    exporter = exporter or settings.TRACING_EXPORTER
+    if exporter == "otlp":
+        backend = OTLPExporter(settings.TRACING_OTLP_ENDPOINT, settings.TRACING_SERVICE_NAME)
+    elif exporter == "file":
+        backend = FileExporter(settings.TRACING_FILE_PATH)
+    elif exporter == "memory":
+        backend = InMemoryExporter()
+    else:
+        raise ValueError(f"Unknown tracing exporter: {exporter}")
+    return Tracer(
+        backend,
+        sample_ratio=settings.TRACING_SAMPLE_RATIO,
+        export_interval_seconds=settings.TRACING_EXPORT_INTERVAL_SECONDS,
+        max_queue_size=settings.TRACING_MAX_QUEUE_SIZE
+    )
+
+tracer = get_tracer()
+
+def instrument_tracing(engine) -> None:
+    """A client span per SQL statement of a (sync) SQLAlchemy engine, within sampled traces"""
+    from sqlalchemy import event
+    system = engine.dialect.name
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if current_span.get() is None:
+            return
+        operation = statement_operation(statement)
+        conn.info["trace_span"] = tracer.start_span(operation, "client", {
+            "db.system": system,
+            "db.operation": operation,
+            "db.statement": statement[:MAX_STATEMENT_LENGTH],
+        })
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        span = conn.info.pop("trace_span", None)
+        if span is not None:
+            span.end()
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        connection = exception_context.connection
+        span = connection.info.pop("trace_span", None) if connection is not None else None
+        if span is not None:
+            span.record_error(exception_context.original_exception)
+            span.end()
+
+class TracingMiddleware:
+    """
+    ASGI middleware starting a server span per HTTP request
+
+    The span is named after the matched route template
+    (``POST /api/v1/auth/google/login``) and records the status code;
+    5xx responses and unhandled exceptions mark it as an error.
+    """
+
+    def __init__(self, app, tracer: Optional[Tracer] = None):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for key, value in scope.get("headers", ()):
+            if key == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+        method = scope["method"]
+        span = (self.tracer or tracer).start_trace(method, "server", traceparent, {
+            "http.request.method": method,
+            "url.path": scope["path"],
+        })
+        if span is None:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        token = current_span.set(span)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            span.record_error(e)
+            raise
+        finally:
+            current_span.reset(token)
+            template = scope_route_template(scope)
+            span.name = f"{method} {template}"
+            span.set_attribute("http.route", template)
+            span.set_attribute("http.response.status_code", status_code)
+            if status_code >= 500 and span.status != "error":
+                span.status = "error"
+            span.end()
@@ -1,53 +1,62 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from app.core.database import get_db
-from app.core.security import verify_token
-from app.services.user_service import user_service
-from app.models.user import User
-import uuid
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from app.core.config import settings
+from app.core.database import get_async_db
+from app.core.metrics import rate_limited_requests_total
+from app.core.security import Principal, TokenClaims, verify_token
+from app.services.rate_limiter import rate_limiter
+from app.services.token_denylist import token_denylist
+from app.services.user_service import async_user_service
+from app.schemas.user import UserResponse
+import math
+import secrets
 
 # Security scheme
 security = HTTPBearer()
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
+async def get_token_claims(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> TokenClaims:
     """
-    Get current authenticated user
-    """
-    token = credentials.credentials
+    Verify the bearer access token and return its claims
     
-    # Verify token
-    payload = verify_token(token, "access")
-    if not payload:
+    Revoked (logged out) tokens and tokens of revoked sessions are rejected
+    from the in-process denylist, without a network round trip.
+    """
+    claims = verify_token(credentials.credentials, "access")
+    if not claims:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
-    # Get user ID from token
-    user_id_str = payload.get("sub")
-    if not user_id_str:
+    if token_denylist.is_revoked(claims.jti):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token payload",
+            detail="Token has been revoked",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
-    try:
-        user_id = uuid.UUID(user_id_str)
-    except ValueError:
+    if token_denylist.is_session_revoked(claims.sid):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid user ID in token",
+            detail="Session has been revoked",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    return claims
+
+async def get_current_user(
+    claims: TokenClaims = Depends(get_token_claims),
+    db: AsyncSession = Depends(get_async_db)
+) -> Principal:
+    """
+    Get current authenticated user
     
-    # Get user from database
-    user = user_service.get_user_by_id(db, user_id)
+    Returns a Principal (id, firebase_uid, is_active, profile_completed);
+    routes that need the full profile use get_current_user_profile.
+    """
+    user = await async_user_service.get_cached_principal(db, claims.sub)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -64,17 +73,36 @@ def get_current_user(
     
     return user
 
-def get_current_active_user(
-    current_user: User = Depends(get_current_user)
-) -> User:
+async def get_current_user_profile(
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+) -> UserResponse:
+    """
+    Get the profile of the current authenticated user
+    
+    Served from the profile cache, so with a cached principal too the
+    request needs no query at all.
+    """
+    user = await async_user_service.get_cached_profile(db, current_user.id)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
+
+async def get_current_active_user(
+    current_user: Principal = Depends(get_current_user)
+) -> Principal:
     """
     Get current active user (alias for get_current_user since we already check is_active)
     """
     return current_user
 
-def require_completed_profile(
-    current_user: User = Depends(get_current_user)
-) -> User:
+async def require_completed_profile(
+    current_user: Principal = Depends(get_current_user)
+) -> Principal:
     """
     Require user to have completed profile
     """
@@ -84,3 +112,49 @@ def require_completed_profile(
             detail="Profile must be completed to access this resource"
         )
     return current_user
+
+async def require_admin(x_admin_key: Optional[str] = Header(None)) -> None:
+    """
+    Require the admin API key in the X-Admin-Key header
+    
+    Admin endpoints are disabled (403) while ADMIN_API_KEY is not configured.
+    """
+    if not settings.ADMIN_API_KEY:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin API is disabled"
+        )
+    if not x_admin_key or not secrets.compare_digest(x_admin_key, settings.ADMIN_API_KEY):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid admin key"
+        )
+
+def otp_rate_limits(action: str) -> tuple:
+    """(per phone, per client IP) limits of an OTP endpoint"""
+    if action == "send_otp":
+        return settings.OTP_SEND_LIMIT_PER_PHONE, settings.OTP_SEND_LIMIT_PER_IP
+    return settings.OTP_VERIFY_LIMIT_PER_PHONE, settings.OTP_VERIFY_LIMIT_PER_IP
+
+async def limit_otp_requests(action: str, phone_number: str, request: Request) -> None:
+    """
+    Count a phone OTP request against its per-phone and per-IP limits
+    
+    Raises 429 with Retry-After once either limit is exhausted.
+    """
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+    phone_limit, ip_limit = otp_rate_limits(action)
+    window = settings.OTP_RATE_LIMIT_WINDOW_SECONDS
+    client_ip = request.client.host if request.client else "unknown"
+    retry_after = await rate_limiter.hit((
+        (f"{action}:phone:{phone_number}", phone_limit, window),
+        (f"{action}:ip:{client_ip}", ip_limit, window),
+    ))
+    if retry_after:
+        rate_limited_requests_total.inc(action)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests. Please try again later.",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
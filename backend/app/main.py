@@ -1,7 +1,40 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from app.core.config import settings
+from app.core.metrics import MetricsMiddleware, registry
+from app.core.query_stats import QueryStatsMiddleware
+from app.core.serialization import ORJSONResponse
+from app.core.tracing import TracingMiddleware, tracer
 from app.api.router import api_router
+from app.services.firebase_service import firebase_service
+from app.services.session_service import session_service
+from app.services.token_denylist import token_denylist
+from app.services.twilio_service import twilio_service
+from app.warmup import warmup
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup and shutdown"""
+    if settings.TRACING_ENABLED:
+        tracer.start()
+    # Providers are built here (on first use), not when the app is imported
+    twilio_service.start()
+    firebase_service.start()
+    token_denylist.start()
+    session_service.start()
+    # Readiness (/health/ready) waits for this
+    warmup.start()
+    yield
+    await warmup.aclose()
+    await session_service.aclose()
+    await token_denylist.aclose()
+    # Flush queued SMS and release pooled provider connections
+    await twilio_service.aclose()
+    await firebase_service.aclose()
+    # Export the spans still queued
+    await tracer.aclose()
 
 # Create FastAPI instance with comprehensive metadata
 app = FastAPI(
@@ -45,7 +78,9 @@ app = FastAPI(
     """,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse if settings.FAST_RESPONSES else JSONResponse,
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -57,6 +92,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request profiling (sampled, or on request with X-Profile and X-Admin-Key)
+if settings.PROFILING_ENABLED and (settings.PROFILING_SAMPLE_RATE > 0 or settings.ADMIN_API_KEY):
+    from app.core.profiling import ProfilingMiddleware
+    app.add_middleware(ProfilingMiddleware)
+
+# Per-request SQL statistics (Server-Timing, per-route query metrics, N+1 log)
+if settings.DB_SERVER_TIMING or settings.METRICS_ENABLED or settings.DB_REPEATED_QUERY_WARN_THRESHOLD:
+    app.add_middleware(QueryStatsMiddleware)
+
+# Request tracing (server span per request, W3C traceparent propagation)
+if settings.TRACING_ENABLED:
+    app.add_middleware(TracingMiddleware)
+
+# Request metrics (outermost, so latency includes all other middleware)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # Include API router
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
@@ -83,6 +135,17 @@ def root_health_check():
     """
     return {"status": "healthy", "service": "Imaro Phase 1 API"}
 
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", tags=["health"], response_class=PlainTextResponse)
+    def metrics():
+        """
+        Prometheus metrics endpoint
+        
+        Exposes request, database pool/query and external provider metrics
+        of this worker in the Prometheus text format.
+        """
+        return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
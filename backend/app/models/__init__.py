@@ -6,5 +6,6 @@ Contains SQLAlchemy models for all database entities.
 
 from .base import Base
 from .user import User
+from .auth_session import AuthSession
 
-__all__ = ["Base", "User"]
\ No newline at end of file
+__all__ = ["Base", "User", "AuthSession"]
\ No newline at end of file
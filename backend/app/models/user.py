@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Boolean, DateTime, CheckConstraint
+from sqlalchemy import Column, String, Integer, Boolean, DateTime, CheckConstraint, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 import uuid
@@ -13,7 +13,7 @@ class User(Base):
     
     # Profile data
     phone_number = Column(String(20), unique=True, nullable=True)
-    email = Column(String(255), nullable=True, index=True)
+    email = Column(String(255), nullable=True)
     first_name = Column(String(50), nullable=False)
     last_name = Column(String(50), nullable=False)
     age = Column(Integer, nullable=True)
@@ -54,4 +54,12 @@ class User(Base):
             "(auth_method = 'google' AND email IS NOT NULL) OR (auth_method = 'phone')",
             name="email_required_for_google_auth"
         ),
+        # Keyset pagination of the admin user listing
+        Index("ix_users_created_at_id", "created_at", "id"),
+        # Case-insensitive email lookups
+        Index("ix_users_email_lower", func.lower(email)),
+        # Per-country reports and the country-filtered listing
+        Index("ix_users_country_created_at_id", "country", "created_at", "id"),
+        # Index-only principal lookups (id -> firebase_uid, is_active, profile_completed)
+        Index("ix_users_principal", "id", postgresql_include=["firebase_uid", "is_active", "profile_completed"]),
     )
@@ -19,6 +19,7 @@ from .user import (
     UserCreate,
     UserUpdate,
     UserResponse,
+    UserListResponse,
     UserProfile
 )
 
@@ -36,5 +37,6 @@ __all__ = [
     "UserCreate",
     "UserUpdate", 
     "UserResponse",
+    "UserListResponse",
     "UserProfile"
 ]
\ No newline at end of file
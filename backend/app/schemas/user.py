@@ -1,5 +1,5 @@
 from pydantic import BaseModel, validator
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 import uuid
 
@@ -77,6 +77,10 @@ class UserResponse(UserBase):
     class Config:
         from_attributes = True
 
+class UserListResponse(BaseModel):
+    items: List[UserResponse]
+    next_cursor: Optional[str] = None  # Pass as ?cursor= for the next page; None on the last page
+
 class UserProfile(BaseModel):
     id: uuid.UUID
     first_name: str
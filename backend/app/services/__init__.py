@@ -2,11 +2,23 @@
 Business logic services for Imaro Backend
 
 Contains service classes that handle business logic and external integrations.
+The service instances below are imported on first access, so that importing
+one service module does not load the others (and their provider SDKs).
 """
 
-from .auth_service import auth_service
-from .user_service import user_service
-from .firebase_service import firebase_service
-from .twilio_service import twilio_service
+from importlib import import_module
 
-__all__ = ["auth_service", "user_service", "firebase_service", "twilio_service"]
\ No newline at end of file
+_SERVICES = {
+    "auth_service": ".auth_service",
+    "user_service": ".user_service",
+    "async_user_service": ".user_service",
+    "firebase_service": ".firebase_service",
+    "twilio_service": ".twilio_service",
+}
+
+__all__ = ["auth_service", "user_service", "async_user_service", "firebase_service", "twilio_service"]
+
+def __getattr__(name: str):
+    if name in _SERVICES:
+        return getattr(import_module(_SERVICES[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,9 +1,9 @@
-from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
-from app.core.security import create_access_token, create_refresh_token, verify_token
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.security import create_access_token, verify_token
 from app.services.firebase_service import firebase_service
+from app.services.session_service import session_service
 from app.services.twilio_service import twilio_service
-from app.services.user_service import user_service
+from app.services.user_service import async_user_service
 from app.schemas.user import UserCreate
 from app.schemas.auth import AuthResponse
 from app.core.config import settings
@@ -15,10 +15,10 @@ class AuthService:
         """Send OTP to phone number using Twilio"""
         return await twilio_service.send_otp_sms(phone_number)
     
-    async def verify_phone_otp(self, db: Session, phone_number: str, otp_code: str) -> AuthResponse:
+    async def verify_phone_otp(self, db: AsyncSession, phone_number: str, otp_code: str) -> AuthResponse:
         """Verify phone OTP and authenticate user"""
         # Verify OTP with Twilio service
-        verification_result = twilio_service.verify_otp(phone_number, otp_code)
+        verification_result = await twilio_service.verify_otp(phone_number, otp_code)
         
         if not verification_result["success"]:
             raise ValueError(verification_result["message"])
@@ -26,40 +26,21 @@ class AuthService:
         # Create a unique firebase_uid for phone users
         firebase_uid = f"phone_{phone_number.replace('+', '')}"
         
-        # Check if user exists
-        user = user_service.get_user_by_firebase_uid(db, firebase_uid)
-        
-        if not user:
-            # Create new user with minimal info
-            user_data = UserCreate(
-                firebase_uid=firebase_uid,
-                auth_method="phone",
-                phone_number=phone_number,
-                first_name="User",  # Temporary name until profile completion
-                last_name="Name",   # Temporary name until profile completion
-                country="USA",      # Default country until profile completion
-            )
-            user = user_service.create_user(db, user_data)
-            # Mark phone as verified since OTP was successful
-            user.is_phone_verified = True
-        
-        # Update last login
-        user.last_login_at = datetime.utcnow()
-        db.commit()
-        
-        # Generate tokens
-        access_token = create_access_token({"sub": str(user.id), "firebase_uid": firebase_uid})
-        refresh_token = create_refresh_token({"sub": str(user.id), "firebase_uid": firebase_uid})
-        
-        return AuthResponse(
-            access_token=access_token,
-            refresh_token=refresh_token,
-            user_id=str(user.id),
-            profile_completed=user.profile_completed,
-            expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        # Create the user with minimal info (phone verified since OTP was
+        # successful) or record the login of the existing one
+        user_data = UserCreate(
+            firebase_uid=firebase_uid,
+            auth_method="phone",
+            phone_number=phone_number,
+            first_name="User",  # Temporary name until profile completion
+            last_name="Name",   # Temporary name until profile completion
+            country="USA",      # Default country until profile completion
         )
+        user = await async_user_service.upsert_login(db, user_data)
+        
+        return await self._auth_response(db, user.id, firebase_uid, user.profile_completed)
     
-    async def google_login(self, db: Session, id_token: str) -> AuthResponse:
+    async def google_login(self, db: AsyncSession, id_token: str) -> AuthResponse:
         """Authenticate user with Google ID token"""
         # Verify Google token with Firebase
         verification_result = await firebase_service.verify_google_token(id_token)
@@ -71,68 +52,74 @@ class AuthService:
         email = verification_result["email"]
         name = verification_result.get("name", "")
         
-        # Check if user exists
-        user = user_service.get_user_by_firebase_uid(db, firebase_uid)
-        
-        if not user:
-            # Extract first and last name from Google name
-            name_parts = name.split() if name else ["", ""]
-            first_name = name_parts[0] if len(name_parts) > 0 else ""
-            last_name = " ".join(name_parts[1:]) if len(name_parts) > 1 else ""
-            
-            # Create new user
-            user_data = UserCreate(
-                firebase_uid=firebase_uid,
-                auth_method="google",
-                email=email,
-                first_name=first_name if first_name else "User",
-                last_name=last_name if last_name else "Name",
-                country="USA",  # Default until profile completion
-            )
-            user = user_service.create_user(db, user_data)
-        
-        # Update last login
-        user.last_login_at = datetime.utcnow()
-        if verification_result.get("email_verified"):
-            user.is_email_verified = True
-        db.commit()
+        # Extract first and last name from Google name (used for new users)
+        name_parts = name.split() if name else ["", ""]
+        first_name = name_parts[0] if len(name_parts) > 0 else ""
+        last_name = " ".join(name_parts[1:]) if len(name_parts) > 1 else ""
+        
+        # Create the user or record the login of the existing one
+        user_data = UserCreate(
+            firebase_uid=firebase_uid,
+            auth_method="google",
+            email=email,
+            first_name=first_name if first_name else "User",
+            last_name=last_name if last_name else "Name",
+            country="USA",  # Default until profile completion
+        )
+        user = await async_user_service.upsert_login(
+            db, user_data, email_verified=bool(verification_result.get("email_verified"))
+        )
         
-        # Generate tokens
-        access_token = create_access_token({"sub": str(user.id), "firebase_uid": firebase_uid})
-        refresh_token = create_refresh_token({"sub": str(user.id), "firebase_uid": firebase_uid})
+        return await self._auth_response(db, user.id, firebase_uid, user.profile_completed)
+    
+    async def _auth_response(self, db: AsyncSession, user_id: uuid.UUID, firebase_uid: str, profile_completed: bool) -> AuthResponse:
+        """Start a session and issue the token pair for a logged in user"""
+        session_id, refresh_token = await session_service.create(db, user_id, firebase_uid)
+        access_token = create_access_token(
+            {"sub": str(user_id), "firebase_uid": firebase_uid, "sid": str(session_id)}
+        )
         
         return AuthResponse(
             access_token=access_token,
             refresh_token=refresh_token,
-            user_id=str(user.id),
-            profile_completed=user.profile_completed,
+            user_id=str(user_id),
+            profile_completed=profile_completed,
             expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
         )
     
-    def refresh_access_token(self, refresh_token: str) -> dict:
-        """Refresh access token using refresh token"""
-        payload = verify_token(refresh_token, "refresh")
-        if not payload:
+    async def refresh_access_token(self, db: AsyncSession, refresh_token: str) -> dict:
+        """
+        Rotate a refresh token and issue a new access token
+        
+        The presented refresh token is spent: the response carries its
+        replacement, and presenting it again revokes the session.
+        """
+        claims = verify_token(refresh_token, "refresh")
+        if not claims or claims.sid is None:
             raise ValueError("Invalid refresh token")
         
-        user_id = payload.get("sub")
-        firebase_uid = payload.get("firebase_uid")
+        user = await async_user_service.get_cached_principal(db, claims.sub)
+        if not user or not user.is_active:
+            raise ValueError("User not found or deactivated")
         
-        # Generate new access token
-        access_token = create_access_token({"sub": user_id, "firebase_uid": firebase_uid})
+        new_refresh_token = await session_service.rotate(db, claims, refresh_token)
+        access_token = create_access_token(
+            {"sub": str(user.id), "firebase_uid": user.firebase_uid, "sid": str(claims.sid)}
+        )
         
         return {
             "access_token": access_token,
+            "refresh_token": new_refresh_token,
             "token_type": "bearer",
             "expires_in": settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
         }
     
     def get_current_user_id(self, token: str) -> str:
         """Get current user ID from access token"""
-        payload = verify_token(token, "access")
-        if not payload:
+        claims = verify_token(token, "access")
+        if not claims:
             raise ValueError("Invalid or expired token")
         
-        return payload.get("sub")
+        return str(claims.sub)
 
 auth_service = AuthService()
@@ -1,20 +1,172 @@
-import firebase_admin
-from firebase_admin import credentials, auth
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, Optional
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.core.lazy import LazyService
+from app.core.metrics import track_external_call
+from app.core.tasks import BackgroundTask
+from app.core.tracing import tracer
+import asyncio
+import base64
+import hashlib
+import json
+import logging
 import os
+import re
+import time
+
+# The Firebase Admin SDK, google-auth and httpx are imported on first use:
+# together they are a large share of the application's import time
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+# X.509 certificates Google signs Firebase ID tokens with
+GOOGLE_CERTS_URL = "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+
+class GoogleCertificateCache:
+    """
+    Google's ID token signing certificates, cached per Cache-Control max-age
+
+    A background task refreshes the certificates shortly before they expire
+    so that verification never fetches them on the request path; a cold or
+    stale cache is refreshed on demand as a fallback.
+    """
+    
+    REFRESH_MARGIN_SECONDS = 60
+    RETRY_DELAY_SECONDS = 30
+    DEFAULT_MAX_AGE_SECONDS = 3600
+    
+    def __init__(self, url: str = GOOGLE_CERTS_URL, transport: Optional["httpx.AsyncBaseTransport"] = None):
+        self.url = url
+        self._transport = transport
+        self._certs: Dict[str, str] = {}
+        self._expires_at = 0.0
+        self._last_forced_refresh = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop = None
+        self._refresh_task = BackgroundTask("google-cert-refresh")
+        self.refreshes = 0
+    
+    @property
+    def is_fresh(self) -> bool:
+        return bool(self._certs) and time.monotonic() < self._expires_at
+    
+    def set_certificates(self, certs: Dict[str, str], max_age: float) -> None:
+        """Install a certificate set valid for ``max_age`` seconds"""
+        self._certs = dict(certs)
+        self._expires_at = time.monotonic() + max_age
+    
+    async def refresh(self) -> None:
+        """Fetch the current certificates from Google"""
+        import httpx
+        with tracer.span("google.fetch_certificates", "client"), track_external_call("google", "fetch_certificates"):
+            async with httpx.AsyncClient(transport=self._transport, timeout=10.0) as client:
+                response = await client.get(self.url)
+                response.raise_for_status()
+        match = re.search(r"max-age=(\d+)", response.headers.get("cache-control", ""))
+        max_age = int(match.group(1)) if match else self.DEFAULT_MAX_AGE_SECONDS
+        self.set_certificates(response.json(), max_age)
+        self.refreshes += 1
+    
+    async def get_certificates(self, kid: Optional[str] = None) -> Dict[str, str]:
+        """Return the certificates, refreshing if stale or ``kid`` is unknown"""
+        unknown_kid = kid is not None and self._certs and kid not in self._certs
+        if self.is_fresh and not unknown_kid:
+            return self._certs
+        
+        # The cache outlives event loops (TestClient, the CLI), a lock does not
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock, self._lock_loop = asyncio.Lock(), loop
+        async with self._lock:
+            if not self.is_fresh:
+                await self.refresh()
+            elif unknown_kid and kid not in self._certs:
+                # Keys may have rotated early; at most one forced refresh per interval
+                if time.monotonic() - self._last_forced_refresh > self.RETRY_DELAY_SECONDS:
+                    self._last_forced_refresh = time.monotonic()
+                    await self.refresh()
+        return self._certs
+    
+    def start(self) -> None:
+        """Start background refreshing on the running event loop"""
+        self._refresh_task.start(self._refresh_loop)
+    
+    async def stop(self) -> None:
+        await self._refresh_task.stop()
+    
+    async def _refresh_loop(self) -> None:
+        while True:
+            try:
+                if not self._certs or self._expires_at - time.monotonic() <= self.REFRESH_MARGIN_SECONDS:
+                    await self.refresh()
+                delay = max(self.RETRY_DELAY_SECONDS, self._expires_at - time.monotonic() - self.REFRESH_MARGIN_SECONDS)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Refreshing Google certificates failed: %s", e)
+                delay = self.RETRY_DELAY_SECONDS
+            await asyncio.sleep(delay)
+
+def token_key_id(token: str) -> Optional[str]:
+    """Read the ``kid`` header of a JWT without verifying it"""
+    try:
+        header = token.split(".", 1)[0]
+        header += "=" * (-len(header) % 4)
+        return json.loads(base64.urlsafe_b64decode(header)).get("kid")
+    except (ValueError, AttributeError):
+        return None
+
+def decode_firebase_id_token(token: str, certs: Dict[str, str], project_id: str) -> dict:
+    """Verify signature, expiry, audience, issuer and subject of a Firebase ID token"""
+    from google.auth import jwt as google_jwt
+    claims = google_jwt.decode(
+        token,
+        certs=certs,
+        audience=project_id,
+        clock_skew_in_seconds=settings.FIREBASE_CLOCK_SKEW_SECONDS
+    )
+    if claims.get("iss") != f"https://securetoken.google.com/{project_id}":
+        raise ValueError("Token has an incorrect issuer")
+    subject = claims.get("sub")
+    if not isinstance(subject, str) or not subject or len(subject) > 128:
+        raise ValueError("Token has an invalid subject")
+    claims["uid"] = subject
+    return claims
 
 class FirebaseService:
     def __init__(self):
-        if not firebase_admin._apps:
-            # Initialize Firebase Admin SDK
-            if os.path.exists(settings.FIREBASE_CREDENTIALS_PATH):
-                cred = credentials.Certificate(settings.FIREBASE_CREDENTIALS_PATH)
-                firebase_admin.initialize_app(cred, {
-                    'projectId': settings.FIREBASE_PROJECT_ID,
-                })
-            else:
-                # For development/testing - you can also use environment variables
-                firebase_admin.initialize_app()
+        self.project_id = settings.FIREBASE_PROJECT_ID
+        self.certificates = GoogleCertificateCache()
+        # Signature checks are CPU-bound and run off the event loop
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Recently verified tokens by SHA-256 digest, so client retries skip re-verification
+        self.verified_tokens = TTLCache(
+            max_size=settings.FIREBASE_VERIFIED_TOKEN_CACHE_SIZE,
+            ttl_seconds=settings.FIREBASE_VERIFIED_TOKEN_TTL_SECONDS
+        )
+        self._admin_auth = None
+    
+    @property
+    def admin_auth(self):
+        """firebase_admin.auth, initializing the Admin SDK on first use"""
+        if self._admin_auth is None:
+            import firebase_admin
+            from firebase_admin import auth, credentials
+            if not firebase_admin._apps:
+                # Initialize Firebase Admin SDK
+                if os.path.exists(settings.FIREBASE_CREDENTIALS_PATH):
+                    cred = credentials.Certificate(settings.FIREBASE_CREDENTIALS_PATH)
+                    firebase_admin.initialize_app(cred, {
+                        'projectId': settings.FIREBASE_PROJECT_ID,
+                    })
+                else:
+                    # For development/testing - you can also use environment variables
+                    firebase_admin.initialize_app()
+            self._admin_auth = auth
+        return self._admin_auth
     
     async def send_verification_code(self, phone_number: str) -> dict:
         """
@@ -45,7 +197,7 @@ class FirebaseService:
             # For demo purposes, accept "123456" as valid OTP
             if otp_code == "123456":
                 # Create a custom token for this phone number
-                custom_token = auth.create_custom_token(phone_number.replace("+", "phone_"))
+                custom_token = self.admin_auth.create_custom_token(phone_number.replace("+", "phone_"))
                 return {
                     "success": True,
                     "custom_token": custom_token.decode('utf-8'),
@@ -63,13 +215,55 @@ class FirebaseService:
                 "message": f"OTP verification failed: {str(e)}"
             }
     
+    async def verify_id_token(self, token: str) -> dict:
+        """
+        Verify a Firebase ID token and return its claims
+        
+        Raises ValueError (or a google.auth error) for invalid tokens.
+        """
+        with tracer.span("firebase.verify_id_token", "client") as span:
+            digest = hashlib.sha256(token.encode()).digest()
+            claims = self.verified_tokens.get(digest)
+            if span is not None:
+                span.set_attribute("cache.hit", claims is not None)
+            if claims is not None:
+                return claims
+            
+            certs = await self.certificates.get_certificates(token_key_id(token))
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=settings.FIREBASE_VERIFY_MAX_WORKERS,
+                    thread_name_prefix="firebase-verify"
+                )
+            loop = asyncio.get_running_loop()
+            with track_external_call("firebase", "verify_id_token"):
+                claims = await loop.run_in_executor(
+                    self._executor, decode_firebase_id_token, token, certs, self.project_id
+                )
+            self.verified_tokens.set(digest, claims, ttl=min(
+                self.verified_tokens.ttl_seconds, claims["exp"] - time.time()
+            ))
+            return claims
+    
+    def start(self) -> None:
+        """Start background certificate refreshing (without it certificates are fetched on first use)"""
+        if settings.FIREBASE_CERT_BACKGROUND_REFRESH:
+            self.certificates.start()
+    
+    async def aclose(self) -> None:
+        """Stop background work and the verification executor"""
+        await self.certificates.stop()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+    
     async def verify_google_token(self, id_token: str) -> dict:
         """
         Verify Google ID token
         """
         try:
             # Verify the ID token
-            decoded_token = auth.verify_id_token(id_token)
+            decoded_token = await self.verify_id_token(id_token)
             
             return {
                 "success": True,
@@ -90,7 +284,7 @@ class FirebaseService:
         Verify Firebase ID token
         """
         try:
-            decoded_token = auth.verify_id_token(token)
+            decoded_token = await self.verify_id_token(token)
             return {
                 "success": True,
                 "firebase_uid": decoded_token['uid'],
@@ -103,4 +297,4 @@ class FirebaseService:
                 "message": f"Token verification failed: {str(e)}"
             }
 
-firebase_service = FirebaseService()
+firebase_service = LazyService(FirebaseService)
@@ -0,0 +1,257 @@
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from app.core.config import settings
+
+# Wrong guesses allowed per stored OTP
+MAX_OTP_ATTEMPTS = 3
+
+# verify() outcomes shared by all backends
+OTP_NOT_FOUND = 0
+OTP_EXPIRED = 1
+OTP_TOO_MANY_ATTEMPTS = 2
+OTP_VERIFIED = 3
+OTP_INVALID = 4
+
+def verification_result(status: int, attempts: int = 0) -> Dict[str, any]:
+    """Build the verify_otp response for a store outcome"""
+    if status == OTP_NOT_FOUND:
+        return {
+            'success': False,
+            'message': 'No OTP found for this phone number'
+        }
+    if status == OTP_EXPIRED:
+        return {
+            'success': False,
+            'message': 'OTP has expired. Please request a new one.'
+        }
+    if status == OTP_TOO_MANY_ATTEMPTS:
+        return {
+            'success': False,
+            'message': 'Too many failed attempts. Please request a new OTP.'
+        }
+    if status == OTP_VERIFIED:
+        return {
+            'success': True,
+            'message': 'OTP verified successfully'
+        }
+    return {
+        'success': False,
+        'message': f'Invalid OTP. {MAX_OTP_ATTEMPTS - attempts} attempts remaining.'
+    }
+
+class OTPStore(ABC):
+    """Storage backend for pending OTP codes"""
+
+    @abstractmethod
+    async def store(self, phone_number: str, otp: str, expires_in_minutes: int = 5) -> None:
+        """Store OTP with expiration time, replacing any pending code"""
+
+    @abstractmethod
+    async def issue(self, phone_number: str, otp: str, expires_in_minutes: int = 5,
+                    cooldown_seconds: float = 0) -> Optional[str]:
+        """
+        Pick the code to send for a new OTP request
+
+        Reuses a still-valid OTP (keeping its expiry and failed attempts)
+        instead of storing ``otp``. Returns None when that OTP was sent less
+        than ``cooldown_seconds`` ago and no SMS should go out.
+        """
+
+    @abstractmethod
+    async def verify(self, phone_number: str, provided_otp: str) -> Dict[str, any]:
+        """Check an OTP, consuming it on success and counting failed attempts"""
+
+    @abstractmethod
+    async def cleanup_expired(self) -> int:
+        """Remove expired OTPs and return how many were removed"""
+
+class InMemoryOTPStore(OTPStore):
+    """Per-process dict store, suitable for development and a single worker"""
+
+    def __init__(self):
+        self.otp_storage = {}
+
+    async def store(self, phone_number: str, otp: str, expires_in_minutes: int = 5) -> None:
+        expiry_time = datetime.utcnow() + timedelta(minutes=expires_in_minutes)
+        self.otp_storage[phone_number] = {
+            'otp': otp,
+            'expires_at': expiry_time,
+            'attempts': 0
+        }
+
+    async def issue(self, phone_number: str, otp: str, expires_in_minutes: int = 5,
+                    cooldown_seconds: float = 0) -> Optional[str]:
+        now = datetime.utcnow()
+        stored_data = self.otp_storage.get(phone_number)
+        if stored_data and now < stored_data['expires_at']:
+            sent_at = stored_data.get('sent_at')
+            if sent_at and (now - sent_at).total_seconds() < cooldown_seconds:
+                return None
+            stored_data['sent_at'] = now
+            return stored_data['otp']
+
+        self.otp_storage[phone_number] = {
+            'otp': otp,
+            'expires_at': now + timedelta(minutes=expires_in_minutes),
+            'attempts': 0,
+            'sent_at': now
+        }
+        return otp
+
+    async def verify(self, phone_number: str, provided_otp: str) -> Dict[str, any]:
+        stored_data = self.otp_storage.get(phone_number)
+
+        if not stored_data:
+            return verification_result(OTP_NOT_FOUND)
+
+        # Check if OTP has expired
+        if datetime.utcnow() > stored_data['expires_at']:
+            del self.otp_storage[phone_number]
+            return verification_result(OTP_EXPIRED)
+
+        # Check attempt limit
+        if stored_data['attempts'] >= MAX_OTP_ATTEMPTS:
+            del self.otp_storage[phone_number]
+            return verification_result(OTP_TOO_MANY_ATTEMPTS)
+
+        # Verify OTP
+        if stored_data['otp'] == provided_otp:
+            # OTP is correct, remove from storage
+            del self.otp_storage[phone_number]
+            return verification_result(OTP_VERIFIED)
+
+        # Increment attempt counter
+        stored_data['attempts'] += 1
+        return verification_result(OTP_INVALID, stored_data['attempts'])
+
+    async def cleanup_expired(self) -> int:
+        current_time = datetime.utcnow()
+        expired_numbers = [
+            phone for phone, data in self.otp_storage.items()
+            if current_time > data['expires_at']
+        ]
+
+        for phone in expired_numbers:
+            del self.otp_storage[phone]
+        return len(expired_numbers)
+
+# Compare-and-increment in one round trip. KEYS[1] is the OTP hash,
+# ARGV[1] the provided code and ARGV[2] the attempt limit. Returns
+# {status, attempts}. Expiry is checked against the Redis clock so that an
+# expired code is reported as such during the key's grace period.
+VERIFY_OTP_SCRIPT = """
+local data = redis.call('HMGET', KEYS[1], 'otp', 'expires_at', 'attempts')
+if not data[1] then
+    return {0, 0}
+end
+local now = redis.call('TIME')
+local now_ms = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000)
+if now_ms >= tonumber(data[2]) then
+    redis.call('DEL', KEYS[1])
+    return {1, 0}
+end
+local attempts = tonumber(data[3])
+if attempts >= tonumber(ARGV[2]) then
+    redis.call('DEL', KEYS[1])
+    return {2, attempts}
+end
+if data[1] == ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    return {3, attempts}
+end
+attempts = redis.call('HINCRBY', KEYS[1], 'attempts', 1)
+return {4, attempts}
+"""
+
+# Replace the OTP of KEYS[1] with ARGV[1], valid for ARGV[2] ms on the Redis
+# clock (as the other scripts check it); ARGV[3] is the key's expiry grace
+# period in ms.
+STORE_OTP_SCRIPT = """
+local now = redis.call('TIME')
+local now_ms = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000)
+redis.call('DEL', KEYS[1])
+redis.call('HSET', KEYS[1], 'otp', ARGV[1], 'expires_at', now_ms + tonumber(ARGV[2]), 'attempts', 0)
+redis.call('PEXPIRE', KEYS[1], tonumber(ARGV[2]) + tonumber(ARGV[3]))
+"""
+
+# Reuse-or-store in one round trip. KEYS[1] is the OTP hash, ARGV[1] the
+# new code, ARGV[2] its lifetime and ARGV[3] the resend cooldown (both in
+# ms), ARGV[4] the key's expiry grace period in ms. Returns the code to
+# send, or nil during the cooldown.
+ISSUE_OTP_SCRIPT = """
+local now = redis.call('TIME')
+local now_ms = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000)
+local data = redis.call('HMGET', KEYS[1], 'otp', 'expires_at', 'sent_at')
+if data[1] and now_ms < tonumber(data[2]) then
+    if data[3] and now_ms - tonumber(data[3]) < tonumber(ARGV[3]) then
+        return false
+    end
+    redis.call('HSET', KEYS[1], 'sent_at', now_ms)
+    return data[1]
+end
+redis.call('DEL', KEYS[1])
+redis.call('HSET', KEYS[1], 'otp', ARGV[1], 'expires_at', now_ms + tonumber(ARGV[2]),
+           'attempts', 0, 'sent_at', now_ms)
+redis.call('PEXPIRE', KEYS[1], tonumber(ARGV[2]) + tonumber(ARGV[4]))
+return ARGV[1]
+"""
+
+class RedisOTPStore(OTPStore):
+    """
+    Redis store shared by all workers
+
+    Each OTP is a hash at ``otp:<phone>`` whose key TTL outlives the code by
+    a short grace period, so Redis expires stale codes on its own.
+    """
+
+    KEY_PREFIX = "otp:"
+    EXPIRED_GRACE_SECONDS = 60
+
+    def __init__(self, redis_client):
+        self.redis = redis_client
+        self._verify_script = redis_client.register_script(VERIFY_OTP_SCRIPT)
+        self._issue_script = redis_client.register_script(ISSUE_OTP_SCRIPT)
+        self._store_script = redis_client.register_script(STORE_OTP_SCRIPT)
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisOTPStore":
+        import redis.asyncio as redis_asyncio
+        return cls(redis_asyncio.Redis.from_url(url))
+
+    def _key(self, phone_number: str) -> str:
+        return f"{self.KEY_PREFIX}{phone_number}"
+
+    async def store(self, phone_number: str, otp: str, expires_in_minutes: int = 5) -> None:
+        await self._store_script(
+            keys=[self._key(phone_number)],
+            args=[otp, expires_in_minutes * 60000, self.EXPIRED_GRACE_SECONDS * 1000]
+        )
+
+    async def issue(self, phone_number: str, otp: str, expires_in_minutes: int = 5,
+                    cooldown_seconds: float = 0) -> Optional[str]:
+        code = await self._issue_script(
+            keys=[self._key(phone_number)],
+            args=[otp, expires_in_minutes * 60000, int(cooldown_seconds * 1000), self.EXPIRED_GRACE_SECONDS * 1000]
+        )
+        return code.decode() if isinstance(code, bytes) else code
+
+    async def verify(self, phone_number: str, provided_otp: str) -> Dict[str, any]:
+        status, attempts = await self._verify_script(
+            keys=[self._key(phone_number)],
+            args=[provided_otp, MAX_OTP_ATTEMPTS]
+        )
+        return verification_result(int(status), int(attempts))
+
+    async def cleanup_expired(self) -> int:
+        # Key TTLs take care of expiry
+        return 0
+
+def get_otp_store(backend: Optional[str] = None) -> OTPStore:
+    """Create the OTP store configured by OTP_STORE_BACKEND"""
+    backend = backend or settings.OTP_STORE_BACKEND
+    if backend == "redis":
+        return RedisOTPStore.from_url(settings.REDIS_URL)
+    if backend == "memory":
+        return InMemoryOTPStore()
+    raise ValueError(f"Unknown OTP store backend: {backend}")
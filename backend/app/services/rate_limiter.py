@@ -0,0 +1,147 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Sequence, Tuple
+import itertools
+import os
+import time
+from app.core.config import settings
+
+# (key, limit, window_seconds): at most ``limit`` hits per ``window_seconds``
+Rule = Tuple[str, int, float]
+
+class RateLimiter(ABC):
+    """Storage backend for request rate limits"""
+
+    @abstractmethod
+    async def hit(self, rules: Sequence[Rule]) -> float:
+        """
+        Count one request against every rule
+
+        Returns 0.0 when all rules allow it. Otherwise nothing is counted
+        and the number of seconds until it would be allowed is returned.
+        """
+
+    @abstractmethod
+    async def clear(self) -> None:
+        """Forget every counted request"""
+
+class InMemoryRateLimiter(RateLimiter):
+    """
+    Per-process token buckets, suitable for development and a single worker
+
+    Each key holds ``limit`` tokens refilled at ``limit / window`` per
+    second. Buckets that have refilled completely carry no state and are
+    dropped once more than ``max_keys`` are tracked.
+    """
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        # key -> [tokens, updated_at, full_at]
+        self.buckets: Dict[str, List[float]] = {}
+
+    async def hit(self, rules: Sequence[Rule]) -> float:
+        now = time.monotonic()
+        buckets = []
+        retry_after = 0.0
+        for key, limit, window in rules:
+            bucket = self.buckets.get(key)
+            tokens = limit if bucket is None else min(limit, bucket[0] + (now - bucket[1]) * limit / window)
+            if tokens < 1:
+                retry_after = max(retry_after, (1 - tokens) * window / limit)
+            buckets.append((key, tokens - 1, now + (limit - tokens + 1) * window / limit))
+        if retry_after:
+            return retry_after
+
+        for key, tokens, full_at in buckets:
+            self.buckets[key] = [tokens, now, full_at]
+        if len(self.buckets) > self.max_keys:
+            self._prune(now)
+        return 0.0
+
+    def _prune(self, now: float) -> None:
+        for key in [key for key, bucket in self.buckets.items() if bucket[2] <= now]:
+            del self.buckets[key]
+        # Still too many: drop the oldest buckets
+        for key in list(itertools.islice(self.buckets, max(0, len(self.buckets) - self.max_keys))):
+            del self.buckets[key]
+
+    async def clear(self) -> None:
+        self.buckets.clear()
+
+# Sliding window log over every rule in one round trip. KEYS are the
+# window sorted sets, ARGV[1] a unique request id, then (limit, window_ms)
+# per key. The request is only added when every window has room; otherwise
+# the milliseconds until the oldest blocking entry leaves its window are
+# returned. Timestamps come from the Redis clock.
+SLIDING_WINDOW_SCRIPT = """
+local now = redis.call('TIME')
+local now_ms = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000)
+local retry_ms = 0
+for i, key in ipairs(KEYS) do
+    local limit = tonumber(ARGV[i * 2])
+    local window = tonumber(ARGV[i * 2 + 1])
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now_ms - window)
+    if redis.call('ZCARD', key) >= limit then
+        local oldest = redis.call('ZRANGE', key, -limit, -limit, 'WITHSCORES')
+        retry_ms = math.max(retry_ms, tonumber(oldest[2]) + window - now_ms)
+    end
+end
+if retry_ms > 0 then
+    return retry_ms
+end
+for i, key in ipairs(KEYS) do
+    redis.call('ZADD', key, now_ms, now_ms .. ':' .. ARGV[1])
+    redis.call('PEXPIRE', key, tonumber(ARGV[i * 2 + 1]))
+end
+return 0
+"""
+
+class RedisRateLimiter(RateLimiter):
+    """
+    Sliding window limits shared by all workers
+
+    Each key is a sorted set at ``ratelimit:<key>`` of request timestamps
+    within the window; its TTL is the window, so idle keys expire on their
+    own.
+    """
+
+    KEY_PREFIX = "ratelimit:"
+
+    def __init__(self, redis_client):
+        self.redis = redis_client
+        self._script = redis_client.register_script(SLIDING_WINDOW_SCRIPT)
+        self._ids = itertools.count()
+        self._id_prefix = os.urandom(4).hex()
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisRateLimiter":
+        import redis.asyncio as redis_asyncio
+        return cls(redis_asyncio.Redis.from_url(url))
+
+    async def hit(self, rules: Sequence[Rule]) -> float:
+        args = [f"{self._id_prefix}{next(self._ids)}"]
+        for _, limit, window in rules:
+            args += [limit, int(window * 1000)]
+        retry_ms = await self._script(keys=[f"{self.KEY_PREFIX}{key}" for key, _, _ in rules], args=args)
+        return int(retry_ms) / 1000
+
+    async def clear(self) -> None:
+        """Delete every window under KEY_PREFIX (in SCAN batches, without blocking Redis)"""
+        batch = []
+        async for key in self.redis.scan_iter(match=f"{self.KEY_PREFIX}*", count=500):
+            batch.append(key)
+            if len(batch) >= 500:
+                await self.redis.delete(*batch)
+                batch = []
+        if batch:
+            await self.redis.delete(*batch)
+
+def get_rate_limiter(backend: Optional[str] = None) -> RateLimiter:
+    """Create the rate limiter configured by RATE_LIMIT_BACKEND"""
+    backend = backend or settings.RATE_LIMIT_BACKEND
+    if backend == "redis":
+        return RedisRateLimiter.from_url(settings.REDIS_URL)
+    if backend == "memory":
+        return InMemoryRateLimiter(settings.RATE_LIMIT_MAX_KEYS)
+    raise ValueError(f"Unknown rate limit backend: {backend}")
+
+rate_limiter = get_rate_limiter()
@@ -0,0 +1,160 @@
+import asyncio
+import hashlib
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.tasks import BackgroundTask
+from app.core.security import TokenClaims, create_refresh_token
+from app.models.auth_session import AuthSession
+from app.services.token_denylist import token_denylist
+
+logger = logging.getLogger(__name__)
+
+# Families known to be revoked, so replays of their tokens are rejected
+# without a database round trip (a miss still ends up rejected by the UPDATE)
+revoked_session_cache = TTLCache(
+    max_size=settings.REVOKED_SESSION_CACHE_SIZE,
+    ttl_seconds=settings.REFRESH_TOKEN_EXPIRE_DAYS * 86400
+)
+
+def hash_refresh_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+class SessionService:
+    """
+    Server-side refresh token families
+
+    Login creates a session holding the hash of its refresh token. Each
+    refresh replaces that hash in one UPDATE by primary key that only
+    matches the current token of a live session; presenting any other token
+    of the family (an already rotated one, i.e. a stolen copy or a replay)
+    revokes the whole family. Expired and revoked sessions are deleted in
+    batches by a background job, never on the request path.
+    """
+
+    def __init__(self, prune_interval_seconds: float = 0, prune_batch_size: int = 1000):
+        self.prune_interval_seconds = prune_interval_seconds
+        self.prune_batch_size = prune_batch_size
+        self._task = BackgroundTask("session-prune")
+
+    @staticmethod
+    def _expires_at(now: datetime) -> datetime:
+        return now + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+
+    async def create(self, db: AsyncSession, user_id: uuid.UUID, firebase_uid: str) -> Tuple[uuid.UUID, str]:
+        """Start a session for a login; returns its id and first refresh token"""
+        session_id = uuid.uuid4()
+        refresh_token = create_refresh_token(
+            {"sub": str(user_id), "firebase_uid": firebase_uid, "sid": str(session_id)}
+        )
+        await db.execute(insert(AuthSession).values(
+            id=session_id,
+            user_id=user_id,
+            refresh_token_hash=hash_refresh_token(refresh_token),
+            expires_at=self._expires_at(datetime.utcnow())
+        ))
+        await db.commit()
+        return session_id, refresh_token
+
+    async def rotate(self, db: AsyncSession, claims: TokenClaims, refresh_token: str) -> str:
+        """
+        Exchange the current refresh token of a session for a new one
+
+        Raises ValueError, after revoking the family, when ``refresh_token``
+        is not the session's current token.
+        """
+        if claims.sid is None:
+            raise ValueError("Invalid refresh token")
+        if revoked_session_cache.get(claims.sid):
+            raise ValueError("Session has been revoked")
+
+        new_token = create_refresh_token(
+            {"sub": str(claims.sub), "firebase_uid": claims.firebase_uid, "sid": str(claims.sid)}
+        )
+        now = datetime.utcnow()
+        stmt = (
+            update(AuthSession)
+            .where(
+                AuthSession.id == claims.sid,
+                AuthSession.refresh_token_hash == hash_refresh_token(refresh_token),
+                AuthSession.revoked_at.is_(None)
+            )
+            .values(refresh_token_hash=hash_refresh_token(new_token), rotated_at=now, expires_at=self._expires_at(now))
+            .returning(AuthSession.id)
+            .execution_options(synchronize_session=False)
+        )
+        rotated = (await db.execute(stmt)).first()
+        await db.commit()
+        if rotated is not None:
+            return new_token
+
+        # Not the current token of a live session: a reused (already rotated)
+        # token, or a session that was revoked or pruned
+        if await self.revoke(db, claims.sid):
+            logger.warning("Refresh token reuse detected, session %s revoked", claims.sid)
+            raise ValueError("Refresh token has already been used; session revoked")
+        raise ValueError("Session has been revoked")
+
+    async def revoke(self, db: AsyncSession, session_id: uuid.UUID) -> bool:
+        """End a session; returns False if it was already revoked or is unknown"""
+        now = datetime.utcnow()
+        result = await db.execute(
+            update(AuthSession)
+            .where(AuthSession.id == session_id, AuthSession.revoked_at.is_(None))
+            .values(revoked_at=now, expires_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        revoked_session_cache.set(session_id, True)
+        # Access tokens of the session stay valid until they expire otherwise
+        await token_denylist.revoke_session(session_id)
+        return result.rowcount > 0
+
+    async def prune(self, db: AsyncSession, batch_size: Optional[int] = None) -> int:
+        """Delete ended sessions, ``batch_size`` per transaction; returns how many"""
+        batch_size = batch_size or self.prune_batch_size
+        cutoff = datetime.utcnow()
+        deleted = 0
+        while True:
+            batch = (
+                select(AuthSession.id)
+                .where(AuthSession.expires_at < cutoff)
+                .limit(batch_size)
+                .scalar_subquery()
+            )
+            result = await db.execute(
+                delete(AuthSession).where(AuthSession.id.in_(batch)).execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            deleted += result.rowcount
+            if result.rowcount < batch_size:
+                return deleted
+            # Let requests run between batches
+            await asyncio.sleep(0)
+
+    async def _prune_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.prune_interval_seconds)
+            try:
+                async with AsyncSessionLocal() as db:
+                    deleted = await self.prune(db)
+                if deleted:
+                    logger.info("Pruned %d ended sessions", deleted)
+            except Exception as e:
+                logger.warning("Session prune failed: %s", e)
+
+    def start(self) -> None:
+        """Start pruning ended sessions in the background"""
+        if self.prune_interval_seconds > 0:
+            self._task.start(self._prune_loop)
+
+    async def aclose(self) -> None:
+        await self._task.stop()
+
+session_service = SessionService(settings.SESSION_PRUNE_INTERVAL_SECONDS, settings.SESSION_PRUNE_BATCH_SIZE)
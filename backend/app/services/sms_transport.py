@@ -0,0 +1,98 @@
+import asyncio
+from typing import TYPE_CHECKING, Dict, Optional
+from app.core.config import settings
+from app.core.metrics import track_external_call
+from app.core.tracing import tracer
+
+if TYPE_CHECKING:
+    import httpx
+
+class SMSTransportError(Exception):
+    """Raised when the SMS provider rejects or fails a request"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, retryable: bool = False):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retryable = retryable
+
+class TwilioHTTPTransport:
+    """
+    Non-blocking client for the Twilio Messages API
+
+    Uses one pooled httpx.AsyncClient (keep-alive connections reused across
+    sends) and a semaphore bounding concurrent in-flight requests. Timeouts
+    and pool limits come from Settings.
+    """
+
+    def __init__(
+        self,
+        account_sid: str,
+        auth_token: str,
+        base_url: Optional[str] = None,
+        transport: Optional["httpx.AsyncBaseTransport"] = None
+    ):
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.base_url = (base_url or settings.TWILIO_API_BASE_URL).rstrip("/")
+        self._transport = transport
+        self._client: Optional["httpx.AsyncClient"] = None
+        self._semaphore = asyncio.Semaphore(settings.TWILIO_MAX_CONCURRENT_REQUESTS)
+
+    @property
+    def client(self) -> "httpx.AsyncClient":
+        if self._client is None:
+            # Imported on first send rather than at startup
+            import httpx
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                auth=(self.account_sid, self.auth_token),
+                timeout=httpx.Timeout(
+                    settings.TWILIO_READ_TIMEOUT_SECONDS,
+                    connect=settings.TWILIO_CONNECT_TIMEOUT_SECONDS,
+                    pool=settings.TWILIO_POOL_TIMEOUT_SECONDS
+                ),
+                limits=httpx.Limits(
+                    max_connections=settings.TWILIO_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.TWILIO_MAX_KEEPALIVE_CONNECTIONS
+                ),
+                transport=self._transport
+            )
+        return self._client
+
+    async def send_message(self, to: str, body: str, messaging_service_sid: str) -> Dict[str, any]:
+        """Create a message and return Twilio's JSON representation of it"""
+        path = f"/2010-04-01/Accounts/{self.account_sid}/Messages.json"
+        data = {"To": to, "Body": body, "MessagingServiceSid": messaging_service_sid}
+
+        async with self._semaphore:
+            with track_external_call("twilio", "messages.create"):
+                response = await self._post(path, data)
+
+        return response.json()
+
+    async def _post(self, path: str, data: dict) -> "httpx.Response":
+        import httpx
+        try:
+            response = await self.client.post(path, data=data, headers=tracer.inject({}))
+        except httpx.TimeoutException as e:
+            raise SMSTransportError(f"Twilio request timed out: {e}", retryable=True) from e
+        except httpx.TransportError as e:
+            raise SMSTransportError(f"Twilio request failed: {e}", retryable=True) from e
+
+        if response.status_code >= 400:
+            try:
+                detail = response.json().get("message", response.text)
+            except ValueError:
+                detail = response.text
+            raise SMSTransportError(
+                f"Twilio returned {response.status_code}: {detail}",
+                status_code=response.status_code,
+                retryable=response.status_code == 429 or response.status_code >= 500
+            )
+        return response
+
+    async def aclose(self) -> None:
+        """Close pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
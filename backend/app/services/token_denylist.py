@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.core.tasks import BackgroundTask
+
+logger = logging.getLogger(__name__)
+
+# Record a revocation and drop entries older than any token can live, in
+# one round trip. KEYS[1] is the sorted set, ARGV[1] the "<jti>:<exp>"
+# member and ARGV[2] the maximum token lifetime in ms. Scores are the
+# revocation time on the Redis clock, so every worker orders changes the
+# same way.
+REVOKE_SCRIPT = """
+local now = redis.call('TIME')
+local now_ms = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000)
+redis.call('ZADD', KEYS[1], now_ms, ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now_ms - tonumber(ARGV[2]))
+return now_ms
+"""
+
+# Store entries naming a user whose cached state is stale rather than a token
+USER_INVALIDATION_PREFIX = "user-invalidated/"
+
+class RedisRevocationStore:
+    """
+    Revoked token ids shared by all workers
+
+    A sorted set of ``<jti>:<exp>`` members scored by revocation time, so
+    that each worker can fetch only what was revoked since its last sync.
+    """
+
+    KEY = "token_denylist"
+
+    def __init__(self, redis_client, max_token_lifetime_seconds: int):
+        self.redis = redis_client
+        self.max_token_lifetime_ms = max_token_lifetime_seconds * 1000
+        self._revoke_script = redis_client.register_script(REVOKE_SCRIPT)
+
+    @classmethod
+    def from_url(cls, url: str, max_token_lifetime_seconds: int) -> "RedisRevocationStore":
+        import redis.asyncio as redis_asyncio
+        return cls(redis_asyncio.Redis.from_url(url), max_token_lifetime_seconds)
+
+    async def add(self, jti: str, exp: int) -> None:
+        await self._revoke_script(keys=[self.KEY], args=[f"{jti}:{exp}", self.max_token_lifetime_ms])
+
+    async def changes(self, since_ms: int) -> Tuple[List[Tuple[str, int]], int]:
+        """(jti, exp) revoked at or after ``since_ms``, and the cursor for the next call"""
+        rows = await self.redis.zrangebyscore(self.KEY, since_ms, "+inf", withscores=True)
+        entries = []
+        for member, score in rows:
+            jti, _, exp = (member.decode() if isinstance(member, bytes) else member).rpartition(":")
+            entries.append((jti, int(exp)))
+            since_ms = max(since_ms, int(score))
+        # Inclusive: revocations landing in the same millisecond are re-read
+        return entries, since_ms
+
+class TokenDenylist:
+    """
+    Revoked access tokens and sessions, checked in process
+
+    is_revoked is a set lookup with no IO, keyed by the first 64 bits of the
+    jti (random hex), so a million revocations fit in a few tens of MB.
+    Entries are dropped once their token has expired: with a shared store on
+    every sync, otherwise every ``prune_seconds`` once start() was called.
+    With a shared store revoke() also records the jti there and every worker
+    fetches new revocations each ``sync_seconds``: a token revoked on one
+    worker is rejected by all of them at most one sync interval (plus a
+    round trip) later. Without a store the denylist is local to this process.
+
+    Revoked sessions are recorded the same way, keyed by their sid, until
+    the last access token issued for them has expired.
+
+    The shared store also carries user invalidations: writes to a user row
+    are published with publish_user_invalidation() and every worker passes
+    the user id to ``user_invalidation_listeners`` (which drop cached
+    principals) on its next sync. Publishing is batched into the sync
+    loop, so other workers see a write within about two sync intervals.
+    """
+
+    def __init__(self, store: Optional[RedisRevocationStore] = None, sync_seconds: float = 1.0,
+                 prune_seconds: float = 60.0):
+        self.store = store
+        self.sync_seconds = sync_seconds
+        self.prune_seconds = prune_seconds
+        self.revoked = set()
+        # exp minute -> keys expiring in it
+        self._expiries: Dict[int, List[int]] = {}
+        self._cursor = 0
+        self._task = BackgroundTask("token-denylist-sync")
+        self._unpublished: deque = deque()
+        self.user_invalidation_listeners: List[Callable[[uuid.UUID], None]] = []
+        self.synced_at: Optional[float] = None
+
+    @staticmethod
+    def _key(jti: str) -> int:
+        try:
+            return int(jti[:16], 16)
+        except ValueError:
+            return hash(jti)
+
+    def _add(self, jti: str, exp: int) -> None:
+        key = self._key(jti)
+        if key not in self.revoked:
+            self.revoked.add(key)
+            self._expiries.setdefault(exp // 60, []).append(key)
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        # Tokens issued without a jti cannot be revoked
+        return jti is not None and self._key(jti) in self.revoked
+
+    def is_session_revoked(self, sid: Optional[uuid.UUID]) -> bool:
+        return sid is not None and self._key(sid.hex) in self.revoked
+
+    async def revoke(self, jti: str, exp: int) -> None:
+        """Revoke a token until its expiry"""
+        if exp <= time.time():
+            return
+        self._add(jti, exp)
+        if self.store is not None:
+            await self.store.add(jti, exp)
+
+    async def revoke_session(self, sid: uuid.UUID) -> None:
+        """Revoke every access token of a session, including those already issued"""
+        await self.revoke(sid.hex, int(time.time()) + settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+    def publish_user_invalidation(self, user_id: uuid.UUID) -> None:
+        """Have every other worker drop its cached state of ``user_id`` (no-op without a store)"""
+        if self.store is not None:
+            self._unpublished.append(user_id)
+
+    async def _publish(self) -> None:
+        # Past a cache TTL no worker can still hold the stale state
+        exp = int(time.time() + settings.PRINCIPAL_CACHE_TTL_SECONDS) + 1
+        while self._unpublished:
+            user_id = self._unpublished.popleft()
+            try:
+                await self.store.add(f"{USER_INVALIDATION_PREFIX}{user_id.hex}", exp)
+            except Exception:
+                self._unpublished.appendleft(user_id)
+                raise
+
+    def prune(self) -> int:
+        """Forget tokens that have expired; returns how many were dropped"""
+        current_minute = int(time.time()) // 60
+        dropped = 0
+        for minute in [minute for minute in self._expiries if minute < current_minute]:
+            keys = self._expiries.pop(minute)
+            self.revoked.difference_update(keys)
+            dropped += len(keys)
+        return dropped
+
+    async def sync(self) -> int:
+        """Fetch revocations made by other workers; returns how many were fetched"""
+        if self.store is None:
+            return 0
+        await self._publish()
+        entries, self._cursor = await self.store.changes(self._cursor)
+        now = time.time()
+        for jti, exp in entries:
+            if exp <= now:
+                continue
+            if jti.startswith(USER_INVALIDATION_PREFIX):
+                user_id = uuid.UUID(jti[len(USER_INVALIDATION_PREFIX):])
+                for listener in self.user_invalidation_listeners:
+                    listener(user_id)
+            else:
+                self._add(jti, exp)
+        self.prune()
+        self.synced_at = time.monotonic()
+        return len(entries)
+
+    async def _sync_loop(self) -> None:
+        while True:
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.warning("Token denylist sync failed: %s", e)
+            await asyncio.sleep(self.sync_seconds)
+
+    async def _prune_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.prune_seconds)
+            self.prune()
+
+    def start(self) -> None:
+        """Start background syncing from the shared store, or pruning without one"""
+        self._task.start(self._sync_loop if self.store is not None else self._prune_loop)
+
+    async def aclose(self) -> None:
+        await self._task.stop()
+
+    def stats(self) -> dict:
+        return {
+            "revoked": len(self.revoked),
+            "shared": self.store is not None,
+            "synced_seconds_ago": round(time.monotonic() - self.synced_at, 3) if self.synced_at else None,
+        }
+
+def get_token_denylist(backend: Optional[str] = None) -> TokenDenylist:
+    """Create the token denylist configured by TOKEN_DENYLIST_BACKEND"""
+    backend = backend or settings.TOKEN_DENYLIST_BACKEND
+    if backend == "redis":
+        store = RedisRevocationStore.from_url(settings.REDIS_URL, settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+        return TokenDenylist(store, settings.TOKEN_DENYLIST_SYNC_SECONDS)
+    if backend == "memory":
+        return TokenDenylist()
+    raise ValueError(f"Unknown token denylist backend: {backend}")
+
+token_denylist = get_token_denylist()
@@ -1,137 +1,332 @@
+import asyncio
+import logging
 import random
 import string
-from datetime import datetime, timedelta
-from typing import Dict, Optional
-from twilio.rest import Client
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional
 from app.core.config import settings
-import redis
-import json
+from app.core.lazy import LazyService
+from app.core.tasks import BackgroundTask
+from app.core.tracing import current_span, tracer
+from app.services.otp_store import get_otp_store
+from app.services.sms_transport import SMSTransportError, TwilioHTTPTransport
+
+logger = logging.getLogger(__name__)
+
+class SMSQueueFullError(Exception):
+    """Raised when the SMS dispatch queue cannot accept more messages"""
+
+class TokenBucket:
+    """Async token bucket limiting sends to ``rate`` per second (0 = unlimited)"""
+    
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+    
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class SMSDispatchQueue:
+    """
+    In-process queue that delivers SMS in the background
+    
+    A pool of worker tasks drains the queue under a token bucket matched to
+    the Messaging Service throughput, retrying retryable provider failures
+    with jittered exponential backoff. ``enqueue`` sheds load with
+    SMSQueueFullError once ``max_size`` messages are pending (or have a slot
+    held with ``reserve``), and ``stop`` flushes what is left before
+    cancelling the workers.
+    """
+    
+    def __init__(
+        self,
+        deliver: Callable[[str, str], Awaitable[Dict[str, any]]],
+        max_size: int = 1000,
+        workers: int = 4,
+        rate_per_second: float = 10.0,
+        burst: int = 10,
+        max_retries: int = 3,
+        retry_base_delay: float = 0.5,
+        retry_max_delay: float = 10.0
+    ):
+        self.deliver = deliver
+        self.max_size = max_size
+        self.worker_count = workers
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.bucket = TokenBucket(rate_per_second, burst)
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[BackgroundTask] = []
+        # Slots held by reserve() for messages not enqueued yet
+        self._reserved = 0
+        
+        # Observability
+        self.enqueued = 0
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.shed = 0
+        self.latencies = deque(maxlen=1000)
+    
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+    
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+    
+    def start(self) -> None:
+        """Start the worker tasks on the running event loop"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._workers = [BackgroundTask(f"sms-dispatch-{index}") for index in range(self.worker_count)]
+        for worker in self._workers:
+            worker.start(self._worker)
+    
+    def _check_capacity(self) -> None:
+        if not self.running:
+            self.start()
+        if self.max_size and self._queue.qsize() + self._reserved >= self.max_size:
+            self.shed += 1
+            raise SMSQueueFullError("SMS queue is full, please retry shortly")
+    
+    def reserve(self) -> None:
+        """
+        Hold a queue slot for a message about to be enqueued
+        
+        Raises SMSQueueFullError before the caller does any work for the
+        message. Enqueue it with ``reserved=True``, or ``release`` the slot.
+        """
+        self._check_capacity()
+        self._reserved += 1
+    
+    def release(self) -> None:
+        """Give back a slot held by ``reserve``"""
+        self._reserved -= 1
+    
+    def enqueue(self, phone_number: str, message: str, reserved: bool = False) -> None:
+        """Queue a message for delivery, starting the workers if needed"""
+        if reserved:
+            self._reserved -= 1
+            if not self.running:
+                self.start()
+        else:
+            self._check_capacity()
+        # The span of the enqueuing request, so delivery joins its trace
+        self._queue.put_nowait((phone_number, message, current_span.get()))
+        self.enqueued += 1
+    
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Flush pending messages (up to ``timeout`` seconds) and stop the workers"""
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("SMS dispatch stopped with %d messages pending", self.depth)
+        await asyncio.gather(*(worker.stop() for worker in self._workers))
+        self._workers = []
+    
+    def backoff_delay(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given retry attempt"""
+        return random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt))
+    
+    async def _worker(self) -> None:
+        while True:
+            phone_number, message, parent = await self._queue.get()
+            try:
+                with tracer.use_span(parent):
+                    await self._send_with_retries(phone_number, message)
+            finally:
+                self._queue.task_done()
+    
+    async def _send_with_retries(self, phone_number: str, message: str) -> None:
+        attempt = 0
+        while True:
+            await self.bucket.acquire()
+            start = time.perf_counter()
+            try:
+                await self.deliver(phone_number, message)
+            except SMSTransportError as e:
+                if e.retryable and attempt < self.max_retries:
+                    self.retries += 1
+                    await asyncio.sleep(self.backoff_delay(attempt))
+                    attempt += 1
+                    continue
+                self.failed += 1
+                logger.error("SMS delivery failed after %d attempts: %s", attempt + 1, e)
+                return
+            except Exception:
+                self.failed += 1
+                logger.exception("SMS delivery failed")
+                return
+            self.latencies.append(time.perf_counter() - start)
+            self.sent += 1
+            return
+    
+    def stats(self) -> dict:
+        """Queue depth, delivery counters and recent send latency"""
+        latencies = sorted(self.latencies)
+        return {
+            "running": self.running,
+            "depth": self.depth,
+            "max_size": self.max_size,
+            "workers": self.worker_count,
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "failed": self.failed,
+            "retries": self.retries,
+            "shed": self.shed,
+            "send_latency_p50_ms": round(latencies[len(latencies) // 2] * 1000, 2) if latencies else None,
+            "send_latency_p95_ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 2) if latencies else None
+        }
 
 class TwilioService:
-    def __init__(self):
+    def __init__(self, transport: Optional[TwilioHTTPTransport] = None):
         """Initialize Twilio client"""
-        self.client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+        self.transport = transport or TwilioHTTPTransport(
+            settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN
+        )
         self.messaging_service_sid = settings.TWILIO_MESSAGING_SERVICE_SID
         
-        # In production, use Redis for OTP storage
-        # For development, use in-memory storage
-        self.otp_storage = {}  # Will be replaced with Redis in production
+        # OTP storage backend (in-memory or Redis, see OTP_STORE_BACKEND)
+        self.otp_store = get_otp_store()
+        
+        # Background delivery for OTP messages
+        self.dispatch_queue = SMSDispatchQueue(
+            self._deliver,
+            max_size=settings.SMS_QUEUE_MAX_SIZE,
+            workers=settings.SMS_DISPATCH_WORKERS,
+            rate_per_second=settings.SMS_RATE_PER_SECOND,
+            burst=settings.SMS_RATE_BURST,
+            max_retries=settings.SMS_MAX_RETRIES,
+            retry_base_delay=settings.SMS_RETRY_BASE_DELAY_SECONDS,
+            retry_max_delay=settings.SMS_RETRY_MAX_DELAY_SECONDS
+        )
     
     def generate_otp(self, length: int = 6) -> str:
         """Generate a random OTP code"""
         return ''.join(random.choices(string.digits, k=length))
     
-    def store_otp(self, phone_number: str, otp: str, expires_in_minutes: int = 5) -> None:
+    async def store_otp(self, phone_number: str, otp: str, expires_in_minutes: int = 5) -> None:
         """Store OTP with expiration time"""
-        expiry_time = datetime.utcnow() + timedelta(minutes=expires_in_minutes)
-        self.otp_storage[phone_number] = {
-            'otp': otp,
-            'expires_at': expiry_time,
-            'attempts': 0
+        await self.otp_store.store(phone_number, otp, expires_in_minutes)
+    
+    async def issue_otp(self, phone_number: str, otp: str) -> Optional[str]:
+        """Code to send for an OTP request (None while the resend cooldown runs)"""
+        return await self.otp_store.issue(
+            phone_number, otp, cooldown_seconds=settings.OTP_RESEND_COOLDOWN_SECONDS
+        )
+    
+    def cooldown_result(self, phone_number: str) -> Dict[str, any]:
+        """send_otp_sms response when the pending OTP was sent moments ago"""
+        return {
+            'success': True,
+            'message': f'OTP already sent to {phone_number}. Please wait before requesting a new code.'
         }
     
-    def verify_otp(self, phone_number: str, provided_otp: str) -> Dict[str, any]:
+    async def verify_otp(self, phone_number: str, provided_otp: str) -> Dict[str, any]:
         """Verify OTP code"""
-        stored_data = self.otp_storage.get(phone_number)
-        
-        if not stored_data:
-            return {
-                'success': False,
-                'message': 'No OTP found for this phone number'
-            }
-        
-        # Check if OTP has expired
-        if datetime.utcnow() > stored_data['expires_at']:
-            del self.otp_storage[phone_number]
-            return {
-                'success': False,
-                'message': 'OTP has expired. Please request a new one.'
-            }
-        
-        # Check attempt limit
-        if stored_data['attempts'] >= 3:
-            del self.otp_storage[phone_number]
-            return {
-                'success': False,
-                'message': 'Too many failed attempts. Please request a new OTP.'
-            }
-        
-        # Verify OTP
-        if stored_data['otp'] == provided_otp:
-            # OTP is correct, remove from storage
-            del self.otp_storage[phone_number]
-            return {
-                'success': True,
-                'message': 'OTP verified successfully'
-            }
-        else:
-            # Increment attempt counter
-            stored_data['attempts'] += 1
-            return {
-                'success': False,
-                'message': f'Invalid OTP. {3 - stored_data["attempts"]} attempts remaining.'
-            }
+        return await self.otp_store.verify(phone_number, provided_otp)
     
     async def send_sms(self, phone_number: str, message: str) -> Dict[str, any]:
         """Send SMS using Twilio"""
-        try:
-            message = self.client.messages.create(
-                messaging_service_sid=self.messaging_service_sid,
-                body=message,
-                to=phone_number
-            )
+        with tracer.span("twilio.send_sms", "client", {"messaging.system": "twilio"}) as span:
+            try:
+                result = await self.transport.send_message(
+                    to=phone_number,
+                    body=message,
+                    messaging_service_sid=self.messaging_service_sid
+                )
+            except Exception as e:
+                if span is not None:
+                    span.record_error(e)
+                return {
+                    'success': False,
+                    'message': f'Failed to send SMS: {str(e)}'
+                }
             
             return {
                 'success': True,
                 'message': 'SMS sent successfully',
-                'sid': message.sid
-            }
-        except Exception as e:
-            return {
-                'success': False,
-                'message': f'Failed to send SMS: {str(e)}'
+                'sid': result.get('sid')
             }
     
+    async def _deliver(self, phone_number: str, message: str) -> Dict[str, any]:
+        """Send one message for the dispatch queue, raising SMSTransportError on failure"""
+        with tracer.span("twilio.send_sms", "client", {"messaging.system": "twilio"}):
+            return await self.transport.send_message(
+                to=phone_number,
+                body=message,
+                messaging_service_sid=self.messaging_service_sid
+            )
+    
     async def send_otp_sms(self, phone_number: str) -> Dict[str, any]:
         """Send OTP via SMS"""
+        # Hold a queue slot first: when the queue is full the pending OTP and
+        # its resend cooldown must stay as they are (SMSQueueFullError -> 503)
+        self.dispatch_queue.reserve()
+        reserved = True
         try:
-            # Generate OTP
-            otp = self.generate_otp()
+            # Store a new OTP, or resend the pending one after the cooldown
+            otp = await self.issue_otp(phone_number, self.generate_otp())
+            if otp is None:
+                return self.cooldown_result(phone_number)
             
             # Create message
             message = f"Your Imaro verification code is: {otp}. This code will expire in 5 minutes. Do not share this code with anyone."
             
-            # Send SMS
-            sms_result = await self.send_sms(phone_number, message)
+            # Hand the SMS to the dispatch queue
+            self.dispatch_queue.enqueue(phone_number, message, reserved=True)
+            reserved = False
             
-            if sms_result['success']:
-                # Store OTP for verification
-                self.store_otp(phone_number, otp)
-                
-                return {
-                    'success': True,
-                    'message': f'OTP sent to {phone_number}',
-                    'sid': sms_result['sid']
-                }
-            else:
-                return sms_result
-                
+            return {
+                'success': True,
+                'message': f'OTP sent to {phone_number}'
+            }
         except Exception as e:
             return {
                 'success': False,
                 'message': f'Failed to send OTP: {str(e)}'
             }
+        finally:
+            if reserved:
+                self.dispatch_queue.release()
     
-    def cleanup_expired_otps(self) -> None:
+    async def cleanup_expired_otps(self) -> int:
         """Clean up expired OTPs from storage"""
-        current_time = datetime.utcnow()
-        expired_numbers = [
-            phone for phone, data in self.otp_storage.items()
-            if current_time > data['expires_at']
-        ]
-        
-        for phone in expired_numbers:
-            del self.otp_storage[phone]
+        return await self.otp_store.cleanup_expired()
+    
+    def start(self) -> None:
+        """Start background SMS delivery"""
+        if self.dispatch_queue is not None:
+            self.dispatch_queue.start()
+    
+    def dispatch_stats(self) -> Optional[dict]:
+        """SMS dispatch queue statistics (None in mock mode)"""
+        return self.dispatch_queue.stats() if self.dispatch_queue is not None else None
+    
+    async def aclose(self) -> None:
+        """Flush pending messages and close pooled provider connections"""
+        if self.dispatch_queue is not None:
+            await self.dispatch_queue.stop(settings.SMS_SHUTDOWN_FLUSH_TIMEOUT_SECONDS)
+        if self.transport is not None:
+            await self.transport.aclose()
 
 # For development/demo purposes
 class MockTwilioService(TwilioService):
@@ -139,7 +334,9 @@ class MockTwilioService(TwilioService):
     
     def __init__(self):
         # Don't initialize Twilio client in mock mode
-        self.otp_storage = {}
+        self.transport = None
+        self.dispatch_queue = None
+        self.otp_store = get_otp_store()
         self.demo_otp = "123456"  # Fixed OTP for demo
     
     async def send_sms(self, phone_number: str, message: str) -> Dict[str, any]:
@@ -155,7 +352,9 @@ class MockTwilioService(TwilioService):
         """Send mock OTP"""
         try:
             # Use demo OTP
-            otp = self.demo_otp
+            otp = await self.issue_otp(phone_number, self.demo_otp)
+            if otp is None:
+                return self.cooldown_result(phone_number)
             
             # Create message
             message = f"Your Imaro verification code is: {otp}. This code will expire in 5 minutes. (DEMO MODE)"
@@ -163,9 +362,6 @@ class MockTwilioService(TwilioService):
             # Mock send SMS
             sms_result = await self.send_sms(phone_number, message)
             
-            # Store OTP for verification
-            self.store_otp(phone_number, otp)
-            
             return {
                 'success': True,
                 'message': f'Demo OTP sent to {phone_number}. Use code: {otp}',
@@ -196,5 +392,5 @@ def get_twilio_service() -> TwilioService:
         print(f"⚠️  Twilio setup failed, using Mock Service: {e}")
         return MockTwilioService()
 
-# Global service instance
-twilio_service = get_twilio_service()
+# Global service instance, built on first use (the lifespan handler starts it)
+twilio_service = LazyService(get_twilio_service)
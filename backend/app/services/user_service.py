@@ -1,9 +1,48 @@
+from sqlalchemy import String, delete, func, select, tuple_, type_coerce, update
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.database import UPSERT_INSERTS
+from app.core.security import Principal
 from app.models.user import User
-from app.schemas.user import UserCreate, UserUpdate
-from typing import Optional
+from app.schemas.user import UserCreate, UserResponse, UserUpdate
+from app.services.token_denylist import token_denylist
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
+import base64
+import json
 import uuid
 
+# Principals resolved by get_current_user, keyed by user id. Every write to a user
+# row invalidates its entry so that changes such as deactivation take effect
+# on the next request handled by this worker; with the shared (redis) token
+# denylist other workers drop theirs within two TOKEN_DENYLIST_SYNC_SECONDS,
+# with the memory one (single worker) only when the TTL runs out.
+principal_cache = TTLCache(
+    max_size=settings.PRINCIPAL_CACHE_MAX_SIZE,
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS
+)
+
+# UserResponse of the current user for /auth/me and /users/profile, sized and
+# invalidated like the principal cache
+profile_cache = TTLCache(
+    max_size=settings.PRINCIPAL_CACHE_MAX_SIZE,
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS
+)
+
+def _drop_cached_user(user_id: uuid.UUID) -> None:
+    principal_cache.invalidate(user_id)
+    profile_cache.invalidate(user_id)
+
+def invalidate_user_caches(user_id: uuid.UUID) -> None:
+    """Drop the cached principal and profile of a user (after every committed write to its row) on every worker"""
+    _drop_cached_user(user_id)
+    token_denylist.publish_user_invalidation(user_id)
+
+token_denylist.user_invalidation_listeners.append(_drop_cached_user)
+
 class UserService:
     
     def get_user_by_id(self, db: Session, user_id: uuid.UUID) -> Optional[User]:
@@ -16,7 +55,8 @@ class UserService:
         return db.query(User).filter(User.phone_number == phone_number).first()
     
     def get_user_by_email(self, db: Session, email: str) -> Optional[User]:
-        return db.query(User).filter(User.email == email).first()
+        # Case-insensitive, served by the lower(email) index
+        return db.query(User).filter(func.lower(User.email) == email.lower()).first()
     
     def create_user(self, db: Session, user: UserCreate) -> User:
         db_user = User(
@@ -47,6 +87,7 @@ class UserService:
             setattr(db_user, field, value)
         
         db.commit()
+        invalidate_user_caches(user_id)
         db.refresh(db_user)
         return db_user
     
@@ -64,6 +105,7 @@ class UserService:
         db_user.profile_completed = True
         
         db.commit()
+        invalidate_user_caches(user_id)
         db.refresh(db_user)
         return db_user
     
@@ -74,6 +116,7 @@ class UserService:
         
         db.delete(db_user)
         db.commit()
+        invalidate_user_caches(user_id)
         return True
     
     def deactivate_user(self, db: Session, user_id: uuid.UUID) -> Optional[User]:
@@ -83,7 +126,275 @@ class UserService:
         
         db_user.is_active = False
         db.commit()
+        invalidate_user_caches(user_id)
         db.refresh(db_user)
         return db_user
 
 user_service = UserService()
+
+# Columns loaded for the Principal of a request
+PRINCIPAL_COLUMNS = (User.id, User.firebase_uid, User.is_active, User.profile_completed)
+
+# Columns returned by the statement-level write path, one per UserResponse field
+USER_RESPONSE_COLUMNS = tuple(User.__table__.c[name] for name in UserResponse.model_fields)
+
+def encode_cursor(created_at: str, user_id: uuid.UUID) -> str:
+    """Opaque keyset cursor for the listing position after (created_at, id)"""
+    payload = json.dumps([created_at, str(user_id)]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[str, uuid.UUID]:
+    """Inverse of encode_cursor; raises ValueError for malformed cursors"""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, user_id = json.loads(payload)
+        datetime.fromisoformat(created_at)
+        return created_at, uuid.UUID(user_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+class AsyncUserService:
+    """UserService counterpart for AsyncSession, used by the async endpoints"""
+    
+    async def upsert_login(self, db: AsyncSession, user: UserCreate, email_verified: bool = False) -> Row:
+        """
+        Create the user on first login or record the login of an existing one
+        
+        One INSERT ... ON CONFLICT (firebase_uid) DO UPDATE ... RETURNING in one
+        transaction, so concurrent first logins for the same account cannot
+        race. Returns a row with just ``id`` and ``profile_completed``.
+        """
+        # Other dialects are refused when the engine is set up
+        insert = UPSERT_INSERTS[db.get_bind().dialect.name]
+        
+        now = datetime.utcnow()
+        stmt = insert(User).values(
+            firebase_uid=user.firebase_uid,
+            auth_method=user.auth_method,
+            phone_number=user.phone_number,
+            email=user.email,
+            first_name=user.first_name,
+            last_name=user.last_name,
+            age=user.age,
+            gender=user.gender,
+            country=user.country,
+            is_phone_verified=user.auth_method == "phone",
+            is_email_verified=user.auth_method == "google",
+            last_login_at=now
+        )
+        # Python-side onupdate does not run for ON CONFLICT, so updated_at is set here
+        update = {"last_login_at": now, "updated_at": func.now()}
+        if email_verified:
+            update["is_email_verified"] = True
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[User.firebase_uid], set_=update
+        ).returning(User.id, User.profile_completed)
+        
+        result = await db.execute(stmt)
+        row = result.one()
+        await db.commit()
+        invalidate_user_caches(row.id)
+        return row
+    
+    async def get_user_by_id(self, db: AsyncSession, user_id: uuid.UUID) -> Optional[User]:
+        result = await db.execute(select(User).where(User.id == user_id))
+        return result.scalars().first()
+    
+    async def get_principal(self, db: AsyncSession, user_id: uuid.UUID) -> Optional[Principal]:
+        """Load only the columns of a Principal (no ORM object or identity map entry)"""
+        result = await db.execute(select(*PRINCIPAL_COLUMNS).where(User.id == user_id))
+        row = result.first()
+        return Principal(*row) if row else None
+    
+    async def get_cached_principal(self, db: AsyncSession, user_id: uuid.UUID) -> Optional[Principal]:
+        """get_principal served from the principal cache"""
+        principal = principal_cache.get(user_id)
+        if principal is None:
+            # A write committed while loading must not be overwritten by this read
+            version = principal_cache.version()
+            principal = await self.get_principal(db, user_id)
+            if principal:
+                principal_cache.set(user_id, principal, version=version)
+        return principal
+    
+    async def get_cached_profile(self, db: AsyncSession, user_id: uuid.UUID) -> Optional[UserResponse]:
+        """The user's UserResponse (one column-projected SELECT), served from the profile cache"""
+        profile = profile_cache.get(user_id)
+        if profile is None:
+            version = profile_cache.version()
+            row = (await db.execute(select(*USER_RESPONSE_COLUMNS).where(User.id == user_id))).mappings().first()
+            if row:
+                profile = UserResponse(**row)
+                profile_cache.set(user_id, profile, version=version)
+        return profile
+    
+    async def get_user_by_firebase_uid(self, db: AsyncSession, firebase_uid: str) -> Optional[User]:
+        result = await db.execute(select(User).where(User.firebase_uid == firebase_uid))
+        return result.scalars().first()
+    
+    async def get_user_by_phone(self, db: AsyncSession, phone_number: str) -> Optional[User]:
+        result = await db.execute(select(User).where(User.phone_number == phone_number))
+        return result.scalars().first()
+    
+    async def get_user_by_email(self, db: AsyncSession, email: str) -> Optional[User]:
+        result = await db.execute(select(User).where(func.lower(User.email) == email.lower()))
+        return result.scalars().first()
+    
+    async def create_user(self, db: AsyncSession, user: UserCreate) -> User:
+        db_user = User(
+            firebase_uid=user.firebase_uid,
+            auth_method=user.auth_method,
+            phone_number=user.phone_number,
+            email=user.email,
+            first_name=user.first_name,
+            last_name=user.last_name,
+            age=user.age,
+            gender=user.gender,
+            country=user.country,
+            is_phone_verified=user.auth_method == "phone",
+            is_email_verified=user.auth_method == "google"
+        )
+        db.add(db_user)
+        await db.commit()
+        await db.refresh(db_user)
+        return db_user
+    
+    async def update_user(self, db: AsyncSession, user_id: uuid.UUID, user_update: UserUpdate) -> Optional[User]:
+        db_user = await self.get_user_by_id(db, user_id)
+        if not db_user:
+            return None
+        
+        update_data = user_update.dict(exclude_unset=True)
+        for field, value in update_data.items():
+            setattr(db_user, field, value)
+        
+        await db.commit()
+        invalidate_user_caches(user_id)
+        await db.refresh(db_user)
+        return db_user
+    
+    async def complete_profile(self, db: AsyncSession, user_id: uuid.UUID, profile_data: dict) -> Optional[User]:
+        db_user = await self.get_user_by_id(db, user_id)
+        if not db_user:
+            return None
+        
+        # Update profile fields
+        for field, value in profile_data.items():
+            if hasattr(db_user, field):
+                setattr(db_user, field, value)
+        
+        # Mark profile as completed
+        db_user.profile_completed = True
+        
+        await db.commit()
+        invalidate_user_caches(user_id)
+        await db.refresh(db_user)
+        return db_user
+    
+    async def delete_user(self, db: AsyncSession, user_id: uuid.UUID) -> bool:
+        db_user = await self.get_user_by_id(db, user_id)
+        if not db_user:
+            return False
+        
+        await db.delete(db_user)
+        await db.commit()
+        invalidate_user_caches(user_id)
+        return True
+    
+    async def deactivate_user(self, db: AsyncSession, user_id: uuid.UUID) -> Optional[User]:
+        db_user = await self.get_user_by_id(db, user_id)
+        if not db_user:
+            return None
+        
+        db_user.is_active = False
+        await db.commit()
+        invalidate_user_caches(user_id)
+        await db.refresh(db_user)
+        return db_user
+    
+    # Statement-level write path: one UPDATE/DELETE ... RETURNING per call,
+    # no ORM objects loaded. Use the methods above when a User is needed.
+    
+    async def _update_returning(self, db: AsyncSession, user_id: uuid.UUID, values: dict) -> Optional[UserResponse]:
+        stmt = (
+            update(User)
+            .where(User.id == user_id)
+            .values(**values)
+            .returning(*USER_RESPONSE_COLUMNS)
+            .execution_options(synchronize_session=False)
+        )
+        row = (await db.execute(stmt)).mappings().first()
+        await db.commit()
+        invalidate_user_caches(user_id)
+        return UserResponse(**row) if row else None
+    
+    async def update_user_returning(self, db: AsyncSession, user_id: uuid.UUID, user_update: UserUpdate) -> Optional[UserResponse]:
+        return await self._update_returning(db, user_id, user_update.dict(exclude_unset=True))
+    
+    async def complete_profile_returning(self, db: AsyncSession, user_id: uuid.UUID, profile_data: dict) -> Optional[UserResponse]:
+        values = {field: value for field, value in profile_data.items() if field in User.__table__.c}
+        values["profile_completed"] = True
+        return await self._update_returning(db, user_id, values)
+    
+    async def deactivate_user_returning(self, db: AsyncSession, user_id: uuid.UUID) -> Optional[UserResponse]:
+        return await self._update_returning(db, user_id, {"is_active": False})
+    
+    async def delete_user_returning(self, db: AsyncSession, user_id: uuid.UUID) -> bool:
+        stmt = delete(User).where(User.id == user_id).returning(User.id).execution_options(synchronize_session=False)
+        deleted = (await db.execute(stmt)).first()
+        await db.commit()
+        invalidate_user_caches(user_id)
+        return deleted is not None
+
+    # Admin listing, keyset-paginated on (created_at, id) so that every page
+    # is an index range scan whatever its depth
+    
+    def _listing_query(self, db: AsyncSession, after: Optional[Tuple[str, uuid.UUID]], filters: dict):
+        # The cursor carries created_at as stored. SQLite keeps timestamps as
+        # text in more than one format, so there the raw text is compared
+        # (binding a datetime would reformat it and break ties).
+        if db.get_bind().dialect.name == "sqlite":
+            created_at = type_coerce(User.created_at, String)
+            after_created_at = after[0] if after else None
+        else:
+            created_at = User.created_at
+            after_created_at = datetime.fromisoformat(after[0]) if after else None
+        
+        stmt = (
+            select(*USER_RESPONSE_COLUMNS, created_at.label("cursor_created_at"))
+            .order_by(created_at, User.id)
+        )
+        for column, value in filters.items():
+            if value is not None:
+                stmt = stmt.where(User.__table__.c[column] == value)
+        if after:
+            stmt = stmt.where(tuple_(created_at, User.id) > tuple_(after_created_at, after[1]))
+        return stmt
+    
+    @staticmethod
+    def _row_cursor(row) -> str:
+        created_at = row["cursor_created_at"]
+        return encode_cursor(created_at if isinstance(created_at, str) else created_at.isoformat(), row["id"])
+    
+    async def list_users(
+        self, db: AsyncSession, limit: int, cursor: Optional[str] = None, **filters
+    ) -> Tuple[List[UserResponse], Optional[str]]:
+        """Return one page of users and the cursor of the next page (None on the last)"""
+        after = decode_cursor(cursor) if cursor else None
+        stmt = self._listing_query(db, after, filters).limit(limit + 1)
+        rows = (await db.execute(stmt)).mappings().all()
+        items = [UserResponse(**row) for row in rows[:limit]]
+        next_cursor = self._row_cursor(rows[limit - 1]) if len(rows) > limit else None
+        return items, next_cursor
+    
+    async def stream_users(
+        self, db: AsyncSession, cursor: Optional[str] = None, chunk_size: int = 1000, **filters
+    ) -> AsyncIterator[List[UserResponse]]:
+        """Yield all matching users in chunks through a server-side cursor"""
+        after = decode_cursor(cursor) if cursor else None
+        stmt = self._listing_query(db, after, filters).execution_options(yield_per=chunk_size)
+        result = await db.stream(stmt)
+        async for partition in result.mappings().partitions():
+            yield [UserResponse(**row) for row in partition]
+
+async_user_service = AsyncUserService()
@@ -0,0 +1,135 @@
+"""
+Lifespan warmup
+
+The first requests on a fresh worker otherwise pay for one-time setup:
+SQLAlchemy configures mappers and compiles statements on first use, the
+pool opens connections on demand, response schemas and the JWT backend do
+their first-call work. Warmup does all of that in the background right
+after startup; /health/ready answers 503 until it has finished, so a load
+balancer only routes traffic to warm workers.
+"""
+
+import asyncio
+import contextlib
+import logging
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict
+from sqlalchemy import text
+from sqlalchemy.orm import configure_mappers
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, async_engine
+from app.core.security import create_access_token, verify_token
+from app.core.serialization import RESPONSE_ADAPTERS, render
+from app.core.tasks import BackgroundTask
+from app.models.user import User
+from app.schemas.auth import AuthResponse
+from app.schemas.user import UserResponse
+from app.services.user_service import async_user_service
+
+logger = logging.getLogger(__name__)
+
+class Warmup:
+    """
+    One-time warmup of a worker, run as a background task from the lifespan
+
+    Each step is timed; a failing step is logged and recorded in stats()
+    but does not keep the worker from becoming ready (the database has its
+    own probe at /health/db).
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        db_connections: int = 2,
+        engine=async_engine,
+        session_factory: Callable = AsyncSessionLocal
+    ):
+        self.enabled = enabled
+        self.db_connections = db_connections
+        self.engine = engine
+        self.session_factory = session_factory
+        self.ready = False
+        self.steps_ms: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        self._task = BackgroundTask("warmup")
+
+    def configure_mappers(self) -> None:
+        configure_mappers()
+
+    async def open_connections(self) -> None:
+        """Open ``db_connections`` pool connections, held together so that they are distinct"""
+        count = min(self.db_connections, settings.DB_POOL_SIZE)
+        async with contextlib.AsyncExitStack() as stack:
+            for _ in range(count):
+                connection = await stack.enter_async_context(self.engine.connect())
+                await connection.execute(text("SELECT 1"))
+
+    async def prime_queries(self) -> None:
+        """Compile and run the principal lookup every authenticated request makes"""
+        async with self.session_factory() as db:
+            await async_user_service.get_principal(db, uuid.uuid4())
+
+    def prime_schemas(self) -> None:
+        """Validate and serialize AuthResponse and UserResponse once"""
+        now = datetime.utcnow()
+        user = User(
+            id=uuid.uuid4(), firebase_uid="warmup", auth_method="phone", phone_number="+10000000000",
+            first_name="Warm", last_name="Up", country="USA", is_active=True, is_phone_verified=True,
+            is_email_verified=False, profile_completed=False, privacy_policy_accepted=False,
+            terms_accepted=False, created_at=now, updated_at=now
+        )
+        auth = AuthResponse(
+            access_token="warmup", refresh_token="warmup", user_id=str(user.id),
+            profile_completed=False, expires_in=0
+        )
+        for model, source in ((UserResponse, user), (AuthResponse, auth)):
+            instance = model.model_validate(source)
+            RESPONSE_ADAPTERS[model].dump_json(instance)
+            render(model, source)
+
+    def prime_jwt(self) -> None:
+        """Issue and verify one access token"""
+        verify_token(create_access_token({"sub": str(uuid.uuid4()), "firebase_uid": "warmup"}), "access")
+
+    async def run(self) -> None:
+        start = time.perf_counter()
+        for name, step in (
+            ("mappers", self.configure_mappers),
+            ("db_connections", self.open_connections),
+            ("queries", self.prime_queries),
+            ("schemas", self.prime_schemas),
+            ("jwt", self.prime_jwt),
+        ):
+            step_start = time.perf_counter()
+            try:
+                result = step()
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                logger.warning("Warmup step %s failed: %s", name, e)
+                self.errors[name] = str(e)
+            self.steps_ms[name] = round((time.perf_counter() - step_start) * 1000, 2)
+        self.ready = True
+        logger.info("Worker warm after %.0f ms", (time.perf_counter() - start) * 1000)
+
+    def start(self) -> None:
+        """Warm up in the background (or report ready at once when disabled)"""
+        if not self.enabled:
+            self.ready = True
+        else:
+            self._task.start(self.run)
+
+    async def aclose(self) -> None:
+        await self._task.stop()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "ready": self.ready,
+            "steps_ms": dict(self.steps_ms),
+            "errors": dict(self.errors),
+        }
+
+warmup = Warmup(settings.WARMUP_ENABLED, settings.WARMUP_DB_CONNECTIONS)
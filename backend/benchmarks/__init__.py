@@ -0,0 +1,24 @@
+"""
+Performance benchmarks for Imaro Backend
+
+Run individual benchmarks as modules from the backend directory, e.g.
+``python -m benchmarks.bench_otp_store``. Settings that the app requires are
+given local defaults here so benchmarks run without a .env file; anything
+already set in the environment wins.
+"""
+
+import os
+
+_BENCHMARK_ENVIRONMENT = {
+    "DATABASE_URL": "sqlite:///./benchmark.db",
+    "TWILIO_ACCOUNT_SID": "your-twilio-account-sid",
+    "TWILIO_AUTH_TOKEN": "benchmark",
+    "TWILIO_MESSAGING_SERVICE_SID": "benchmark",
+    "FIREBASE_CREDENTIALS_PATH": "firebase-admin-sdk.json",
+    "FIREBASE_PROJECT_ID": "imaro-benchmark",
+    "SECRET_KEY": "imaro-benchmark-secret-key-change-in-production",
+    "DEBUG": "False",
+}
+
+for _name, _value in _BENCHMARK_ENVIRONMENT.items():
+    os.environ.setdefault(_name, _value)
@@ -0,0 +1,96 @@
+"""
+google_login throughput with off-loop verification and the verified-token cache
+
+Tokens are signed by a locally generated key pair standing in for Google's
+certificates (see tests.helpers). Token verification alone and
+full google_login (verification plus the user lookup/update) are each
+measured for distinct tokens (every call verifies a signature), client
+retries of the same token served from the verified-token cache, and the
+same retries with the cache disabled.
+
+    python -m benchmarks.bench_google_login --logins 500 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import time
+from benchmarks.common import print_table, summarize
+from tests.helpers import LocalFirebaseSigner
+from app.core.database import AsyncSessionLocal, async_engine
+from app.models.base import Base
+from app.services.auth_service import auth_service
+from app.services.firebase_service import firebase_service
+
+async def run_verifications(tokens, concurrency: int) -> dict:
+    queue: asyncio.Queue = asyncio.Queue()
+    for token in tokens:
+        queue.put_nowait(token)
+    samples = []
+
+    async def worker():
+        while not queue.empty():
+            token = queue.get_nowait()
+            start = time.perf_counter()
+            result = await firebase_service.verify_google_token(token)
+            samples.append(time.perf_counter() - start)
+            assert result["success"], result
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(samples, time.perf_counter() - start)
+
+async def run_logins(tokens, concurrency: int) -> dict:
+    queue: asyncio.Queue = asyncio.Queue()
+    for token in tokens:
+        queue.put_nowait(token)
+    samples = []
+
+    async def worker():
+        while not queue.empty():
+            token = queue.get_nowait()
+            start = time.perf_counter()
+            async with AsyncSessionLocal() as db:
+                await auth_service.google_login(db, token)
+            samples.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(samples, time.perf_counter() - start)
+
+async def main(args) -> None:
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    signer = LocalFirebaseSigner(firebase_service.project_id)
+    signer.install(firebase_service)
+
+    # Pre-create the users so every case measures verification plus an existing-user login
+    users = [signer.issue_token(uid=f"user-{index}") for index in range(args.users)]
+    await run_logins(users, args.concurrency)
+
+    distinct = [signer.issue_token(uid=f"user-{index % args.users}") for index in range(args.logins)]
+    retried = [distinct[index % args.users] for index in range(args.logins)]
+    cache = firebase_service.verified_tokens
+    max_size = cache.max_size
+
+    results = {}
+    for runner, label in ((run_verifications, "verify"), (run_logins, "google_login")):
+        cache.clear()
+        results[f"{label} distinct"] = await runner(distinct, args.concurrency)
+        results[f"{label} retries cached"] = await runner(retried, args.concurrency)
+        cache.max_size = 0
+        cache.clear()
+        results[f"{label} retries uncached"] = await runner(retried, args.concurrency)
+        cache.max_size = max_size
+
+    print_table(f"Firebase ID tokens ({args.logins} per case, concurrency={args.concurrency})", results)
+    await firebase_service.aclose()
+    await async_engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--logins", type=int, default=500)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=32)
+    asyncio.run(main(parser.parse_args()))
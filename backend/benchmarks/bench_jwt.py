@@ -0,0 +1,48 @@
+"""
+Micro-benchmarks for create_access_token and verify_token
+
+Each JWT backend is measured for token creation, a cold verify (decode
+cache bypassed, full parse + HMAC check) and a warm verify (decode cache
+hit), in microseconds per call.
+
+    python -m benchmarks.bench_jwt --iterations 20000
+"""
+
+import argparse
+import uuid
+from benchmarks.common import print_table, time_per_call
+from app.core import security
+from app.core.security import create_access_token, decoded_token_cache, use_jwt_backend, verify_token
+
+def bench_backend(name: str, iterations: int) -> dict:
+    use_jwt_backend(name)
+    data = {"sub": str(uuid.uuid4()), "firebase_uid": "phone_1234567890"}
+    token = create_access_token(data)
+
+    create_us = time_per_call(lambda: create_access_token(data), iterations)
+
+    max_size = decoded_token_cache.max_size
+    decoded_token_cache.max_size = 0
+    cold_us = time_per_call(lambda: verify_token(token), iterations)
+    decoded_token_cache.max_size = max_size
+
+    verify_token(token)
+    warm_us = time_per_call(lambda: verify_token(token), iterations)
+
+    return {
+        "create_us": round(create_us, 2),
+        "verify_cold_us": round(cold_us, 2),
+        "verify_warm_us": round(warm_us, 2),
+    }
+
+def main(args) -> None:
+    previous = security.jwt_backend.name
+    results = {name: bench_backend(name, args.iterations) for name in args.backends}
+    use_jwt_backend(previous)
+    print_table(f"JWT ({args.iterations} iterations)", results)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--backends", nargs="+", default=["jose", "pyjwt"])
+    main(parser.parse_args())
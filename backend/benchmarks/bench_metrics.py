@@ -0,0 +1,60 @@
+"""
+Micro-benchmark for the metrics collector overhead
+
+Drives a trivial ASGI app directly (no HTTP client, no routing) with and
+without MetricsMiddleware and reports the added cost per request, along
+with the raw counter/histogram recording cost, in microseconds per call.
+
+    python -m benchmarks.bench_metrics --iterations 100000
+"""
+
+import argparse
+import asyncio
+import time
+from benchmarks.common import print_table, time_per_call
+from app.core.metrics import Counter, Histogram, MetricsMiddleware
+
+class _Route:
+    path = "/api/v1/users/{user_id}"
+
+async def endpoint(scope, receive, send):
+    scope["route"] = _Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+async def receive():
+    return {"type": "http.request", "body": b""}
+
+async def send(message):
+    pass
+
+async def drive(app, iterations: int) -> float:
+    scope = {"type": "http", "method": "GET", "path": "/api/v1/users/42"}
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+def main(args) -> None:
+    bare_us = asyncio.run(drive(endpoint, args.iterations))
+    wrapped_us = asyncio.run(drive(MetricsMiddleware(endpoint), args.iterations))
+
+    counter = Counter("bench_total", "benchmark", ["method", "route", "status"])
+    histogram = Histogram("bench_seconds", "benchmark", ["method", "route"])
+    results = {
+        "middleware": {
+            "bare_us": round(bare_us, 2),
+            "instrumented_us": round(wrapped_us, 2),
+            "overhead_us": round(wrapped_us - bare_us, 2),
+        },
+        "counter.inc": {"per_call_us": round(time_per_call(
+            lambda: counter.inc("GET", "/api/v1/users/{user_id}", "200"), args.iterations), 2)},
+        "histogram.observe": {"per_call_us": round(time_per_call(
+            lambda: histogram.observe(0.004, "GET", "/api/v1/users/{user_id}"), args.iterations), 2)},
+    }
+    print_table(f"Metrics ({args.iterations} iterations)", results)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--iterations", type=int, default=100000)
+    main(parser.parse_args())
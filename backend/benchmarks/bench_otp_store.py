@@ -0,0 +1,71 @@
+"""
+OTP store verify throughput under concurrent load
+
+Stores one OTP per phone number, then has ``--concurrency`` tasks verify them
+(one wrong guess followed by the right code, as a typical client would).
+Runs against the in-memory store and against Redis: a real server when
+``--redis-url`` is given, otherwise fakeredis.
+
+    python -m benchmarks.bench_otp_store --phones 5000 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import time
+from benchmarks.common import print_table, summarize
+from app.services.otp_store import InMemoryOTPStore, OTPStore, RedisOTPStore
+
+async def run_verify_load(store: OTPStore, phones: int, concurrency: int) -> dict:
+    numbers = [f"+1555{index:07d}" for index in range(phones)]
+    for number in numbers:
+        await store.store(number, "123456")
+
+    queue: asyncio.Queue = asyncio.Queue()
+    for number in numbers:
+        queue.put_nowait(number)
+
+    samples = []
+    failures = 0
+
+    async def worker():
+        nonlocal failures
+        while not queue.empty():
+            number = queue.get_nowait()
+            for code in ("000000", "123456"):
+                start = time.perf_counter()
+                result = await store.verify(number, code)
+                samples.append(time.perf_counter() - start)
+            if not result["success"]:
+                failures += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    summary = summarize(samples, elapsed)
+    summary["failures"] = failures
+    return summary
+
+def build_redis_store(redis_url: str) -> RedisOTPStore:
+    if redis_url:
+        return RedisOTPStore.from_url(redis_url)
+    import fakeredis
+    return RedisOTPStore(fakeredis.FakeAsyncRedis())
+
+async def main(args) -> None:
+    results = {
+        "memory": await run_verify_load(InMemoryOTPStore(), args.phones, args.concurrency),
+        "redis" if args.redis_url else "fakeredis": await run_verify_load(
+            build_redis_store(args.redis_url), args.phones, args.concurrency
+        ),
+    }
+    print_table(
+        f"OTP verify ({args.phones} phones, concurrency={args.concurrency})", results
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--phones", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--redis-url", default="", help="e.g. redis://localhost:6379/15")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,75 @@
+"""
+Rate limiter overhead under concurrent load
+
+Has ``--concurrency`` tasks push ``--requests`` OTP-style checks (one
+per-phone and one per-IP rule each, as limit_otp_requests does) spread
+over ``--phones`` phone numbers and 256 client IPs, with limits high
+enough that nothing is rejected, so every call does the full bookkeeping.
+Runs against the in-memory token buckets and the Redis sliding window: a
+real server when ``--redis-url`` is given, otherwise fakeredis.
+
+    python -m benchmarks.bench_rate_limiter --requests 50000 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import time
+from benchmarks.common import print_table, summarize
+from app.services.rate_limiter import InMemoryRateLimiter, RateLimiter, RedisRateLimiter
+
+async def run_load(limiter: RateLimiter, requests: int, phones: int, concurrency: int) -> dict:
+    queue: asyncio.Queue = asyncio.Queue()
+    for index in range(requests):
+        queue.put_nowait(index)
+
+    samples = []
+    rejected = 0
+
+    async def worker():
+        nonlocal rejected
+        while not queue.empty():
+            index = queue.get_nowait()
+            rules = (
+                (f"send_otp:phone:+1555{index % phones:07d}", requests, 900),
+                (f"send_otp:ip:10.0.{index % 256}.1", requests, 900),
+            )
+            start = time.perf_counter()
+            retry_after = await limiter.hit(rules)
+            samples.append(time.perf_counter() - start)
+            rejected += retry_after > 0
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    summary = summarize(samples, elapsed)
+    summary["rejected"] = rejected
+    return summary
+
+def build_redis_limiter(redis_url: str) -> RedisRateLimiter:
+    if redis_url:
+        return RedisRateLimiter.from_url(redis_url)
+    import fakeredis
+    return RedisRateLimiter(fakeredis.FakeAsyncRedis())
+
+async def main(args) -> None:
+    redis_requests = args.requests if args.redis_url else min(args.requests, 5000)
+    results = {
+        "memory token bucket": await run_load(
+            InMemoryRateLimiter(), args.requests, args.phones, args.concurrency
+        ),
+        "redis sliding window" if args.redis_url else "fakeredis sliding window": await run_load(
+            build_redis_limiter(args.redis_url), redis_requests, args.phones, args.concurrency
+        ),
+    }
+    print_table(
+        f"Rate limiter checks ({args.phones} phones, concurrency={args.concurrency})", results
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=50000)
+    parser.add_argument("--phones", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--redis-url", default="", help="e.g. redis://localhost:6379/15")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,105 @@
+"""
+Response serialization: response_model validation vs the trusted fast path
+
+Renders --users in-memory User rows (as loaded by the ORM) to JSON the
+ways a response can be produced:
+
+- validate + jsonable_encoder + json.dumps: FastAPI's path with an
+  explicit JSONResponse (and on releases without Pydantic dump_json)
+- validate + dump_json: FastAPI's response_model path on current releases
+- dump_trusted: app.core.serialization.render with FAST_RESPONSES (no
+  validation; orjson from the row's attributes, TypeAdapter for models)
+
+plus the AuthResponse returned by every login and one admin listing page,
+and plain dicts through json.dumps vs orjson (untyped routes):
+
+    python -m benchmarks.bench_serialization --users 5000
+"""
+
+import argparse
+import json
+import uuid
+from datetime import datetime, timedelta
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from benchmarks.common import print_table, time_per_call
+from app.core.serialization import RESPONSE_ADAPTERS, dump_trusted, orjson
+from app.models.user import User
+from app.schemas.auth import AuthResponse
+from app.schemas.user import UserListResponse, UserProfile, UserResponse
+
+def make_users(count: int):
+    created = datetime(2025, 1, 1)
+    return [
+        User(
+            id=uuid.uuid4(), firebase_uid=f"phone_{index}", auth_method="phone",
+            phone_number=f"+1{index:010d}", email=None, first_name="User", last_name="Name",
+            age=30, gender="other", country="USA", is_active=True, is_phone_verified=True,
+            is_email_verified=False, profile_completed=True, privacy_policy_accepted=True,
+            terms_accepted=True, created_at=created + timedelta(seconds=index),
+            updated_at=created + timedelta(seconds=index)
+        )
+        for index in range(count)
+    ]
+
+def cases(model, sources):
+    """Per-item serializers of ``sources`` declared as ``model``"""
+    validator = TypeAdapter(model)
+    adapter = RESPONSE_ADAPTERS[model]
+
+    def encoder():
+        for source in sources:
+            json.dumps(jsonable_encoder(validator.validate_python(source, from_attributes=True))).encode()
+
+    def validated():
+        for source in sources:
+            adapter.dump_json(validator.validate_python(source, from_attributes=True))
+
+    def trusted():
+        for source in sources:
+            dump_trusted(model, source)
+
+    return {
+        "validate + json.dumps": encoder,
+        "validate + dump_json": validated,
+        "dump_trusted": trusted,
+    }
+
+def main(args) -> None:
+    users = make_users(args.users)
+    auth = [
+        AuthResponse(access_token="a" * 180, refresh_token="r" * 180, user_id=str(user.id),
+                     profile_completed=True, expires_in=86400)
+        for user in users
+    ]
+    pages = [UserListResponse(
+        items=[UserResponse.model_validate(user) for user in users[start:start + 100]], next_cursor="c" * 60
+    ) for start in range(0, len(users), 100)]
+    dicts = [{"id": str(user.id), "phone_number": user.phone_number, "message": "ok"} for user in users]
+
+    for title, model, sources in (
+        ("UserResponse", UserResponse, users),
+        ("UserProfile", UserProfile, users),
+        ("AuthResponse", AuthResponse, auth),
+        ("UserListResponse (100 users per page)", UserListResponse, pages),
+    ):
+        results = {
+            name: {"us_per_item": round(time_per_call(run, args.repeat) / len(sources), 2)}
+            for name, run in cases(model, sources).items()
+        }
+        print_table(f"{title}, {len(sources)} items", results)
+
+    results = {"json.dumps": {"us_per_item": round(
+        time_per_call(lambda: [json.dumps(item).encode() for item in dicts], args.repeat) / len(dicts), 2
+    )}}
+    if orjson is not None:
+        results["orjson.dumps"] = {"us_per_item": round(
+            time_per_call(lambda: [orjson.dumps(item) for item in dicts], args.repeat) / len(dicts), 2
+        )}
+    print_table(f"Untyped dict responses, {len(dicts)} items", results)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    main(parser.parse_args())
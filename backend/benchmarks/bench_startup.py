@@ -0,0 +1,110 @@
+"""
+Startup cost: import time and time to first response, against a budget
+
+Imports app.main in --runs fresh interpreters, then starts uvicorn --runs
+times and measures from spawning the process until GET /health answers.
+Also lists the provider SDKs that importing the app loaded, which should
+only happen on first use. Exits with status 1 when the median import time
+or time to first response is over its budget, or a deferred SDK was
+imported eagerly, so that it can gate CI:
+
+    python -m benchmarks.bench_startup --runs 5 --import-budget-ms 1500 --first-response-budget-ms 3000
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+from typing import List
+from benchmarks.common import print_table
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Loaded on first use of a provider, never by importing the app
+DEFERRED_MODULES = ("firebase_admin", "google.auth", "httpx")
+
+IMPORT_SCRIPT = f"""
+import json, sys, time
+start = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "import_ms": elapsed * 1000,
+    "eager_modules": [name for name in {DEFERRED_MODULES!r} if name in sys.modules],
+}}))
+"""
+
+def measure_import(runs: int) -> List[dict]:
+    """Import app.main in ``runs`` fresh interpreters"""
+    results = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", IMPORT_SCRIPT], cwd=BACKEND_DIR, env=os.environ.copy(),
+            check=True, capture_output=True, text=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    return results
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def measure_first_response(timeout: float = 30.0) -> float:
+    """Milliseconds from spawning uvicorn until /health answers"""
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=os.environ.copy(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with status {server.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - start) * 1000
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError(f"no response within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+def main(args) -> int:
+    imports = measure_import(args.runs)
+    import_ms = statistics.median(result["import_ms"] for result in imports)
+    eager = sorted({name for result in imports for name in result["eager_modules"]})
+    first_response_ms = statistics.median(measure_first_response() for _ in range(args.runs))
+
+    print_table(f"Startup (median of {args.runs} runs)", {
+        "import app.main": {"ms": round(import_ms, 1), "budget_ms": args.import_budget_ms},
+        "time to first response": {"ms": round(first_response_ms, 1), "budget_ms": args.first_response_budget_ms},
+        "eagerly imported SDKs": {"modules": ",".join(eager) or "none"},
+    })
+
+    failures = []
+    if import_ms > args.import_budget_ms:
+        failures.append(f"import took {import_ms:.0f} ms (budget {args.import_budget_ms} ms)")
+    if first_response_ms > args.first_response_budget_ms:
+        failures.append(f"first response took {first_response_ms:.0f} ms (budget {args.first_response_budget_ms} ms)")
+    if eager:
+        failures.append(f"imported at startup: {', '.join(eager)}")
+    for failure in failures:
+        print(f"\nOVER BUDGET: {failure}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget-ms", type=float, default=1500)
+    parser.add_argument("--first-response-budget-ms", type=float, default=3000)
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,97 @@
+"""
+Token denylist check cost with a million revoked tokens
+
+Fills a TokenDenylist with --revoked jtis and times is_revoked for tokens
+that are not revoked (every normal request) and for revoked ones, and
+reports the memory held by the in-process set. Then measures one worker's
+sync of --sync-entries revocations from the shared store: a real Redis
+when --redis-url is given, otherwise fakeredis.
+
+    python -m benchmarks.bench_token_denylist --revoked 1000000
+"""
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+import uuid
+from benchmarks.common import print_table, time_per_call
+from app.services.token_denylist import RedisRevocationStore, TokenDenylist
+
+def fill(denylist: TokenDenylist, jtis: list) -> None:
+    # Expiries spread over the next hour, as with steady logouts
+    exp = int(time.time()) + 3600
+    for index, jti in enumerate(jtis):
+        denylist._add(jti, exp + index % 3600)
+
+def build_store(redis_url: str) -> RedisRevocationStore:
+    if redis_url:
+        return RedisRevocationStore.from_url(redis_url, 86400)
+    import fakeredis
+    return RedisRevocationStore(fakeredis.FakeAsyncRedis(), 86400)
+
+async def measure_sync(redis_url: str, entries: int) -> dict:
+    store = build_store(redis_url)
+    await store.redis.delete(store.KEY)
+    exp = int(time.time()) + 3600
+    for start in range(0, entries, 10000):
+        await store.redis.zadd(store.KEY, {
+            f"{uuid.uuid4().hex}:{exp}": time.time() * 1000 for _ in range(min(10000, entries - start))
+        })
+    worker = TokenDenylist(store)
+
+    start = time.perf_counter()
+    fetched = await worker.sync()
+    full = time.perf_counter() - start
+
+    await worker.revoke(uuid.uuid4().hex, exp)
+    start = time.perf_counter()
+    await worker.sync()
+    incremental = time.perf_counter() - start
+    await store.redis.delete(store.KEY)
+    return {
+        "entries": fetched,
+        "full_sync_ms": round(full * 1000, 1),
+        "incremental_sync_ms": round(incremental * 1000, 3),
+    }
+
+def main(args) -> None:
+    revoked = [uuid.uuid4().hex for _ in range(args.revoked)]
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    denylist = TokenDenylist()
+    fill(denylist, revoked)
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    live = [uuid.uuid4().hex for _ in range(10000)]
+    hits = revoked[:10000]
+    iterations = 20
+
+    def check_live():
+        for jti in live:
+            denylist.is_revoked(jti)
+
+    def check_revoked():
+        for jti in hits:
+            denylist.is_revoked(jti)
+
+    results = {
+        "is_revoked (not revoked)": {"ns_per_check": round(time_per_call(check_live, iterations) / len(live) * 1000, 1)},
+        "is_revoked (revoked)": {"ns_per_check": round(time_per_call(check_revoked, iterations) / len(hits) * 1000, 1)},
+        "memory": {
+            "mb": round(held / 1e6, 1),
+            "bytes_per_token": round(held / len(revoked), 1),
+        },
+    }
+    print_table(f"Token denylist with {len(revoked)} revoked tokens", results)
+
+    label = "redis" if args.redis_url else "fakeredis"
+    print_table(f"Worker sync from {label}", {"sync": asyncio.run(measure_sync(args.redis_url, args.sync_entries))})
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--revoked", type=int, default=1000000)
+    parser.add_argument("--sync-entries", type=int, default=100000)
+    parser.add_argument("--redis-url", default="", help="e.g. redis://localhost:6379/15")
+    main(parser.parse_args())
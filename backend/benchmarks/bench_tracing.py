@@ -0,0 +1,67 @@
+"""
+Micro-benchmark for the tracing overhead
+
+Drives a trivial ASGI app directly (no HTTP client, no routing) bare, with
+TracingMiddleware sampling nothing (TRACING_SAMPLE_RATIO=0) and sampling
+every request, and runs SQLite ``SELECT 1`` on an engine without tracing
+hooks, with hooks outside a trace and with hooks inside a sampled trace
+(all with the query statistics hooks every application engine has).
+Reports microseconds per request / statement: unsampled traces should add
+a few microseconds at most (with TRACING_ENABLED off nothing is installed).
+
+    python -m benchmarks.bench_tracing --iterations 100000
+"""
+
+import argparse
+import asyncio
+from sqlalchemy import create_engine
+from benchmarks.common import print_table, time_per_call
+from benchmarks.bench_metrics import drive, endpoint
+from app.core.query_stats import instrument_queries
+from app.core.tracing import InMemoryExporter, Tracer, TracingMiddleware, instrument_tracing
+
+def statement_cost(iterations: int, instrumented: bool, tracer: Tracer = None) -> float:
+    """Microseconds per ``SELECT 1``, optionally within a sampled trace"""
+    engine = create_engine("sqlite://")
+    instrument_queries(engine)
+    if instrumented:
+        instrument_tracing(engine)
+    with engine.connect() as conn:
+        root = tracer.start_trace("bench") if tracer is not None else None
+        with Tracer.use_span(root):
+            per_call = time_per_call(lambda: conn.exec_driver_sql("SELECT 1"), iterations)
+    engine.dispose()
+    return per_call
+
+def main(args) -> None:
+    # Keep every sampled span, so the sampled rows include queueing them
+    def make_tracer(ratio: float) -> Tracer:
+        return Tracer(InMemoryExporter(max_spans=1), sample_ratio=ratio, max_queue_size=args.iterations * 2)
+
+    bare_us = asyncio.run(drive(endpoint, args.iterations))
+    unsampled_us = asyncio.run(drive(TracingMiddleware(endpoint, tracer=make_tracer(0.0)), args.iterations))
+    sampled_us = asyncio.run(drive(TracingMiddleware(endpoint, tracer=make_tracer(1.0)), args.iterations))
+
+    statement_bare_us = statement_cost(args.iterations, instrumented=False)
+    statement_unsampled_us = statement_cost(args.iterations, instrumented=True)
+    statement_sampled_us = statement_cost(args.iterations, instrumented=True, tracer=make_tracer(1.0))
+
+    def row(base: float, value: float) -> dict:
+        return {"per_call_us": round(value, 2), "overhead_us": round(value - base, 2)}
+
+    results = {
+        "request bare": row(bare_us, bare_us),
+        "request unsampled": row(bare_us, unsampled_us),
+        "request sampled": row(bare_us, sampled_us),
+        "statement bare": row(statement_bare_us, statement_bare_us),
+        "statement unsampled": row(statement_bare_us, statement_unsampled_us),
+        "statement sampled": row(statement_bare_us, statement_sampled_us),
+        "span outside a trace": {"per_call_us": round(time_per_call(
+            lambda: Tracer.span("bench").__enter__(), args.iterations), 3)},
+    }
+    print_table(f"Tracing ({args.iterations} iterations)", results)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--iterations", type=int, default=100000)
+    main(parser.parse_args())
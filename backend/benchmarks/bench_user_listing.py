@@ -0,0 +1,104 @@
+"""
+Admin user listing latency by page depth: keyset cursor vs OFFSET
+
+Seeds --rows users (1M by default; reused across runs while the count
+matches) and times fetching one --limit page at several depths, once with
+the listing's (created_at, id) cursor and once with an equivalent
+LIMIT/OFFSET query for contrast. Keyset pages should cost the same at every
+depth; OFFSET pages grow linearly.
+
+    python -m benchmarks.bench_user_listing --rows 1000000 --limit 100
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import func, insert, select
+from benchmarks.common import print_table, summarize
+from app.core.database import AsyncSessionLocal, async_engine, engine
+from app.models.base import Base
+from app.models.user import User
+from app.services.user_service import USER_RESPONSE_COLUMNS, async_user_service
+
+DEPTHS = (0.0, 0.1, 0.5, 0.9, 0.999)
+
+def seed(rows: int, batch_size: int = 20000) -> None:
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        if conn.execute(select(func.count()).select_from(User)).scalar() == rows:
+            return
+        conn.execute(User.__table__.delete())
+    start = datetime(2025, 1, 1)
+    for offset in range(0, rows, batch_size):
+        with engine.begin() as conn:
+            conn.execute(insert(User), [
+                {
+                    "id": uuid.uuid4(),
+                    "firebase_uid": f"phone_{index}",
+                    "auth_method": "phone",
+                    "phone_number": f"+1{index:010d}",
+                    "first_name": "User",
+                    "last_name": "Name",
+                    "country": "USA",
+                    "is_active": True,
+                    "profile_completed": False,
+                    # Ten users per second, so created_at has ties
+                    "created_at": start + timedelta(seconds=index // 10),
+                }
+                for index in range(offset, min(offset + batch_size, rows))
+            ])
+
+async def cursor_at(position: int):
+    """The cursor of the row before ``position`` (not timed)"""
+    if position == 0:
+        return None
+    async with AsyncSessionLocal() as db:
+        stmt = async_user_service._listing_query(db, None, {}).offset(position - 1).limit(1)
+        row = (await db.execute(stmt)).mappings().one()
+        return async_user_service._row_cursor(row)
+
+async def time_keyset(cursor, limit: int, repeat: int) -> dict:
+    samples = []
+    async with AsyncSessionLocal() as db:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            await async_user_service.list_users(db, limit, cursor)
+            samples.append(time.perf_counter() - start)
+    return summarize(samples, sum(samples))
+
+async def time_offset(position: int, limit: int, repeat: int) -> dict:
+    samples = []
+    stmt = (
+        select(*USER_RESPONSE_COLUMNS)
+        .order_by(User.created_at, User.id)
+        .offset(position)
+        .limit(limit)
+    )
+    async with AsyncSessionLocal() as db:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            (await db.execute(stmt)).mappings().all()
+            samples.append(time.perf_counter() - start)
+    return summarize(samples, sum(samples))
+
+async def main(args) -> None:
+    seed(args.rows)
+    results = {}
+    for depth in DEPTHS:
+        position = min(int(args.rows * depth), args.rows - args.limit)
+        cursor = await cursor_at(position)
+        keyset = await time_keyset(cursor, args.limit, args.repeat)
+        offset = await time_offset(position, args.limit, args.repeat)
+        results[f"row {position} keyset"] = {key: keyset[key] for key in ("p50_ms", "p95_ms")}
+        results[f"row {position} offset"] = {key: offset[key] for key in ("p50_ms", "p95_ms")}
+    print_table(f"User listing on {async_engine.dialect.name} ({args.rows} rows, limit={args.limit})", results)
+    await async_engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
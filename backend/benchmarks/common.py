@@ -0,0 +1,38 @@
+"""Shared timing helpers for the benchmark scripts"""
+
+import statistics
+import time
+from typing import Callable, Dict, List
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of ``samples``"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+def summarize(samples: List[float], elapsed: float) -> Dict[str, float]:
+    """Throughput and latency percentiles (milliseconds) for timed samples"""
+    return {
+        "count": len(samples),
+        "throughput_per_s": round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(statistics.fmean(samples) * 1000, 4) if samples else 0.0,
+        "p50_ms": round(percentile(samples, 50) * 1000, 4),
+        "p95_ms": round(percentile(samples, 95) * 1000, 4),
+        "p99_ms": round(percentile(samples, 99) * 1000, 4),
+    }
+
+def time_per_call(func: Callable[[], object], iterations: int) -> float:
+    """Average wall time per call in microseconds"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+def print_table(title: str, rows: Dict[str, Dict[str, float]]) -> None:
+    """Print one line per benchmark case"""
+    print(f"\n{title}")
+    for name, result in rows.items():
+        fields = "  ".join(f"{key}={value}" for key, value in result.items())
+        print(f"  {name:<28} {fields}")
@@ -0,0 +1,14 @@
+"""
+End-to-end load and latency benchmark for the authentication flows
+
+Drives the real ASGI app, either in-process (httpx.ASGITransport) or over
+HTTP against a local uvicorn server, through send-otp -> verify-otp ->
+complete-profile -> /auth/me -> refresh (plus Google login with a locally
+signed ID token). SMS goes through MockTwilioService and Firebase is
+replaced by a local key pair. Reports p50/p95/p99 latency and throughput
+per route, writes them as JSON and compares against a saved baseline.
+
+    python -m benchmarks.loadtest --db sqlite --mode asgi --users 200
+    python -m benchmarks.loadtest --db postgres --mode uvicorn \\
+        --baseline benchmarks/results/baseline-postgres-uvicorn.json
+"""
@@ -0,0 +1,67 @@
+"""Virtual-user flows exercised by the load test"""
+
+import asyncio
+import time
+from typing import Awaitable, Callable, List
+import httpx
+from benchmarks.loadtest.report import LatencyRecorder
+
+API_PREFIX = "/api/v1"
+
+PROFILE = {
+    "first_name": "Load",
+    "last_name": "Test",
+    "age": 30,
+    "gender": "prefer_not_to_say",
+    "country": "USA",
+}
+
+async def timed_request(client: httpx.AsyncClient, recorder: LatencyRecorder, method: str,
+                        path: str, **kwargs) -> httpx.Response:
+    """Issue one request and record its latency under ``METHOD path``"""
+    start = time.perf_counter()
+    response = await client.request(method, API_PREFIX + path, **kwargs)
+    recorder.record(f"{method} {path}", time.perf_counter() - start, response.status_code < 400)
+    return response
+
+async def phone_flow(client: httpx.AsyncClient, recorder: LatencyRecorder, phone_number: str,
+                     me_requests: int) -> None:
+    """send-otp -> verify-otp -> complete-profile -> /auth/me (xN) -> refresh"""
+    await timed_request(client, recorder, "POST", "/auth/phone/send-otp",
+                        json={"phone_number": phone_number})
+    response = await timed_request(client, recorder, "POST", "/auth/phone/verify-otp",
+                                   json={"phone_number": phone_number, "otp_code": "123456"})
+    if response.status_code != 200:
+        return
+    tokens = response.json()
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+
+    await timed_request(client, recorder, "POST", "/auth/complete-profile",
+                        json=PROFILE, headers=headers)
+    for _ in range(me_requests):
+        await timed_request(client, recorder, "GET", "/auth/me", headers=headers)
+    await timed_request(client, recorder, "POST", "/auth/refresh",
+                        json={"refresh_token": tokens["refresh_token"]})
+
+async def google_flow(client: httpx.AsyncClient, recorder: LatencyRecorder, id_token: str,
+                      me_requests: int) -> None:
+    """google/login -> /auth/me (xN)"""
+    response = await timed_request(client, recorder, "POST", "/auth/google/login",
+                                   json={"id_token": id_token})
+    if response.status_code != 200:
+        return
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    for _ in range(me_requests):
+        await timed_request(client, recorder, "GET", "/auth/me", headers=headers)
+
+async def run_flows(flows: List[Callable[[], Awaitable[None]]], concurrency: int) -> None:
+    """Run flow factories with at most ``concurrency`` virtual users at once"""
+    queue: asyncio.Queue = asyncio.Queue()
+    for flow in flows:
+        queue.put_nowait(flow)
+
+    async def virtual_user():
+        while not queue.empty():
+            await queue.get_nowait()()
+
+    await asyncio.gather(*(virtual_user() for _ in range(concurrency)))
@@ -0,0 +1,102 @@
+"""Per-route latency recording, JSON reports and baseline comparison"""
+
+import json
+import os
+import time
+from collections import defaultdict
+from typing import Dict, List
+from benchmarks.common import summarize
+
+class LatencyRecorder:
+    """Collects response times and error counts per route"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+
+    def record(self, route: str, seconds: float, ok: bool) -> None:
+        self.samples[route].append(seconds)
+        if not ok:
+            self.errors[route] += 1
+
+    def finish(self) -> None:
+        self.finished_at = time.perf_counter()
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    def routes(self) -> Dict[str, dict]:
+        report = {}
+        for route, samples in self.samples.items():
+            report[route] = summarize(samples, self.elapsed)
+            report[route]["errors"] = self.errors[route]
+        return report
+
+    def total(self) -> dict:
+        everything = [sample for samples in self.samples.values() for sample in samples]
+        total = summarize(everything, self.elapsed)
+        total["errors"] = sum(self.errors.values())
+        return total
+
+def build_report(recorder: LatencyRecorder, meta: dict) -> dict:
+    return {
+        "meta": dict(meta, elapsed_s=round(recorder.elapsed, 3), timestamp=time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())),
+        "routes": recorder.routes(),
+        "total": recorder.total(),
+    }
+
+def save_report(report: dict, path: str) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+def load_report(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+def compare_to_baseline(report: dict, baseline: dict, tolerance: float) -> List[str]:
+    """
+    List regressions against ``baseline``
+
+    A route regresses when its p95 or p99 latency grows, or its throughput
+    drops, by more than ``tolerance`` (a fraction, e.g. 0.2 for 20%), or when
+    it starts returning errors.
+    """
+    regressions = []
+    for route, base in baseline.get("routes", {}).items():
+        current = report["routes"].get(route)
+        if current is None:
+            regressions.append(f"{route}: missing from this run")
+            continue
+        for metric in ("p95_ms", "p99_ms"):
+            if base[metric] and current[metric] > base[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{route}: {metric} {current[metric]} > baseline {base[metric]} (+{tolerance:.0%})"
+                )
+        if base["throughput_per_s"] and current["throughput_per_s"] < base["throughput_per_s"] * (1 - tolerance):
+            regressions.append(
+                f"{route}: throughput {current['throughput_per_s']}/s < baseline {base['throughput_per_s']}/s (-{tolerance:.0%})"
+            )
+        if current["errors"] > base.get("errors", 0):
+            regressions.append(f"{route}: {current['errors']} errors (baseline {base.get('errors', 0)})")
+    return regressions
+
+def print_report(report: dict) -> None:
+    meta = report["meta"]
+    print(
+        f"\nAuth flows: db={meta['db']} mode={meta['mode']} users={meta['users']} "
+        f"concurrency={meta['concurrency']} elapsed={meta['elapsed_s']}s"
+    )
+    header = f"  {'route':<34}{'count':>7}{'err':>5}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    print(header)
+    rows = dict(report["routes"], TOTAL=report["total"])
+    for route, r in rows.items():
+        print(
+            f"  {route:<34}{r['count']:>7}{r['errors']:>5}{r['throughput_per_s']:>10}"
+            f"{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}"
+        )
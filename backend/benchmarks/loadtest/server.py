@@ -0,0 +1,31 @@
+"""
+Local uvicorn server for the load test
+
+Trusts the load test's locally generated Firebase certificates (JSON file
+named by LOADTEST_FIREBASE_CERTS) before serving the app.
+
+    python -m benchmarks.loadtest.server --port 8765
+"""
+
+import argparse
+import json
+import os
+import uvicorn
+from app.main import app
+from app.services.firebase_service import firebase_service
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    certs_path = os.environ.get("LOADTEST_FIREBASE_CERTS")
+    if certs_path:
+        with open(certs_path) as f:
+            firebase_service.certificates.set_certificates(json.load(f), max_age=86400)
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning", access_log=False)
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,42 @@
 import pytest
+from contextlib import contextmanager
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from app.main import app
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import get_db, get_async_db, get_async_session_factory
+from app.core.query_stats import instrument_queries
+from app.core.tracing import instrument_tracing
 from app.models.base import Base
+from app.services.rate_limiter import rate_limiter
+from app.warmup import warmup
 import os
 
 # Test database URL
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+ASYNC_SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Each TestClient runs its own event loop, so async connections are not pooled
+async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL, poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+# Per-request query statistics (Server-Timing) as on the application engines
+instrument_queries(engine)
+instrument_queries(async_engine.sync_engine)
+# SQL spans (only within traced requests, see test_tracing)
+instrument_tracing(engine)
+instrument_tracing(async_engine.sync_engine)
+
 def override_get_db():
     try:
         db = TestingSessionLocal()
@@ -22,17 +44,66 @@ def override_get_db():
     finally:
         db.close()
 
+async def override_get_async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_async_db] = override_get_async_db
+app.dependency_overrides[get_async_session_factory] = lambda: TestingAsyncSessionLocal
+
+# The lifespan warmup would run against the configured database, alongside
+# the test's own statements; tests run it explicitly instead
+warmup.enabled = False
+# No requests to googleapis.com from the lifespan of every TestClient
+settings.FIREBASE_CERT_BACKGROUND_REFRESH = False
+
+@contextmanager
+def _count_statements(engines=(async_engine.sync_engine,)):
+    """Collect the SQL statements sent by ``engines`` (one per round trip), async test engine by default"""
+    statements = []
+    def _record(conn, cursor, statement, *args):
+        statements.append(statement)
+    for target in engines:
+        event.listen(target, "before_cursor_execute", _record)
+    try:
+        yield statements
+    finally:
+        for target in engines:
+            event.remove(target, "before_cursor_execute", _record)
+
+@contextmanager
+def _assert_max_queries(limit: int):
+    """
+    Fail if the block sends more than ``limit`` SQL statements
+
+    Counts both test engines, so it covers sync and async endpoints alike:
+
+        with assert_max_queries(1):
+            client.get("/api/v1/users/profile", headers=headers)
+    """
+    with _count_statements((engine, async_engine.sync_engine)) as statements:
+        yield statements
+    assert len(statements) <= limit, (
+        f"{len(statements)} queries, expected at most {limit}:\n" + "\n".join(statements)
+    )
+
+def _remove_test_database():
+    # Release pooled connections before deleting the file they point at
+    engine.dispose()
+    if os.path.exists("./test.db"):
+        os.remove("./test.db")
 
 @pytest.fixture
 def client():
     Base.metadata.create_all(bind=engine)
     with TestClient(app) as c:
+        # On the client's event loop, which the Redis backend's connections belong to
+        c.portal.call(rate_limiter.clear)
         yield c
     Base.metadata.drop_all(bind=engine)
     # Clean up test database
-    if os.path.exists("./test.db"):
-        os.remove("./test.db")
+    _remove_test_database()
 
 @pytest.fixture
 def db_session():
@@ -43,5 +114,28 @@ def db_session():
     finally:
         db.close()
         Base.metadata.drop_all(bind=engine)
-        if os.path.exists("./test.db"):
-            os.remove("./test.db")
+        _remove_test_database()
+
+@pytest.fixture
+def async_session_factory():
+    """Session factory of the async test engine"""
+    return TestingAsyncSessionLocal
+
+@pytest.fixture
+def session_factory():
+    """Session factory of the sync test engine"""
+    return TestingSessionLocal
+
+@pytest.fixture
+def async_test_engine():
+    return async_engine
+
+@pytest.fixture
+def count_statements():
+    """``with count_statements() as statements:`` collects the async engine's SQL"""
+    return _count_statements
+
+@pytest.fixture
+def assert_max_queries():
+    """``with assert_max_queries(limit):`` fails if the block sends more statements"""
+    return _assert_max_queries
@@ -0,0 +1,133 @@
+"""
+Helpers shared by the tests (and the benchmarks)
+
+login / auth_headers log a phone user in through the demo OTP flow and
+build its bearer headers; phone_user is the UserCreate for such a user.
+TwilioMessagesStub answers TwilioService's requests in place of the
+Twilio Messages API.
+
+LocalFirebaseSigner stands in for Google's Firebase ID token signing: it
+generates an RSA key pair with a self-signed certificate, installs the
+certificate into FirebaseService's certificate cache and issues ID tokens
+signed with the private key, so google_login runs fully offline.
+"""
+
+import datetime
+import time
+import uuid
+from urllib.parse import parse_qs
+import httpx
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from fastapi.testclient import TestClient
+from google.auth import crypt, jwt as google_jwt
+from app.schemas.user import UserCreate
+from app.services.sms_transport import TwilioHTTPTransport
+from app.services.twilio_service import TwilioService
+
+ADMIN_HEADERS = {"X-Admin-Key": "test-admin-key"}
+
+def login(client: TestClient, phone_number: str = "+1234567890") -> dict:
+    """Log in through the demo OTP flow and return the auth payload"""
+    client.post("/api/v1/auth/phone/send-otp", json={"phone_number": phone_number})
+    response = client.post(
+        "/api/v1/auth/phone/verify-otp",
+        json={"phone_number": phone_number, "otp_code": "123456"}
+    )
+    assert response.status_code == 200
+    return response.json()
+
+def auth_headers(auth: dict) -> dict:
+    return {"Authorization": f"Bearer {auth['access_token']}"}
+
+def phone_user(phone_number: str) -> UserCreate:
+    return UserCreate(
+        firebase_uid=f"phone_{phone_number.replace('+', '')}",
+        auth_method="phone",
+        phone_number=phone_number,
+        first_name="User",
+        last_name="Name",
+        country="USA",
+    )
+
+class TwilioMessagesStub:
+    """Stands in for the Twilio Messages API"""
+
+    def __init__(self, status_code: int = 201):
+        self.status_code = status_code
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if self.status_code >= 400:
+            return httpx.Response(self.status_code, json={"message": "stub failure"})
+        form = parse_qs(request.content.decode())
+        return httpx.Response(
+            201, json={"sid": f"SM{len(self.requests):032d}", "to": form["To"][0], "status": "queued"}
+        )
+
+def make_service(stub: TwilioMessagesStub) -> TwilioService:
+    transport = TwilioHTTPTransport(
+        "ACtest", "token", base_url="http://twilio.local", transport=httpx.MockTransport(stub)
+    )
+    return TwilioService(transport=transport)
+
+class LocalFirebaseSigner:
+    """Issues Firebase-style ID tokens signed by a locally generated key"""
+
+    def __init__(self, project_id: str, key_id: str = "local-signing-key"):
+        self.project_id = project_id
+        self.key_id = key_id
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "securetoken.local")])
+        now = datetime.datetime.now(datetime.timezone.utc)
+        certificate = (
+            x509.CertificateBuilder()
+            .subject_name(name)
+            .issuer_name(name)
+            .public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(days=1))
+            .not_valid_after(now + datetime.timedelta(days=1))
+            .sign(key, hashes.SHA256())
+        )
+        self.certificate_pem = certificate.public_bytes(serialization.Encoding.PEM).decode()
+        private_pem = key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption()
+        )
+        self.signer = crypt.RSASigner.from_string(private_pem, key_id=key_id)
+
+    @property
+    def certificates(self) -> dict:
+        return {self.key_id: self.certificate_pem}
+
+    def install(self, firebase_service, max_age: float = 3600) -> None:
+        """Make ``firebase_service`` trust this signer's certificate"""
+        firebase_service.project_id = self.project_id
+        firebase_service.certificates.set_certificates(self.certificates, max_age)
+
+    def issue_token(self, uid: str = None, email: str = None, name: str = "Bench User",
+                    lifetime: int = 3600) -> str:
+        """Sign an ID token shaped like the ones Google Sign-In returns via Firebase"""
+        uid = uid or uuid.uuid4().hex
+        now = int(time.time())
+        payload = {
+            "iss": f"https://securetoken.google.com/{self.project_id}",
+            "aud": self.project_id,
+            "auth_time": now,
+            "iat": now,
+            "exp": now + lifetime,
+            "sub": uid,
+            "user_id": uid,
+            "email": email or f"{uid}@example.com",
+            "email_verified": True,
+            "name": name,
+            "firebase": {"sign_in_provider": "google.com"},
+            # Keeps tokens issued within the same second distinct
+            "nonce": uuid.uuid4().hex,
+        }
+        return google_jwt.encode(self.signer, payload).decode()
@@ -1,5 +1,11 @@
+import asyncio
 import pytest
 from fastapi.testclient import TestClient
+from app.core.config import settings
+from app.core.metrics import rate_limited_requests_total
+from app.models.user import User
+from app.services.user_service import async_user_service
+from tests.helpers import phone_user
 
 def test_health_check(client: TestClient):
     """Test health check endpoint"""
@@ -60,3 +66,58 @@ def test_verify_phone_otp_invalid_code(client: TestClient):
         }
     )
     assert response.status_code == 400
+
+def test_send_otp_resend_cooldown(client: TestClient, capsys):
+    """Test a repeated send-otp within the cooldown sends no second SMS"""
+    phone = {"phone_number": "+15550004444"}
+    assert client.post("/api/v1/auth/phone/send-otp", json=phone).json()["success"] is True
+    response = client.post("/api/v1/auth/phone/send-otp", json=phone)
+    assert response.status_code == 200
+    assert "already sent" in response.json()["message"]
+    assert capsys.readouterr().out.count("MOCK SMS to +15550004444") == 1
+
+def test_send_otp_is_rate_limited(client: TestClient, monkeypatch):
+    """Test send-otp answers 429 with Retry-After past the per-phone and per-IP limits"""
+    monkeypatch.setattr(settings, "OTP_SEND_LIMIT_PER_PHONE", 2)
+    monkeypatch.setattr(settings, "OTP_SEND_LIMIT_PER_IP", 4)
+    send = lambda phone: client.post("/api/v1/auth/phone/send-otp", json={"phone_number": phone})
+    rejected = rate_limited_requests_total.value("send_otp")
+
+    assert [send("+15550005555").status_code for _ in range(3)] == [200, 200, 429]
+    response = send("+15550005555")
+    assert int(response.headers["Retry-After"]) > 0
+    assert [send("+15550006666").status_code for _ in range(3)] == [200, 200, 429]
+    assert rate_limited_requests_total.value("send_otp") == rejected + 3
+
+def test_verify_otp_is_rate_limited(client: TestClient, monkeypatch):
+    """Test wrong-code guesses are limited across re-sent OTPs"""
+    monkeypatch.setattr(settings, "OTP_VERIFY_LIMIT_PER_PHONE", 2)
+    verify = {"phone_number": "+15550007777", "otp_code": "000000"}
+    client.post("/api/v1/auth/phone/send-otp", json={"phone_number": "+15550007777"})
+    statuses = [client.post("/api/v1/auth/phone/verify-otp", json=verify).status_code for _ in range(3)]
+    assert statuses == [400, 400, 429]
+
+@pytest.mark.asyncio
+async def test_upsert_login_is_one_statement(db_session, async_session_factory, count_statements):
+    """Test a login creates or updates the user in a single statement"""
+    with count_statements() as statements:
+        async with async_session_factory() as db:
+            created = await async_user_service.upsert_login(db, phone_user("+15550001111"))
+        async with async_session_factory() as db:
+            again = await async_user_service.upsert_login(db, phone_user("+15550001111"))
+
+    assert created.id == again.id
+    assert created.profile_completed is False
+    assert len(statements) == 2
+    assert all("ON CONFLICT" in statement for statement in statements)
+
+@pytest.mark.asyncio
+async def test_concurrent_first_logins_create_one_user(db_session, async_session_factory):
+    """Test simultaneous first logins for the same number do not race"""
+    async def login():
+        async with async_session_factory() as db:
+            return await async_user_service.upsert_login(db, phone_user("+15550002222"))
+
+    rows = await asyncio.gather(*(login() for _ in range(5)))
+    assert len({row.id for row in rows}) == 1
+    assert db_session.query(User).filter(User.phone_number == "+15550002222").count() == 1
@@ -0,0 +1,99 @@
+import time
+import uuid
+from fastapi.testclient import TestClient
+from app.core.cache import TTLCache
+from app.core.security import Principal
+from app.services.user_service import principal_cache
+from tests.helpers import auth_headers, login
+
+def test_ttl_cache_hit_and_miss():
+    """Test hit/miss counters"""
+    cache = TTLCache(max_size=2, ttl_seconds=60)
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+def test_ttl_cache_evicts_least_recently_used():
+    """Test the LRU entry is evicted when the cache is full"""
+    cache = TTLCache(max_size=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+def test_ttl_cache_expires_entries():
+    """Test entries expire after their TTL"""
+    cache = TTLCache(max_size=10, ttl_seconds=60)
+    cache.set("a", 1, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+def test_ttl_cache_disabled():
+    """Test a max_size of 0 disables caching"""
+    cache = TTLCache(max_size=0, ttl_seconds=60)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+
+def test_ttl_cache_refuses_sets_older_than_an_invalidation():
+    """Test a value loaded before a concurrent invalidate() is not cached"""
+    cache = TTLCache(max_size=2, ttl_seconds=60)
+    version = cache.version()
+    cache.invalidate("a")  # a write lands while "a" is being loaded
+    cache.set("a", "stale", version=version)
+    assert cache.get("a") is None
+    assert cache.stats()["stale_sets"] == 1
+
+    cache.set("a", "fresh", version=cache.version())
+    assert cache.get("a") == "fresh"
+    # Other keys are unaffected by the invalidation
+    cache.set("b", 2, version=version)
+    assert cache.get("b") == 2
+
+    # Once "a"'s invalidation is forgotten, sets started before it are refused outright
+    cache.invalidate("b")
+    cache.invalidate("c")
+    cache.set("a", "stale", version=version)
+    assert cache.get("a") == "fresh"
+    version = cache.version()
+    cache.clear()
+    cache.set("d", 4, version=version)
+    assert cache.get("d") is None
+
+def test_current_user_served_from_cache(client: TestClient):
+    """Test repeated authenticated requests hit the principal cache"""
+    headers = auth_headers(login(client))
+    client.get("/api/v1/auth/me", headers=headers)
+    hits = principal_cache.hits
+    response = client.get("/api/v1/users/profile", headers=headers)
+    assert response.status_code == 200
+    assert principal_cache.hits == hits + 1
+
+def test_cached_principal_is_column_projected(client: TestClient, count_statements):
+    """Test the principal cache holds a Principal loaded with a four-column SELECT"""
+    auth = login(client)
+    principal_cache.clear()
+    with count_statements() as statements:
+        response = client.post("/api/v1/auth/logout", headers=auth_headers(auth))
+    assert response.status_code == 200
+    # Logout also ends the session (an UPDATE); the principal is one SELECT
+    selects = [statement for statement in statements if statement.lstrip().startswith("SELECT")]
+    assert len(selects) == 1
+    columns = selects[0].split("FROM")[0]
+    assert "firebase_uid" in columns and "email" not in columns
+
+    principal = principal_cache.get(uuid.UUID(auth["user_id"]))
+    assert isinstance(principal, Principal)
+    assert principal.is_active and not principal.profile_completed
+
+def test_cache_stats_endpoint(client: TestClient):
+    """Test cache statistics are exposed"""
+    response = client.get("/api/v1/health/cache")
+    assert response.status_code == 200
+    assert "hit_ratio" in response.json()["principal_cache"]
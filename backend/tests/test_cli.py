@@ -0,0 +1,100 @@
+import argparse
+import io
+import json
+import sys
+import pytest
+from sqlalchemy import create_engine, func, select
+from app.cli import users as users_cli
+from app.cli.users import export_users, import_users
+from app.models.base import Base
+from app.models.user import User
+
+CSV_INPUT = """firebase_uid,auth_method,phone_number,email,first_name,last_name,age,gender,country
+phone_1,phone,+15550000001,,Ada,Lovelace,36,female,GBR
+google_1,google,,ada@example.com,Ada,Byron,,,GBR
+phone_2,phone,not-a-phone,,Alan,Turing,41,male,GBR
+phone_3,phone,+15550000003,,Grace,Hopper,9,,USA
+google_2,google,,,Missing,Email,,,USA
+phone_1,phone,+15550000004,,Dup,Uid,30,,USA
+"""
+
+@pytest.fixture
+def cli_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'cli.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+def test_import_validates_and_reports_rejects(cli_engine):
+    """Test valid rows are imported and invalid ones reported with their line"""
+    rejects = io.StringIO()
+    with cli_engine.connect() as conn:
+        stats = import_users(conn, io.StringIO(CSV_INPUT), "csv", rejects, chunk_size=4)
+        count = conn.execute(select(func.count()).select_from(User)).scalar()
+
+    assert (stats.read, stats.imported, stats.rejected) == (6, 2, 4)
+    assert count == 2
+    rejected = {entry["line"]: entry["errors"] for entry in map(json.loads, rejects.getvalue().splitlines())}
+    assert set(rejected) == {4, 5, 6, 7}
+    assert any("phone_number" in error for error in rejected[4])
+    assert any("age" in error for error in rejected[5])
+    assert rejected[6] == ["email: required for google auth"]
+
+def test_import_rejects_existing_users(cli_engine):
+    """Test rows colliding with existing users are rejected, not failed"""
+    with cli_engine.connect() as conn:
+        import_users(conn, io.StringIO(CSV_INPUT), "csv", io.StringIO())
+        rejects = io.StringIO()
+        stats = import_users(conn, io.StringIO(CSV_INPUT), "csv", rejects)
+
+    assert stats.imported == 0
+    assert stats.rejected == 6
+    assert rejects.getvalue().count("Conflicts with an existing user") == 2
+
+def test_export_round_trips_through_import(cli_engine, tmp_path):
+    """Test exported NDJSON can be imported into another database"""
+    with cli_engine.connect() as conn:
+        import_users(conn, io.StringIO(CSV_INPUT), "csv", io.StringIO())
+        exported = io.StringIO()
+        assert export_users(conn, exported, "ndjson", chunk_size=1) == 2
+
+    rows = [json.loads(line) for line in exported.getvalue().splitlines()]
+    assert {row["firebase_uid"] for row in rows} == {"phone_1", "google_1"}
+
+    target = create_engine(f"sqlite:///{tmp_path / 'target.db'}")
+    Base.metadata.create_all(bind=target)
+    with target.connect() as conn:
+        stats = import_users(conn, io.StringIO(exported.getvalue()), "ndjson", io.StringIO())
+    target.dispose()
+    assert stats.imported == 2
+
+def test_export_to_stdout_leaves_it_open(cli_engine, monkeypatch):
+    """Test exporting to - writes to stdout without closing it"""
+    with cli_engine.connect() as conn:
+        import_users(conn, io.StringIO(CSV_INPUT), "csv", io.StringIO())
+    stdout = io.StringIO()
+    monkeypatch.setattr(sys, "stdout", stdout)
+    monkeypatch.setattr("app.core.database.engine", cli_engine)
+
+    args = argparse.Namespace(destination="-", format="ndjson", chunk_size=100)
+    assert users_cli.run_export(args) == 0
+    assert not stdout.closed
+    assert len(stdout.getvalue().splitlines()) == 2
+
+@pytest.mark.asyncio
+async def test_explain_check_passes_with_indexes(tmp_path):
+    """Test every user query is served by an index"""
+    from app.cli.explain import check_plans
+    assert await check_plans(f"sqlite:///{tmp_path / 'explain.db'}", rows=2000) == 0
+
+@pytest.mark.asyncio
+async def test_explain_check_flags_sequential_scans(tmp_path):
+    """Test a query losing its index is reported"""
+    from app.cli.explain import check_plans
+    database = tmp_path / "explain.db"
+    engine = create_engine(f"sqlite:///{database}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP INDEX ix_users_email_lower")
+    engine.dispose()
+    assert await check_plans(f"sqlite:///{database}", rows=2000) == 1
@@ -0,0 +1,111 @@
+import asyncio
+import time
+import pytest
+from sqlalchemy import create_engine, create_mock_engine, event, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from app.core import database
+from app.core.config import settings
+from app.core.database import (
+    DatabaseHealthProbe,
+    enable_idle_pre_ping,
+    engine_options,
+    pool_saturation,
+    require_upsert_support,
+)
+
+def test_engine_options_from_settings(monkeypatch):
+    """Test pool settings are applied to file-backed databases"""
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 7)
+    monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 3)
+    options = engine_options("sqlite:///./app.db")
+    assert options["pool_size"] == 7
+    assert options["max_overflow"] == 3
+    assert options["echo"] is False
+    assert "pool_size" not in engine_options("sqlite://")
+
+def test_engine_options_pgbouncer_mode(monkeypatch):
+    """Test PgBouncer mode disables app pooling and asyncpg statement caches"""
+    monkeypatch.setattr(settings, "DB_PGBOUNCER", True)
+    monkeypatch.setattr(settings, "DB_STATEMENT_TIMEOUT_MS", 5000)
+    options = engine_options("postgresql+asyncpg://u:p@localhost/db", is_async=True)
+    assert options["poolclass"] is NullPool
+    assert options["connect_args"]["statement_cache_size"] == 0
+    assert options["connect_args"]["prepared_statement_cache_size"] == 0
+    assert options["connect_args"]["server_settings"] == {"statement_timeout": "5000"}
+    sync_options = engine_options("postgresql://u:p@localhost/db")
+    assert sync_options["connect_args"]["options"] == "-c statement_timeout=5000"
+
+def test_engine_options_rejects_unknown_pre_ping(monkeypatch):
+    """Test an unknown pre-ping strategy is rejected"""
+    monkeypatch.setattr(settings, "DB_PRE_PING", "sometimes")
+    with pytest.raises(ValueError):
+        engine_options("sqlite:///./app.db")
+
+def test_databases_without_upsert_are_refused():
+    """Test engines the login upsert cannot run on fail at setup"""
+    require_upsert_support(create_engine("sqlite://"))
+    with pytest.raises(RuntimeError, match="mysql"):
+        require_upsert_support(create_mock_engine("mysql://", executor=None))
+
+def test_pool_saturation_uses_the_engine_limits(tmp_path, monkeypatch):
+    """Test saturation is computed from the engine's own pool size and overflow"""
+    monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 100)
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", pool_size=1, max_overflow=3)
+    with engine.connect():
+        status = pool_saturation(engine)
+    engine.dispose()
+    assert status["max_connections"] == 4
+    assert status["saturation"] == 0.25
+
+def test_idle_pre_ping_only_pings_idle_connections(tmp_path):
+    """Test connections are pinged on checkout only after sitting idle"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'ping.db'}")
+    enable_idle_pre_ping(engine, idle_seconds=0.05)
+    executed = []
+    
+    @event.listens_for(engine, "connect")
+    def _trace(dbapi_connection, connection_record):
+        dbapi_connection.set_trace_callback(executed.append)
+    
+    for _ in range(2):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 2"))
+    assert "SELECT 1" not in executed
+    
+    time.sleep(0.06)
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 2"))
+    assert executed.count("SELECT 1") == 1
+    engine.dispose()
+
+@pytest.mark.asyncio
+async def test_health_probe_is_cached_and_single_flight(tmp_path):
+    """Test concurrent health checks share one probe within the cache interval"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'health.db'}")
+    probe = DatabaseHealthProbe(engine, cache_seconds=60, timeout_seconds=2)
+    results = await asyncio.gather(*(probe.check() for _ in range(10)))
+    assert probe.probes == 1
+    assert all(result["status"] == "healthy" for result in results)
+    assert sum(not result["cached"] for result in results) == 1
+    await engine.dispose()
+
+@pytest.mark.asyncio
+async def test_health_probe_reports_unreachable_database():
+    """Test an unreachable database is reported unhealthy"""
+    engine = create_async_engine("sqlite+aiosqlite:////nonexistent-dir/health.db")
+    probe = DatabaseHealthProbe(engine, cache_seconds=0, timeout_seconds=2)
+    result = await probe.check()
+    assert result["status"] == "unhealthy"
+    assert result["error"]
+    await engine.dispose()
+
+def test_database_health_endpoint(client):
+    """Test /health/db probes the database and reports pool saturation"""
+    database.database_health_probe._result = None
+    response = client.get("/api/v1/health/db")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "healthy"
+    assert data["database"] == "sqlite"
+    assert "saturation" in data["pool"]["async"]
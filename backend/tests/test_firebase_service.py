@@ -0,0 +1,95 @@
+import asyncio
+import httpx
+import pytest
+from tests.helpers import LocalFirebaseSigner
+from app.core.config import settings
+from app.services.firebase_service import FirebaseService, GoogleCertificateCache
+
+@pytest.fixture(scope="module")
+def signer():
+    return LocalFirebaseSigner("imaro-test")
+
+@pytest.fixture
+def service(signer):
+    service = FirebaseService()
+    signer.install(service)
+    return service
+
+@pytest.mark.asyncio
+async def test_verify_google_token(service, signer):
+    """Test a correctly signed ID token is accepted"""
+    token = signer.issue_token(uid="google-uid-1", email="ada@example.com")
+    result = await service.verify_google_token(token)
+    await service.aclose()
+    assert result["success"] is True
+    assert result["firebase_uid"] == "google-uid-1"
+    assert result["email"] == "ada@example.com"
+
+@pytest.mark.asyncio
+async def test_verified_tokens_are_cached(service, signer):
+    """Test a retried token is served from the verified-token cache"""
+    token = signer.issue_token()
+    await service.verify_google_token(token)
+    await service.verify_google_token(token)
+    await service.aclose()
+    assert service.verified_tokens.hits == 1
+
+@pytest.mark.asyncio
+async def test_token_for_other_project_is_rejected(service):
+    """Test audience and issuer are checked"""
+    other = LocalFirebaseSigner("other-project")
+    service.certificates.set_certificates(other.certificates, 3600)
+    result = await service.verify_google_token(other.issue_token())
+    await service.aclose()
+    assert result["success"] is False
+
+@pytest.mark.asyncio
+async def test_token_signed_by_unknown_key_is_rejected(service):
+    """Test tokens signed with a key Google did not publish are rejected"""
+    forger = LocalFirebaseSigner("imaro-test", key_id="forged-key")
+    service.certificates.RETRY_DELAY_SECONDS = float("inf")
+    result = await service.verify_google_token(forger.issue_token())
+    await service.aclose()
+    assert result["success"] is False
+
+@pytest.mark.asyncio
+async def test_certificate_cache_honours_max_age(signer):
+    """Test certificates are fetched once and kept for their max-age"""
+    requests = []
+
+    def google_certs(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(
+            200, json=signer.certificates, headers={"Cache-Control": "public, max-age=19000"}
+        )
+
+    cache = GoogleCertificateCache(url="http://certs.local", transport=httpx.MockTransport(google_certs))
+    assert await cache.get_certificates() == signer.certificates
+    assert await cache.get_certificates() == signer.certificates
+    assert len(requests) == 1
+    assert cache.is_fresh
+
+def test_certificate_cache_survives_event_loops(signer):
+    """Test a stale cache refreshes on a second event loop"""
+    async def google_certs(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(0)
+        return httpx.Response(200, json=signer.certificates, headers={"Cache-Control": "max-age=0"})
+
+    cache = GoogleCertificateCache(url="http://certs.local", transport=httpx.MockTransport(google_certs))
+
+    async def concurrent_lookups():
+        # Contending for the refresh lock binds it to the running loop
+        await asyncio.gather(cache.get_certificates(), cache.get_certificates())
+
+    asyncio.run(concurrent_lookups())
+    asyncio.run(concurrent_lookups())
+    assert cache.refreshes == 4
+
+@pytest.mark.asyncio
+async def test_background_refresh_can_be_disabled(monkeypatch):
+    """Test start() leaves certificate fetching to the first verification when disabled"""
+    monkeypatch.setattr(settings, "FIREBASE_CERT_BACKGROUND_REFRESH", False)
+    service = FirebaseService()
+    service.start()
+    assert not service.certificates._refresh_task.running
+    await service.aclose()
@@ -0,0 +1,54 @@
+from sqlalchemy import create_engine, text
+from app.core.metrics import (
+    Counter, Histogram, OVERFLOW_LABEL, db_queries_total, instrument_engine, statement_operation
+)
+from tests.helpers import auth_headers, login
+
+def test_counter_folds_excess_series_into_overflow():
+    """Test label cardinality is capped at max_series"""
+    counter = Counter("test_total", "test", ["route"], max_series=2)
+    for route in ("/a", "/b", "/c", "/d"):
+        counter.inc(route)
+    assert len(counter._series) == 3
+    assert counter.value(OVERFLOW_LABEL) == 2
+
+def test_histogram_renders_cumulative_buckets():
+    """Test histogram buckets, sum and count in the text format"""
+    histogram = Histogram("test_seconds", "test", ["route"], buckets=(0.1, 1.0))
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(5.0, "/a")
+    lines = histogram.render()
+    assert 'test_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{route="/a",le="1.0"} 2' in lines
+    assert 'test_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'test_seconds_count{route="/a"} 3' in lines
+
+def test_statement_operation():
+    """Test SQL statements are labelled with a bounded keyword"""
+    assert statement_operation("  SELECT users.id FROM users") == "SELECT"
+    assert statement_operation("insert into users values (1)") == "INSERT"
+    assert statement_operation("PRAGMA table_info(users)") == "OTHER"
+
+def test_instrument_engine_counts_queries():
+    """Test executed statements are counted per engine"""
+    engine = create_engine("sqlite://")
+    instrument_engine(engine, "test")
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        conn.execute(text("SELECT 2"))
+    assert db_queries_total.value("test", "SELECT") == 2
+
+def test_metrics_endpoint_uses_route_templates(client):
+    """Test /metrics labels requests by route template, not raw path"""
+    auth = login(client, "+1234567890")
+    client.get("/api/v1/auth/me", headers=auth_headers(auth))
+    client.get("/does/not/exist/12345")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    body = response.text
+    assert 'http_requests_total{method="GET",route="/api/v1/auth/me",status="200"}' in body
+    assert 'route="<unmatched>"' in body
+    assert "/does/not/exist/12345" not in body
+    assert "db_pool_connections" in body
@@ -0,0 +1,87 @@
+import pytest
+from app.services.otp_store import InMemoryOTPStore, RedisOTPStore
+
+@pytest.fixture(params=["memory", "redis"])
+def otp_store(request):
+    if request.param == "memory":
+        return InMemoryOTPStore()
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    return RedisOTPStore(fakeredis.FakeAsyncRedis())
+
+@pytest.mark.asyncio
+async def test_verify_consumes_otp(otp_store):
+    """Test a correct OTP verifies once"""
+    await otp_store.store("+1234567890", "123456")
+    result = await otp_store.verify("+1234567890", "123456")
+    assert result["success"] is True
+    result = await otp_store.verify("+1234567890", "123456")
+    assert result["message"] == "No OTP found for this phone number"
+
+@pytest.mark.asyncio
+async def test_verify_counts_failed_attempts(otp_store):
+    """Test wrong guesses are counted and the OTP is dropped after the limit"""
+    await otp_store.store("+1234567890", "123456")
+    result = await otp_store.verify("+1234567890", "000000")
+    assert result["message"] == "Invalid OTP. 2 attempts remaining."
+    await otp_store.verify("+1234567890", "000000")
+    await otp_store.verify("+1234567890", "000000")
+    result = await otp_store.verify("+1234567890", "123456")
+    assert result["message"] == "Too many failed attempts. Please request a new OTP."
+    result = await otp_store.verify("+1234567890", "123456")
+    assert result["success"] is False
+
+@pytest.mark.asyncio
+async def test_verify_expired_otp(otp_store):
+    """Test an expired OTP is rejected"""
+    await otp_store.store("+1234567890", "123456", expires_in_minutes=0)
+    result = await otp_store.verify("+1234567890", "123456")
+    assert result["message"] == "OTP has expired. Please request a new one."
+
+@pytest.mark.asyncio
+async def test_store_replaces_pending_otp(otp_store):
+    """Test storing a new OTP resets the code and attempt counter"""
+    await otp_store.store("+1234567890", "111111")
+    await otp_store.verify("+1234567890", "000000")
+    await otp_store.store("+1234567890", "222222")
+    result = await otp_store.verify("+1234567890", "000000")
+    assert result["message"] == "Invalid OTP. 2 attempts remaining."
+    result = await otp_store.verify("+1234567890", "222222")
+    assert result["success"] is True
+
+@pytest.mark.asyncio
+async def test_issue_reuses_pending_otp_after_cooldown(otp_store):
+    """Test a pending OTP is resent (attempts kept) instead of replaced"""
+    assert await otp_store.issue("+1234567890", "111111") == "111111"
+    await otp_store.verify("+1234567890", "000000")
+    assert await otp_store.issue("+1234567890", "222222") == "111111"
+    result = await otp_store.verify("+1234567890", "000000")
+    assert result["message"] == "Invalid OTP. 1 attempts remaining."
+    assert (await otp_store.verify("+1234567890", "111111"))["success"] is True
+    assert await otp_store.issue("+1234567890", "333333") == "333333"
+
+@pytest.mark.asyncio
+async def test_issue_sends_nothing_during_cooldown(otp_store):
+    """Test a repeated request within the cooldown gets no code to send"""
+    assert await otp_store.issue("+1234567890", "111111", cooldown_seconds=60) == "111111"
+    assert await otp_store.issue("+1234567890", "222222", cooldown_seconds=60) is None
+    assert (await otp_store.verify("+1234567890", "111111"))["success"] is True
+
+@pytest.mark.asyncio
+async def test_issue_replaces_expired_otp(otp_store):
+    """Test an expired OTP is replaced by the new code"""
+    await otp_store.store("+1234567890", "111111", expires_in_minutes=0)
+    assert await otp_store.issue("+1234567890", "222222", cooldown_seconds=60) == "222222"
+
+@pytest.mark.asyncio
+async def test_redis_store_expiry_uses_the_redis_clock():
+    """Test store() sets expires_at from Redis TIME, like the issue and verify scripts"""
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    redis = fakeredis.FakeAsyncRedis()
+    store = RedisOTPStore(redis)
+    await store.store("+1234567890", "123456", expires_in_minutes=5)
+    seconds, microseconds = await redis.time()
+    expires_at = int(await redis.hget("otp:+1234567890", "expires_at"))
+    assert 0 <= expires_at - (seconds * 1000 + microseconds // 1000) <= 300000
+    assert 300000 < await redis.pttl("otp:+1234567890") <= 360000
@@ -0,0 +1,111 @@
+import asyncio
+import threading
+import time
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api.endpoints import profiling
+from app.core.config import settings
+from app.core.profiling import ProfileStore, ProfilingMiddleware, SamplingProfiler, memory_profiler, profile_store
+
+ADMIN_KEY = "test-admin-key"
+
+def spin(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+@pytest.fixture
+def admin(monkeypatch, tmp_path):
+    """Profiling endpoints on their own app, profiles written to a temporary directory"""
+    monkeypatch.setattr(settings, "ADMIN_API_KEY", ADMIN_KEY)
+    monkeypatch.setattr(profile_store, "directory", str(tmp_path))
+    app = FastAPI()
+    app.include_router(profiling.router, prefix="/admin/profiling")
+    with TestClient(app, headers={"X-Admin-Key": ADMIN_KEY}) as client:
+        yield client
+    memory_profiler.stop()
+
+def test_sampling_profiler_records_thread_stacks():
+    """Test samples are collapsed per thread, root first"""
+    profiler = SamplingProfiler(interval_seconds=0.001)
+    busy = threading.Thread(target=spin, args=(0.1,), name="busy")
+    profiler.start()
+    busy.start()
+    busy.join()
+    profiler.stop()
+
+    assert profiler.samples > 0
+    lines = profiler.collapsed().splitlines()
+    busy_stacks = [line for line in lines if line.startswith("busy;")]
+    assert busy_stacks and "spin (tests/test_profiling.py:" in busy_stacks[0]
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+def test_middleware_profiles_requested_requests(monkeypatch, tmp_path):
+    """Test only requests with X-Profile and a valid admin key are profiled when not sampled"""
+    monkeypatch.setattr(settings, "ADMIN_API_KEY", ADMIN_KEY)
+    store = ProfileStore(str(tmp_path), interval_seconds=0.001)
+
+    async def endpoint(scope, receive, send):
+        spin(0.02)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def send(message):
+        pass
+
+    middleware = ProfilingMiddleware(endpoint, store, sample_rate=0.0)
+
+    async def request(headers):
+        scope = {"type": "http", "method": "GET", "path": "/api/v1/auth/me", "headers": headers}
+        await middleware(scope, None, send)
+
+    asyncio.run(request([]))
+    asyncio.run(request([(b"x-profile", b"1"), (b"x-admin-key", b"wrong")]))
+    assert store.list() == []
+
+    asyncio.run(request([(b"x-profile", b"1"), (b"x-admin-key", ADMIN_KEY.encode())]))
+    [name] = store.list()
+    assert name.endswith("-GET_api_v1_auth_me.collapsed")
+    assert "spin (" in (tmp_path / name).read_text()
+    assert store.recording is False
+
+def test_cpu_profile_endpoint(admin: TestClient):
+    """Test a worker profile is stored and downloadable"""
+    response = admin.post("/admin/profiling/cpu", params={"seconds": 0.05, "label": "spike"})
+    assert response.status_code == 200
+    result = response.json()
+    assert result["samples"] > 0 and result["file"].endswith("-spike.collapsed")
+
+    assert admin.get("/admin/profiling/").json()["profiles"] == [result["file"]]
+    download = admin.get(f"/admin/profiling/profiles/{result['file']}")
+    assert download.status_code == 200
+    assert download.text.count("\n") == result["stacks"]
+    assert admin.get("/admin/profiling/profiles/..%2Fsecret.collapsed").status_code == 404
+
+    assert admin.get("/admin/profiling/", headers={"X-Admin-Key": "wrong"}).status_code == 403
+
+def test_memory_snapshot_diff_finds_growth(admin: TestClient):
+    """Test a snapshot diff points at the allocation site that grew"""
+    assert admin.post("/admin/profiling/memory/snapshot").status_code == 409
+    assert admin.post("/admin/profiling/memory/start").json()["tracing"] is True
+
+    base = admin.post("/admin/profiling/memory/snapshot").json()["id"]
+    retained = [bytearray(1024) for _ in range(2000)]
+    assert admin.post("/admin/profiling/memory/snapshot").json()["id"] == base + 1
+
+    growth = admin.get("/admin/profiling/memory/diff", params={"base": base}).json()["growth"]
+    assert "test_profiling.py" in growth[0]["location"]
+    assert growth[0]["size_diff"] >= 2000 * 1024
+    assert admin.get("/admin/profiling/memory/diff", params={"base": 999}).status_code == 404
+
+    assert admin.post("/admin/profiling/memory/stop").json()["tracing"] is False
+    del retained
+
+def test_profiling_is_not_installed_by_default():
+    """Test nothing is installed (no middleware, no endpoints) while PROFILING_ENABLED is off"""
+    from app.main import app
+
+    assert settings.PROFILING_ENABLED is False
+    assert not any(middleware.cls is ProfilingMiddleware for middleware in app.user_middleware)
+    assert not any(path.startswith("/api/v1/admin/profiling") for path in app.openapi()["paths"])
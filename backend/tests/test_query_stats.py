@@ -0,0 +1,102 @@
+import logging
+import uuid
+from fastapi.testclient import TestClient
+from app.core.config import settings
+from app.core.query_stats import QueryStats, parameter_shape
+from app.services.user_service import principal_cache, profile_cache
+from tests.helpers import auth_headers, login
+
+PROFILE = {
+    "first_name": "Ada", "last_name": "Lovelace", "age": 36, "gender": "female", "country": "GBR",
+    "privacy_policy_accepted": True, "terms_accepted": True
+}
+
+def test_endpoint_query_budgets(client: TestClient, assert_max_queries):
+    """Test each endpoint stays within its SQL statement budget (principal and profile not cached)"""
+    client.post("/api/v1/auth/phone/send-otp", json={"phone_number": "+15550007777"})
+    # Upsert the user, start the session
+    with assert_max_queries(2):
+        response = client.post(
+            "/api/v1/auth/phone/verify-otp", json={"phone_number": "+15550007777", "otp_code": "123456"}
+        )
+    auth = response.json()
+    headers = auth_headers(auth)
+
+    # Principal lookup plus one statement each
+    for method, path, body in (
+        ("GET", "/api/v1/auth/me", None),
+        ("GET", "/api/v1/users/profile", None),
+        ("POST", "/api/v1/auth/complete-profile", PROFILE),
+        ("PUT", "/api/v1/users/profile", {"first_name": "Augusta"}),
+        ("POST", "/api/v1/auth/refresh", {"refresh_token": auth["refresh_token"]}),
+        ("POST", "/api/v1/auth/logout", None),
+    ):
+        principal_cache.clear()
+        profile_cache.clear()
+        with assert_max_queries(2):
+            response = client.request(method, path, headers=headers, json=body)
+        assert response.status_code == 200, (path, response.text)
+
+def test_profile_reads_need_no_query_when_cached(client: TestClient, assert_max_queries):
+    """Test /auth/me and GET /users/profile are served from the caches once warm"""
+    auth = login(client, "+15550007778")
+    headers = auth_headers(auth)
+    client.get("/api/v1/auth/me", headers=headers)
+    for path in ("/api/v1/auth/me", "/api/v1/users/profile"):
+        with assert_max_queries(0):
+            response = client.get(path, headers=headers)
+        assert response.status_code == 200
+        assert response.json()["id"] == auth["user_id"]
+
+    # A write drops the cached profile
+    client.put("/api/v1/users/profile", headers=headers, json={"first_name": "Augusta"})
+    assert client.get("/api/v1/users/profile", headers=headers).json()["first_name"] == "Augusta"
+
+def test_server_timing_header(client: TestClient):
+    """Test responses report the request's query count and DB time"""
+    auth = login(client)
+    principal_cache.clear()
+    response = client.get("/api/v1/auth/me", headers=auth_headers(auth))
+    assert response.headers["server-timing"].startswith("db;dur=")
+    assert response.headers["server-timing"].endswith('desc="2 queries"')
+
+    response = client.get("/health")
+    assert response.headers["server-timing"].endswith('desc="0 queries"')
+
+def test_slow_queries_are_logged_with_parameter_types(client: TestClient, monkeypatch, caplog):
+    """Test statements over DB_SLOW_QUERY_MS are logged with types, not values"""
+    auth = login(client, "+15550008888")
+    principal_cache.clear()
+    monkeypatch.setattr(settings, "DB_SLOW_QUERY_MS", 1e-9)
+    with caplog.at_level(logging.WARNING, logger="app.core.query_stats"):
+        client.get("/api/v1/auth/me", headers=auth_headers(auth))
+
+    slow = [record.getMessage() for record in caplog.records if record.getMessage().startswith("Slow query")]
+    assert slow and "FROM users" in slow[0]
+    assert "parameters=(str)" in slow[0]
+    assert auth["user_id"].replace("-", "") not in " ".join(slow)
+
+def test_repeated_statements_are_logged(client: TestClient, monkeypatch, caplog):
+    """Test a statement repeated DB_REPEATED_QUERY_WARN_THRESHOLD times in a request is reported"""
+    auth = login(client)
+    principal_cache.clear()
+    monkeypatch.setattr(settings, "DB_REPEATED_QUERY_WARN_THRESHOLD", 1)
+    with caplog.at_level(logging.WARNING, logger="app.core.query_stats"):
+        client.get("/api/v1/auth/me", headers=auth_headers(auth))
+    assert any(
+        "Possible N+1" in record.getMessage() and "GET /api/v1/auth/me" in record.getMessage()
+        for record in caplog.records
+    )
+
+def test_query_stats_and_parameter_shape():
+    """Test per-request totals, repeat detection and parameter shapes"""
+    stats = QueryStats()
+    for _ in range(3):
+        stats.record("SELECT 1", 0.001)
+    stats.record("SELECT 2", 0.002)
+    assert stats.count == 4
+    assert stats.repeated(3) == {"SELECT 1": 3}
+
+    assert parameter_shape((uuid.uuid4(), "+1555", 3)) == "(UUID, str, int)"
+    assert parameter_shape({"id_1": uuid.uuid4()}) == "{id_1: UUID}"
+    assert parameter_shape([("a", 1), ("b", 2)], executemany=True) == "2 x (str, int)"
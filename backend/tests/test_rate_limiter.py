@@ -0,0 +1,59 @@
+import asyncio
+import pytest
+from app.services.rate_limiter import InMemoryRateLimiter, RedisRateLimiter
+
+@pytest.fixture(params=["memory", "redis"])
+def limiter(request):
+    if request.param == "memory":
+        return InMemoryRateLimiter()
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    return RedisRateLimiter(fakeredis.FakeAsyncRedis())
+
+@pytest.mark.asyncio
+async def test_limit_is_enforced_per_key(limiter):
+    """Test hits beyond the limit are rejected with a retry delay"""
+    rule = [("send_otp:phone:+1234567890", 3, 60)]
+    assert [await limiter.hit(rule) for _ in range(3)] == [0.0, 0.0, 0.0]
+    retry_after = await limiter.hit(rule)
+    assert 0 < retry_after <= 60
+    assert await limiter.hit([("send_otp:phone:+1987654321", 3, 60)]) == 0.0
+
+@pytest.mark.asyncio
+async def test_rejected_hit_counts_against_no_rule(limiter):
+    """Test a request rejected by one rule does not use up the others"""
+    phone = ("send_otp:phone:+1234567890", 1, 60)
+    await limiter.hit([phone])
+    for _ in range(3):
+        assert await limiter.hit([phone, ("send_otp:ip:10.0.0.1", 3, 60)]) > 0
+    assert [await limiter.hit([("send_otp:ip:10.0.0.1", 3, 60)]) for _ in range(3)] == [0.0, 0.0, 0.0]
+
+@pytest.mark.asyncio
+async def test_limit_recovers_after_window(limiter):
+    """Test requests are allowed again once the window has passed"""
+    rule = [("verify_otp:phone:+1234567890", 2, 0.05)]
+    await limiter.hit(rule)
+    await limiter.hit(rule)
+    assert await limiter.hit(rule) > 0
+    await asyncio.sleep(0.06)
+    assert await limiter.hit(rule) == 0.0
+
+@pytest.mark.asyncio
+async def test_clear_forgets_every_key(limiter):
+    """Test clear() resets the limits of every key"""
+    rules = [(f"send_otp:phone:+1555000{index:04d}", 1, 60) for index in range(3)]
+    for rule in rules:
+        await limiter.hit([rule])
+    await limiter.clear()
+    assert [await limiter.hit([rule]) for rule in rules] == [0.0, 0.0, 0.0]
+
+@pytest.mark.asyncio
+async def test_memory_limiter_bounds_tracked_keys():
+    """Test refilled buckets are dropped once max_keys is exceeded"""
+    limiter = InMemoryRateLimiter(max_keys=10)
+    for index in range(10):
+        await limiter.hit([(f"ip:{index}", 5, 0.01)])
+    await asyncio.sleep(0.02)
+    for index in range(10, 15):
+        await limiter.hit([(f"ip:{index}", 5, 60)])
+    assert set(limiter.buckets) == {f"ip:{index}" for index in range(10, 15)}
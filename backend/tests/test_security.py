@@ -0,0 +1,60 @@
+import uuid
+from datetime import timedelta
+import pytest
+from app.core import security
+from app.core.security import (
+    TokenClaims,
+    create_access_token,
+    create_refresh_token,
+    decoded_token_cache,
+    use_jwt_backend,
+    verify_token
+)
+
+@pytest.fixture(params=["jose", "pyjwt"])
+def jwt_backend(request):
+    previous = security.jwt_backend.name
+    use_jwt_backend(request.param)
+    yield request.param
+    use_jwt_backend(previous)
+
+def test_access_token_round_trip(jwt_backend):
+    """Test verify_token returns typed claims"""
+    user_id = uuid.uuid4()
+    token = create_access_token({"sub": str(user_id), "firebase_uid": "phone_1234567890"})
+    claims = verify_token(token, "access")
+    assert isinstance(claims, TokenClaims)
+    assert claims.sub == user_id
+    assert claims.type == "access"
+    assert claims.firebase_uid == "phone_1234567890"
+
+def test_tokens_carry_unique_jti(jwt_backend):
+    """Test every issued token gets its own jti"""
+    data = {"sub": str(uuid.uuid4())}
+    jtis = {verify_token(create_access_token(data)).jti for _ in range(3)}
+    jtis.add(verify_token(create_refresh_token(data), "refresh").jti)
+    assert len(jtis) == 4 and None not in jtis
+
+def test_token_type_is_enforced(jwt_backend):
+    """Test a refresh token is not accepted as an access token and vice versa"""
+    token = create_refresh_token({"sub": str(uuid.uuid4())})
+    assert verify_token(token, "access") is None
+    assert verify_token(token, "refresh") is not None
+
+def test_invalid_tokens_are_rejected(jwt_backend):
+    """Test expired, tampered and malformed tokens are rejected"""
+    expired = create_access_token({"sub": str(uuid.uuid4())}, timedelta(seconds=-10))
+    assert verify_token(expired) is None
+
+    token = create_access_token({"sub": str(uuid.uuid4())})
+    assert verify_token(token[:-2] + ("AA" if token[-2:] != "AA" else "BB")) is None
+    assert verify_token("not-a-jwt") is None
+    assert verify_token(create_access_token({"sub": "not-a-uuid"})) is None
+
+def test_decoded_tokens_are_cached(jwt_backend):
+    """Test repeat verifications of a token hit the decode cache"""
+    token = create_access_token({"sub": str(uuid.uuid4())})
+    verify_token(token)
+    hits = decoded_token_cache.hits
+    assert verify_token(token) is not None
+    assert decoded_token_cache.hits == hits + 1
@@ -0,0 +1,70 @@
+import uuid
+from datetime import datetime, timezone
+from fastapi.testclient import TestClient
+from app.core.config import settings
+from app.core.serialization import ORJSONResponse, dump_trusted, render
+from app.schemas.user import UserProfile, UserResponse
+from tests.helpers import ADMIN_HEADERS, auth_headers, login
+
+def test_fast_responses_match_default_responses(client: TestClient, monkeypatch):
+    """Test FAST_RESPONSES renders the same JSON as response_model validation"""
+    monkeypatch.setattr(settings, "ADMIN_API_KEY", ADMIN_HEADERS["X-Admin-Key"])
+    auth = login(client)
+    headers = auth_headers(auth)
+    client.post("/api/v1/auth/complete-profile", headers=headers, json={
+        "first_name": "Ada", "last_name": "Lovelace", "age": 36, "gender": "female", "country": "GBR",
+        "privacy_policy_accepted": True, "terms_accepted": True
+    })
+    requests = [
+        ("get", "/api/v1/auth/me", {}),
+        ("get", "/api/v1/users/profile", {}),
+        ("put", "/api/v1/users/profile", {"json": {"age": 36}}),  # No-op update
+        ("get", "/api/v1/users/?limit=10", {"headers": ADMIN_HEADERS}),
+    ]
+
+    def fetch():
+        responses = []
+        for method, url, kwargs in requests:
+            kwargs = {"headers": headers, **kwargs}
+            response = getattr(client, method)(url, **kwargs)
+            assert response.status_code == 200
+            body = response.json()
+            for user in body.get("items", [body]):
+                user.pop("updated_at", None)
+            responses.append(body)
+        return responses
+
+    default = fetch()
+    monkeypatch.setattr(settings, "FAST_RESPONSES", True)
+    assert fetch() == default
+    assert login(client).keys() == auth.keys()
+
+def test_dump_trusted_matches_pydantic():
+    """Test ORM-style rows are dumped from their attributes exactly as Pydantic would"""
+    class Row:
+        id = uuid.uuid4()
+        first_name = "Ada"
+        last_name = "Name"
+        age = None
+        gender = None
+        country = "USA"
+        phone_number = "+15550001111"
+        email = None
+        auth_method = "phone"
+        profile_completed = False
+        created_at = datetime(2025, 1, 1, 8, 30, 15, 250, tzinfo=timezone.utc)
+
+    row = Row()
+    expected = UserProfile.model_validate(row, from_attributes=True).model_dump_json().encode()
+    assert dump_trusted(UserProfile, row) == expected
+
+def test_render_returns_source_unless_enabled():
+    """Test render leaves serialization to FastAPI by default"""
+    source = object()
+    assert render(UserResponse, source) is source
+
+def test_orjson_response_renders_uuid_and_datetime():
+    """Test the orjson response class encodes the types our payloads contain"""
+    user_id = uuid.uuid4()
+    response = ORJSONResponse({"id": user_id, "at": datetime(2025, 1, 1, 12, 30)})
+    assert response.body == f'{{"id":"{user_id}","at":"2025-01-01T12:30:00"}}'.encode()
@@ -0,0 +1,87 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.core.security import create_refresh_token
+from app.models.auth_session import AuthSession
+from app.services.session_service import session_service
+from app.services.user_service import async_user_service
+from tests.helpers import auth_headers, login, phone_user
+
+def refresh(client: TestClient, refresh_token: str):
+    return client.post("/api/v1/auth/refresh", json={"refresh_token": refresh_token})
+
+def test_refresh_rotates_refresh_token(client: TestClient):
+    """Test every refresh returns a new refresh token and a working access token"""
+    auth = login(client)
+    response = refresh(client, auth["refresh_token"])
+    assert response.status_code == 200
+    data = response.json()
+    assert data["refresh_token"] != auth["refresh_token"]
+    assert client.get("/api/v1/auth/me", headers=auth_headers(data)).status_code == 200
+
+    assert refresh(client, data["refresh_token"]).status_code == 200
+
+def test_refresh_token_reuse_revokes_session(client: TestClient):
+    """Test presenting a rotated refresh token kills the whole family"""
+    auth = login(client)
+    rotated = refresh(client, auth["refresh_token"]).json()
+
+    response = refresh(client, auth["refresh_token"])
+    assert response.status_code == 401
+    assert "already been used" in response.json()["detail"]
+    # The legitimate holder's current token is revoked with it
+    assert refresh(client, rotated["refresh_token"]).status_code == 401
+
+    # Other sessions of the same user are unaffected
+    other = login(client)
+    assert refresh(client, other["refresh_token"]).status_code == 200
+
+def test_revoked_session_rejects_its_access_tokens(client: TestClient):
+    """Test access tokens already issued for a revoked family stop working at once"""
+    auth = login(client)
+    rotated = refresh(client, auth["refresh_token"]).json()
+    assert client.get("/api/v1/auth/me", headers=auth_headers(rotated)).status_code == 200
+
+    assert refresh(client, auth["refresh_token"]).status_code == 401
+    for tokens in (auth, rotated):
+        response = client.get("/api/v1/auth/me", headers=auth_headers(tokens))
+        assert response.status_code == 401
+        assert response.json()["detail"] == "Session has been revoked"
+
+def test_logout_ends_session(client: TestClient):
+    """Test the refresh token of a logged out session is rejected"""
+    auth = login(client)
+    assert client.post("/api/v1/auth/logout", headers=auth_headers(auth)).status_code == 200
+    response = refresh(client, auth["refresh_token"])
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Session has been revoked"
+
+def test_refresh_token_without_session_is_rejected(client: TestClient):
+    """Test refresh tokens issued outside a session (and access tokens) are refused"""
+    auth = login(client)
+    assert refresh(client, create_refresh_token({"sub": auth["user_id"]})).status_code == 401
+    assert refresh(client, auth["access_token"]).status_code == 401
+
+def test_refresh_is_one_statement(client: TestClient, count_statements):
+    """Test a refresh with a cached principal is a single UPDATE of the session"""
+    auth = login(client)
+    client.get("/api/v1/auth/me", headers=auth_headers(auth))
+    with count_statements() as statements:
+        assert refresh(client, auth["refresh_token"]).status_code == 200
+    assert len(statements) == 1
+    assert statements[0].lstrip().upper().startswith("UPDATE SESSIONS")
+
+@pytest.mark.asyncio
+async def test_prune_deletes_ended_sessions_in_batches(db_session, async_session_factory, count_statements):
+    """Test pruning removes revoked and expired sessions only, a batch at a time"""
+    async with async_session_factory() as db:
+        user = await async_user_service.upsert_login(db, phone_user("+15550003333"))
+        ended = [(await session_service.create(db, user.id, "phone_15550003333"))[0] for _ in range(5)]
+        live, _ = await session_service.create(db, user.id, "phone_15550003333")
+        for session_id in ended:
+            await session_service.revoke(db, session_id)
+
+        with count_statements() as statements:
+            assert await session_service.prune(db, batch_size=2) == 5
+        assert sum(statement.lstrip().upper().startswith("DELETE") for statement in statements) == 3
+
+    assert [row.id for row in db_session.query(AuthSession).all()] == [live]
@@ -0,0 +1,35 @@
+import subprocess
+import sys
+from benchmarks.bench_startup import BACKEND_DIR, measure_import
+from app.core.lazy import LazyService
+
+def test_app_import_defers_provider_sdks():
+    """Test importing app.main loads no provider SDK"""
+    result = measure_import(runs=1)[0]
+    assert result["eager_modules"] == []
+
+def test_service_import_does_not_load_providers():
+    """Test importing one service module does not pull in the provider services"""
+    script = (
+        "import sys, app.services.user_service; "
+        "print(sorted(name for name in ('app.services.firebase_service', 'app.services.twilio_service') "
+        "if name in sys.modules))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script], cwd=BACKEND_DIR, check=True, capture_output=True, text=True
+    ).stdout
+    assert output.strip() == "[]"
+
+def test_lazy_service_builds_once_on_first_use():
+    """Test the factory runs on first attribute access only, and assignments are forwarded"""
+    class Service:
+        project_id = "default"
+
+    calls = []
+    service = LazyService(lambda: calls.append(1) or Service())
+    assert not service.initialized and calls == []
+
+    service.project_id = "imaro"
+    assert service.project_id == "imaro"
+    assert service.get().project_id == "imaro"
+    assert service.initialized and calls == [1]
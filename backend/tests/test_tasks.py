@@ -0,0 +1,22 @@
+import asyncio
+import pytest
+from app.core.tasks import BackgroundTask
+
+@pytest.mark.asyncio
+async def test_background_task_starts_once_and_stops():
+    """Test a second start() is a no-op and stop() cancels and awaits the task"""
+    started = []
+
+    async def loop():
+        started.append(True)
+        await asyncio.Event().wait()
+
+    task = BackgroundTask("test-loop")
+    task.start(loop)
+    task.start(loop)
+    await asyncio.sleep(0)
+    assert task.running and started == [True]
+
+    await task.stop()
+    assert not task.running
+    await task.stop()
@@ -0,0 +1,126 @@
+import asyncio
+import time
+import uuid
+import pytest
+from fastapi.testclient import TestClient
+from app.services.token_denylist import RedisRevocationStore, TokenDenylist
+from tests.helpers import auth_headers, login
+
+SYNC_SECONDS = 0.05
+
+@pytest.fixture
+def redis_server():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    return fakeredis.FakeServer()
+
+def worker_denylist(redis_server) -> TokenDenylist:
+    """A denylist as one worker process would build it"""
+    import fakeredis
+    store = RedisRevocationStore(fakeredis.FakeAsyncRedis(server=redis_server), 3600)
+    return TokenDenylist(store, sync_seconds=SYNC_SECONDS)
+
+@pytest.mark.asyncio
+async def test_revoke_is_local_and_immediate():
+    """Test a revoked jti is rejected at once and expired tokens are not stored"""
+    denylist = TokenDenylist()
+    jti = uuid.uuid4().hex
+    await denylist.revoke(jti, int(time.time()) + 60)
+    assert denylist.is_revoked(jti) is True
+    assert denylist.is_revoked(uuid.uuid4().hex) is False
+    assert denylist.is_revoked(None) is False
+
+    await denylist.revoke(uuid.uuid4().hex, int(time.time()) - 1)
+    assert len(denylist.revoked) == 1
+
+def test_prune_forgets_expired_tokens():
+    """Test entries are dropped once their token expired"""
+    denylist = TokenDenylist()
+    expired, live = uuid.uuid4().hex, uuid.uuid4().hex
+    denylist._add(expired, int(time.time()) - 120)
+    denylist._add(live, int(time.time()) + 120)
+    assert denylist.prune() == 1
+    assert denylist.is_revoked(expired) is False
+    assert denylist.is_revoked(live) is True
+
+@pytest.mark.asyncio
+async def test_memory_denylist_prunes_in_the_background(monkeypatch):
+    """Test expired tokens are dropped without a shared store once started"""
+    denylist = TokenDenylist(prune_seconds=0.01)
+    denylist.start()
+    try:
+        now = time.time()
+        await denylist.revoke(uuid.uuid4().hex, int(now) + 60)
+        assert denylist.stats()["revoked"] == 1
+        monkeypatch.setattr(time, "time", lambda: now + 180)
+        await asyncio.sleep(0.05)
+        assert denylist.stats()["revoked"] == 0
+    finally:
+        await denylist.aclose()
+
+@pytest.mark.asyncio
+async def test_revocation_propagates_across_workers(redis_server):
+    """Test a token revoked on one worker is rejected by another within a sync interval"""
+    first, second = worker_denylist(redis_server), worker_denylist(redis_server)
+    first.start()
+    second.start()
+    try:
+        await asyncio.sleep(SYNC_SECONDS)
+        jti = uuid.uuid4().hex
+        await first.revoke(jti, int(time.time()) + 60)
+        revoked_at = time.monotonic()
+        while not second.is_revoked(jti):
+            assert time.monotonic() - revoked_at < SYNC_SECONDS * 4, "revocation did not propagate"
+            await asyncio.sleep(0.005)
+    finally:
+        await first.aclose()
+        await second.aclose()
+
+@pytest.mark.asyncio
+async def test_new_worker_loads_existing_revocations(redis_server):
+    """Test a worker started later picks up earlier revocations on its first sync"""
+    first = worker_denylist(redis_server)
+    jtis = [uuid.uuid4().hex for _ in range(5)]
+    for jti in jtis:
+        await first.revoke(jti, int(time.time()) + 60)
+    await first.revoke(uuid.uuid4().hex, int(time.time()) - 60)
+
+    late = worker_denylist(redis_server)
+    assert await late.sync() == 5
+    assert all(late.is_revoked(jti) for jti in jtis)
+    # Later syncs fetch only new revocations (plus the last millisecond again)
+    jti = uuid.uuid4().hex
+    await first.revoke(jti, int(time.time()) + 60)
+    await late.sync()
+    assert late.is_revoked(jti) and len(late.revoked) == 6
+
+@pytest.mark.asyncio
+async def test_user_invalidation_reaches_other_workers(redis_server):
+    """Test a write published on one worker drops the cached user on another at its next sync"""
+    first, second = worker_denylist(redis_server), worker_denylist(redis_server)
+    invalidated = []
+    second.user_invalidation_listeners.append(invalidated.append)
+    user_id = uuid.uuid4()
+
+    first.publish_user_invalidation(user_id)
+    await first.sync()
+    await second.sync()
+    assert invalidated == [user_id]
+    # Invalidations are not revocations
+    assert len(second.revoked) == 0
+
+    # Without a store there are no other workers to tell
+    local = TokenDenylist()
+    local.publish_user_invalidation(user_id)
+    assert await local.sync() == 0
+
+def test_logout_revokes_access_token(client: TestClient):
+    """Test a logged out token is rejected while a new login still works"""
+    headers = auth_headers(login(client))
+    assert client.get("/api/v1/auth/me", headers=headers).status_code == 200
+    assert client.post("/api/v1/auth/logout", headers=headers).status_code == 200
+
+    response = client.get("/api/v1/auth/me", headers=headers)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Token has been revoked"
+    assert client.get("/api/v1/auth/me", headers=auth_headers(login(client))).status_code == 200
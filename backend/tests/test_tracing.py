@@ -0,0 +1,146 @@
+import asyncio
+import json
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from app.core.tracing import FileExporter, InMemoryExporter, OTLPExporter, Tracer, TracingMiddleware
+from app.main import app
+from app.services.user_service import principal_cache
+from tests.helpers import TwilioMessagesStub, auth_headers, login, make_service
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+def test_request_spans_continue_incoming_trace(client: TestClient):
+    """Test a request continues the caller's traceparent, with a child span per SQL statement"""
+    tracer = Tracer(InMemoryExporter())
+    traced = TestClient(TracingMiddleware(app, tracer=tracer))
+    auth = login(traced, "+15550006666")
+    principal_cache.clear()
+    response = traced.get(
+        "/api/v1/auth/me", headers={**auth_headers(auth), "traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01"}
+    )
+    assert response.status_code == 200
+    asyncio.run(tracer.flush())
+
+    spans = [span for span in tracer.exporter.spans if span.trace_id == TRACE_ID]
+    root = next(span for span in spans if span.kind == "server")
+    assert root.name == "GET /api/v1/auth/me"
+    assert root.parent_id == PARENT_ID
+    assert root.attributes["http.route"] == "/api/v1/auth/me"
+    assert root.attributes["http.response.status_code"] == 200
+    assert root.status == "unset"
+
+    queries = [span for span in spans if "db.statement" in span.attributes]
+    assert queries and all(span.parent_id == root.span_id for span in queries)
+    assert queries[0].name == "SELECT"
+    assert queries[0].attributes["db.system"] == "sqlite"
+    assert "FROM users" in queries[0].attributes["db.statement"]
+    assert all(root.start_ns <= span.start_ns <= span.end_ns <= root.end_ns for span in queries)
+
+def test_sampling_decisions():
+    """Test ratio sampling of new traces and parent-based sampling of incoming ones"""
+    never, always = Tracer(sample_ratio=0.0), Tracer(sample_ratio=1.0)
+    assert all(never.start_trace("GET") is None for _ in range(100))
+    assert all(always.start_trace("GET") is not None for _ in range(100))
+
+    # The caller's sampled flag wins over the local ratio
+    assert never.start_trace("GET", traceparent=f"00-{TRACE_ID}-{PARENT_ID}-01").trace_id == TRACE_ID
+    assert always.start_trace("GET", traceparent=f"00-{TRACE_ID}-{PARENT_ID}-00") is None
+    # Malformed or all-zero ids start a new trace
+    for traceparent in ("garbage", f"00-{'0' * 32}-{PARENT_ID}-01", f"00-{TRACE_ID}-{PARENT_ID}"):
+        span = always.start_trace("GET", traceparent=traceparent)
+        assert span.trace_id != TRACE_ID and span.parent_id is None
+
+    half = Tracer(sample_ratio=0.5)
+    sampled = sum(half.start_trace("GET") is not None for _ in range(2000))
+    assert 800 < sampled < 1200
+
+def test_spans_outside_a_trace_do_nothing():
+    """Test instrumentation is inert without a sampled current span"""
+    tracer = Tracer()
+    with tracer.span("work") as span:
+        assert span is None
+    assert tracer.start_span("work") is None
+    assert tracer.inject({}) == {}
+    assert tracer.stats()["pending"] == 0
+
+@pytest.mark.asyncio
+async def test_queued_sms_joins_the_enqueuing_trace():
+    """Test a dispatch-queue send is a child of the request that queued it, with traceparent sent on"""
+    stub = TwilioMessagesStub()
+    service = make_service(stub)
+    tracer = Tracer()
+    root = tracer.start_trace("POST /api/v1/auth/phone/send-otp")
+    with tracer.use_span(root):
+        service.dispatch_queue.enqueue("+1234567890", "hello")
+    root.end()
+    await service.aclose()
+    await tracer.flush()
+
+    sms = next(span for span in tracer.exporter.spans if span.name == "twilio.send_sms")
+    assert sms.trace_id == root.trace_id
+    assert sms.parent_id == root.span_id
+    assert sms.kind == "client"
+    assert stub.requests[0].headers["traceparent"] == sms.traceparent
+
+@pytest.mark.asyncio
+async def test_failed_sms_marks_span_as_error():
+    """Test a failed send_sms records the error on its span"""
+    service = make_service(TwilioMessagesStub(status_code=400))
+    tracer = Tracer()
+    with tracer.use_span(tracer.start_trace("test")):
+        result = await service.send_sms("+1234567890", "hello")
+    await service.aclose()
+    await tracer.flush()
+
+    assert result["success"] is False
+    span = next(span for span in tracer.exporter.spans if span.name == "twilio.send_sms")
+    assert span.status == "error"
+    assert "400" in span.status_message
+
+@pytest.mark.asyncio
+async def test_otlp_exporter_posts_json_payload():
+    """Test spans are sent to the collector as OTLP/HTTP JSON"""
+    requests = []
+
+    def collector(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json={})
+
+    exporter = OTLPExporter("http://collector.local:4318/", "imaro-test", transport=httpx.MockTransport(collector))
+    tracer = Tracer(exporter)
+    root = tracer.start_trace("GET /health", traceparent=f"00-{TRACE_ID}-{PARENT_ID}-01")
+    with tracer.use_span(root):
+        with tracer.span("child", attributes={"count": 3, "ok": True}):
+            pass
+    root.end()
+    assert await tracer.flush() == 2
+    await tracer.aclose()
+
+    assert str(requests[0].url) == "http://collector.local:4318/v1/traces"
+    payload = json.loads(requests[0].content)
+    resource_spans = payload["resourceSpans"][0]
+    assert resource_spans["resource"]["attributes"] == [
+        {"key": "service.name", "value": {"stringValue": "imaro-test"}}
+    ]
+    child, exported_root = resource_spans["scopeSpans"][0]["spans"]
+    assert exported_root["traceId"] == TRACE_ID and exported_root["parentSpanId"] == PARENT_ID
+    assert exported_root["kind"] == 2
+    assert child["parentSpanId"] == exported_root["spanId"]
+    assert {"key": "count", "value": {"intValue": "3"}} in child["attributes"]
+    assert {"key": "ok", "value": {"boolValue": True}} in child["attributes"]
+
+@pytest.mark.asyncio
+async def test_file_exporter_and_queue_limit(tmp_path):
+    """Test spans are written as JSON lines and spans beyond the queue limit are dropped"""
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(FileExporter(str(path)), max_queue_size=2)
+    for _ in range(3):
+        tracer.start_trace("GET /health").end()
+    await tracer.aclose()
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["name"] for line in lines] == ["GET /health", "GET /health"]
+    assert tracer.stats()["exported"] == 2
+    assert tracer.stats()["dropped"] == 1
@@ -0,0 +1,172 @@
+import asyncio
+import time
+import pytest
+from urllib.parse import parse_qs
+from app.services.sms_transport import SMSTransportError
+from app.services.twilio_service import SMSDispatchQueue, SMSQueueFullError, TwilioService
+from tests.helpers import TwilioMessagesStub, make_service
+
+@pytest.mark.asyncio
+async def test_send_sms_posts_to_messages_api():
+    """Test send_sms posts the message form with basic auth"""
+    stub = TwilioMessagesStub()
+    service = make_service(stub)
+    result = await service.send_sms("+1234567890", "hello")
+    await service.aclose()
+
+    assert result["success"] is True
+    assert result["sid"].startswith("SM")
+    request = stub.requests[0]
+    assert request.url.path == "/2010-04-01/Accounts/ACtest/Messages.json"
+    assert request.headers["authorization"].startswith("Basic ")
+    form = parse_qs(request.content.decode())
+    assert form["To"] == ["+1234567890"]
+    assert form["Body"] == ["hello"]
+
+@pytest.mark.asyncio
+async def test_send_otp_sms_stores_otp():
+    """Test a sent OTP can be verified"""
+    stub = TwilioMessagesStub()
+    service = make_service(stub)
+    result = await service.send_otp_sms("+1234567890")
+    await service.aclose()
+
+    assert result["success"] is True
+    body = parse_qs(stub.requests[0].content.decode())["Body"][0]
+    otp = body.split("code is: ")[1][:6]
+    assert (await service.verify_otp("+1234567890", otp))["success"] is True
+
+@pytest.mark.asyncio
+async def test_send_sms_reports_provider_errors():
+    """Test provider errors are reported and classified"""
+    service = make_service(TwilioMessagesStub(status_code=503))
+    result = await service.send_sms("+1234567890", "hello")
+    assert result["success"] is False
+
+    with pytest.raises(SMSTransportError) as exc_info:
+        await service.transport.send_message("+1234567890", "hello", "MG")
+    assert exc_info.value.retryable is True
+    await service.aclose()
+
+@pytest.mark.asyncio
+async def test_dispatch_queue_retries_transient_failures():
+    """Test retryable failures are retried until delivery succeeds"""
+    failures = [SMSTransportError("busy", status_code=503, retryable=True)] * 2
+    delivered = []
+
+    async def deliver(phone_number, message):
+        if failures:
+            raise failures.pop()
+        delivered.append(phone_number)
+
+    queue = SMSDispatchQueue(deliver, workers=1, rate_per_second=0, retry_base_delay=0.001)
+    queue.enqueue("+1234567890", "hello")
+    await queue.stop()
+
+    assert delivered == ["+1234567890"]
+    stats = queue.stats()
+    assert stats["retries"] == 2
+    assert stats["sent"] == 1
+    assert stats["depth"] == 0
+
+@pytest.mark.asyncio
+async def test_dispatch_queue_does_not_retry_permanent_failures():
+    """Test non-retryable failures are counted once"""
+    async def deliver(phone_number, message):
+        raise SMSTransportError("invalid number", status_code=400)
+
+    queue = SMSDispatchQueue(deliver, workers=1, rate_per_second=0)
+    queue.enqueue("+1234567890", "hello")
+    await queue.stop()
+    assert queue.stats()["failed"] == 1
+    assert queue.stats()["retries"] == 0
+
+@pytest.mark.asyncio
+async def test_dispatch_queue_sheds_load_when_full():
+    """Test enqueue fails fast once the queue is full"""
+    release = asyncio.Event()
+
+    async def deliver(phone_number, message):
+        await release.wait()
+
+    queue = SMSDispatchQueue(deliver, max_size=1, workers=1, rate_per_second=0)
+    queue.enqueue("+1000000001", "first")
+    await asyncio.sleep(0)  # worker picks up the first message
+    queue.enqueue("+1000000002", "second")
+    with pytest.raises(SMSQueueFullError):
+        queue.enqueue("+1000000003", "third")
+    assert queue.stats()["shed"] == 1
+
+    release.set()
+    await queue.stop()
+    assert queue.stats()["sent"] == 2
+
+def fill_dispatch_queue(service: TwilioService, release: asyncio.Event) -> SMSDispatchQueue:
+    """Leave ``service`` with a one-slot dispatch queue that is full until ``release`` is set"""
+    async def deliver(phone_number, message):
+        await release.wait()
+
+    queue = service.dispatch_queue
+    queue.deliver = deliver
+    queue.max_size = 1
+    queue.worker_count = 1
+    queue.enqueue("+1000000001", "first")
+    return queue
+
+@pytest.mark.asyncio
+async def test_full_queue_leaves_pending_otp_untouched():
+    """Test a send-otp rejected by a full queue does not touch the stored OTP"""
+    release = asyncio.Event()
+    service = make_service(TwilioMessagesStub())
+    queue = fill_dispatch_queue(service, release)
+    await asyncio.sleep(0)  # worker picks up the first message
+    queue.enqueue("+1000000002", "second")
+
+    await service.store_otp("+1234567890", "111111")
+    pending = dict(service.otp_store.otp_storage["+1234567890"])
+    with pytest.raises(SMSQueueFullError):
+        await service.send_otp_sms("+1234567890")
+    with pytest.raises(SMSQueueFullError):
+        await service.send_otp_sms("+1555000111")
+
+    assert service.otp_store.otp_storage["+1234567890"] == pending
+    assert "+1555000111" not in service.otp_store.otp_storage
+    assert queue._reserved == 0
+
+    release.set()
+    await service.aclose()
+
+@pytest.mark.asyncio
+async def test_retry_after_full_queue_sends_the_otp():
+    """Test a retry after a queue-full rejection sends the SMS instead of hitting the resend cooldown"""
+    release = asyncio.Event()
+    stub = TwilioMessagesStub()
+    service = make_service(stub)
+    queue = fill_dispatch_queue(service, release)
+    await asyncio.sleep(0)  # worker picks up the first message
+    queue.enqueue("+1000000002", "second")
+    with pytest.raises(SMSQueueFullError):
+        await service.send_otp_sms("+1234567890")
+
+    release.set()
+    await queue.stop()
+    queue.deliver = service._deliver
+    result = await service.send_otp_sms("+1234567890")
+    await service.aclose()
+
+    assert result["message"] == "OTP sent to +1234567890"
+    assert [parse_qs(request.content.decode())["To"] for request in stub.requests] == [["+1234567890"]]
+
+@pytest.mark.asyncio
+async def test_dispatch_queue_respects_rate_limit():
+    """Test the token bucket spaces out deliveries"""
+    async def deliver(phone_number, message):
+        pass
+
+    queue = SMSDispatchQueue(deliver, workers=4, rate_per_second=100, burst=1)
+    start = time.monotonic()
+    for index in range(6):
+        queue.enqueue(f"+100000000{index}", "hello")
+    await queue.stop()
+    assert time.monotonic() - start >= 0.045
+    assert queue.stats()["sent"] == 6
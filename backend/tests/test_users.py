@@ -0,0 +1,159 @@
+import json
+import pytest
+from fastapi.testclient import TestClient
+from app.core.config import settings
+from app.core.database import get_async_db
+from app.main import app
+from app.models.user import User
+from app.schemas.user import UserUpdate
+from app.services.user_service import async_user_service
+from tests.helpers import ADMIN_HEADERS, auth_headers, login, phone_user
+
+def test_get_current_user_info(client: TestClient):
+    """Test /auth/me returns the user created at login"""
+    auth = login(client)
+    response = client.get("/api/v1/auth/me", headers=auth_headers(auth))
+    assert response.status_code == 200
+    data = response.json()
+    assert data["id"] == auth["user_id"]
+    assert data["phone_number"] == "+1234567890"
+    assert data["profile_completed"] is False
+
+def test_complete_and_update_profile(client: TestClient):
+    """Test profile completion followed by a partial update"""
+    auth = login(client)
+    headers = auth_headers(auth)
+    response = client.post(
+        "/api/v1/auth/complete-profile",
+        headers=headers,
+        json={
+            "first_name": "Ada",
+            "last_name": "Lovelace",
+            "age": 36,
+            "gender": "female",
+            "country": "GBR"
+        }
+    )
+    assert response.status_code == 200
+    assert response.json()["profile_completed"] is True
+
+    response = client.put("/api/v1/users/profile", headers=headers, json={"age": 37})
+    assert response.status_code == 200
+    assert response.json()["age"] == 37
+    assert response.json()["first_name"] == "Ada"
+
+def test_deactivated_user_is_rejected(client: TestClient):
+    """Test a deactivated account can no longer authenticate"""
+    auth = login(client)
+    headers = auth_headers(auth)
+    response = client.post("/api/v1/users/deactivate", headers=headers)
+    assert response.status_code == 200
+
+    response = client.get("/api/v1/auth/me", headers=headers)
+    assert response.status_code == 401
+
+@pytest.mark.asyncio
+async def test_returning_write_path_round_trips(db_session, async_session_factory, count_statements):
+    """Test the RETURNING write path needs one round trip where the ORM path needs three"""
+    async with async_session_factory() as db:
+        user = await async_user_service.upsert_login(db, phone_user("+15550003333"))
+
+    async with async_session_factory() as db:
+        with count_statements() as orm_statements:
+            updated = await async_user_service.update_user(db, user.id, UserUpdate(age=30))
+    assert updated.age == 30
+    assert len(orm_statements) == 3
+
+    async with async_session_factory() as db:
+        with count_statements() as statements:
+            response = await async_user_service.update_user_returning(db, user.id, UserUpdate(age=31))
+    assert response.age == 31
+    assert response.id == user.id
+    assert len(statements) == 1
+
+    async with async_session_factory() as db:
+        with count_statements() as statements:
+            response = await async_user_service.deactivate_user_returning(db, user.id)
+            assert await async_user_service.delete_user_returning(db, user.id) is True
+            assert await async_user_service.delete_user_returning(db, user.id) is False
+    assert response.is_active is False
+    assert len(statements) == 3
+
+def test_profile_update_is_one_round_trip(client: TestClient, count_statements):
+    """Test PUT /users/profile issues a single statement once the principal is cached"""
+    auth = login(client)
+    headers = auth_headers(auth)
+    client.get("/api/v1/auth/me", headers=headers)
+
+    with count_statements() as statements:
+        response = client.put("/api/v1/users/profile", headers=headers, json={"age": 40})
+    assert response.status_code == 200
+    assert response.json()["age"] == 40
+    assert len(statements) == 1
+
+@pytest.fixture
+def admin_client(client, session_factory, monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_API_KEY", ADMIN_HEADERS["X-Admin-Key"])
+    db = session_factory()
+    db.add_all([
+        User(
+            firebase_uid=f"phone_{index}",
+            auth_method="phone",
+            phone_number=f"+1555000{index:04d}",
+            first_name="User",
+            last_name=str(index),
+            country="GBR" if index % 3 == 0 else "USA",
+        )
+        for index in range(25)
+    ])
+    db.commit()
+    db.close()
+    return client
+
+def test_list_users_requires_admin_key(admin_client: TestClient):
+    """Test the listing rejects missing or wrong admin keys"""
+    assert admin_client.get("/api/v1/users/").status_code == 403
+    assert admin_client.get("/api/v1/users/", headers={"X-Admin-Key": "wrong"}).status_code == 403
+
+def test_list_users_keyset_pagination(admin_client: TestClient):
+    """Test cursor pagination returns every user exactly once"""
+    seen = []
+    cursor = None
+    pages = 0
+    while True:
+        params = {"limit": 10, **({"cursor": cursor} if cursor else {})}
+        response = admin_client.get("/api/v1/users/", headers=ADMIN_HEADERS, params=params)
+        assert response.status_code == 200
+        data = response.json()
+        seen += [user["firebase_uid"] for user in data["items"]]
+        pages += 1
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+    assert pages == 3
+    assert sorted(seen) == sorted(f"phone_{index}" for index in range(25))
+
+def test_list_users_filters_and_invalid_cursor(admin_client: TestClient):
+    """Test filters narrow the listing and malformed cursors are rejected"""
+    response = admin_client.get("/api/v1/users/", headers=ADMIN_HEADERS, params={"country": "GBR"})
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == 9
+    assert all(user["country"] == "GBR" for user in response.json()["items"])
+
+    response = admin_client.get("/api/v1/users/", headers=ADMIN_HEADERS, params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+def test_list_users_ndjson_stream(admin_client: TestClient, monkeypatch):
+    """Test stream=true returns every matching user as NDJSON, from a session of its own"""
+    async def closed_session():
+        # As with FastAPI versions that close yield dependencies before the body streams
+        yield None
+
+    monkeypatch.setitem(app.dependency_overrides, get_async_db, closed_session)
+    response = admin_client.get(
+        "/api/v1/users/", headers=ADMIN_HEADERS, params={"stream": "true", "country": "USA"}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    users = [json.loads(line) for line in response.text.splitlines()]
+    assert len(users) == 16
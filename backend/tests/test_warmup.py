@@ -0,0 +1,42 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.warmup import Warmup, warmup
+
+@pytest.mark.asyncio
+async def test_warmup_runs_every_step(db_session, async_test_engine, async_session_factory, count_statements):
+    """Test warmup opens the pool connections and primes the principal query"""
+    worker = Warmup(db_connections=2, engine=async_test_engine, session_factory=async_session_factory)
+    assert worker.ready is False
+    with count_statements() as statements:
+        await worker.run()
+
+    assert worker.ready is True
+    assert worker.errors == {}
+    assert list(worker.steps_ms) == ["mappers", "db_connections", "queries", "schemas", "jwt"]
+    assert statements.count("SELECT 1") == 2
+    assert any("FROM users" in statement for statement in statements)
+
+@pytest.mark.asyncio
+async def test_failed_warmup_step_does_not_block_readiness():
+    """Test a warmup step error is recorded and the worker still becomes ready"""
+    class Unreachable:
+        def connect(self):
+            raise ConnectionError("database unreachable")
+
+    worker = Warmup(engine=Unreachable())
+    worker.prime_queries = lambda: None
+    await worker.run()
+    assert worker.ready is True
+    assert "unreachable" in worker.errors["db_connections"]
+
+def test_readiness_waits_for_warmup(client: TestClient, monkeypatch):
+    """Test /health/ready answers 503 while warming up and 200 once warm"""
+    monkeypatch.setattr(warmup, "ready", False)
+    response = client.get("/api/v1/health/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "warming_up"
+
+    monkeypatch.setattr(warmup, "ready", True)
+    response = client.get("/api/v1/health/ready")
+    assert response.status_code == 200
+    assert response.json()["status"] == "ready"